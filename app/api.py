@@ -1,3 +1,6 @@
+import asyncio
+import os
+
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from .llm.agent import start_interview as llm_start
@@ -5,7 +8,7 @@ from .llm.agent import finalize_interview as llm_finalize
 
 router = APIRouter()
 
-from .state.session_store import create_session, get_session, set_session_field
+from .state.session_store import create_session, get_session, set_session_fields
 
 class StartInterviewRequest(BaseModel):
     session_id: str
@@ -32,7 +35,7 @@ async def start_session(req: StartInterviewRequest):
         role_info=req.role_info or {},
     )
     # Persist session metadata (in-memory store for MVP)
-    create_session(req.session_id, {
+    await create_session(req.session_id, {
         "user_id": req.user_id,
         "interview_type": req.interview_type,
         "persona": req.persona,
@@ -48,13 +51,16 @@ class PreferenceUpdateRequest(BaseModel):
 @router.patch("/sessions/{session_id}/preferences")
 async def update_preferences(session_id: str, prefs: PreferenceUpdateRequest):
     # Update session-level preferences (in-memory store for MVP)
-    sess = get_session(session_id)
+    sess = await get_session(session_id)
     if not sess:
         raise HTTPException(status_code=404, detail="session not found")
+    updates = {}
     if prefs.emotion_opt_in is not None:
-        set_session_field(session_id, "emotion_opt_in", bool(prefs.emotion_opt_in))
+        updates["emotion_opt_in"] = bool(prefs.emotion_opt_in)
     if prefs.client_tts is not None:
-        set_session_field(session_id, "client_tts", bool(prefs.client_tts))
+        updates["client_tts"] = bool(prefs.client_tts)
+    # only the changed fields are written, so concurrent updates to other preferences are kept
+    await set_session_fields(session_id, updates)
     return {"status":"ok","session_id":session_id,"updated": {"emotion_opt_in": prefs.emotion_opt_in, "client_tts": prefs.client_tts}}
 
 class FinalizeRequest(BaseModel):
@@ -64,47 +70,132 @@ class FinalizeRequest(BaseModel):
     audio_path: str | None = None
     # Optional: remote audio URL that will be fetched to a temporary file for reprocessing
     audio_url: str | None = None
+    # Reprocess the audio streamed over the STT WebSocket when neither of the above is given
+    use_session_audio: bool | None = True
+
+def _remove_quietly(path: str) -> None:
+    try:
+        os.remove(path)
+    except Exception:
+        pass
 
 @router.post("/sessions/finalize")
 async def finalize(req: FinalizeRequest):
-    whisper_res = None
-    local_tmp = None
-    # If an audio_url is provided, fetch it to a temp file and reprocess
-    if req.audio_url:
-        try:
-            from .stt.audio_fetcher import fetch_audio_to_temp
-            local_tmp = fetch_audio_to_temp(req.audio_url)
-        except Exception:
-            import logging
-            logging.getLogger(__name__).exception("Audio download failed; continuing without Whisper reprocessing")
-            local_tmp = None
-
-    # If an audio_path was provided, prefer it; else use downloaded tmp file
-    target_audio = req.audio_path or local_tmp
-    if target_audio:
+    from .pipeline.prefetch import get_prefetcher
+    prefetcher = get_prefetcher()
+    if prefetcher is not None:
+        # interview is over: no next question to prepare
+        prefetcher.cancel(req.session_id)
+    res = await llm_finalize(session_id=req.session_id, include_example_improvements=req.include_example_improvements)
+    # Whisper reprocessing (download + transcription) runs as a background job; poll GET /jobs/{job_id}
+    # Without an explicit source, use the audio the STT WebSocket spooled for this session
+    spooled = None
+    if not (req.audio_path or req.audio_url) and req.use_session_audio:
+        from .stt.session_audio import spool_path
+        spooled = spool_path(req.session_id)
+    else:
+        # the interview is over and its recording won't be reprocessed: don't keep it
+        from .stt.session_audio import remove as remove_session_audio
+        await asyncio.to_thread(remove_session_audio, req.session_id)
+    if req.audio_path or req.audio_url or spooled:
+        from .jobs.queue import get_reprocess_queue, QueueFullError
+        from .stt.whisper_worker import reprocess_source, reprocess_fetched, reprocess_session_audio
+        from .stt.audio_cache import fetch_audio_cached
+        queue = get_reprocess_queue()
         try:
-            from .stt.whisper_worker import reprocess_audio
-            whisper_res = reprocess_audio(target_audio)
-        except Exception:
-            # Non-fatal: log and continue with regular finalize
-            import logging
-            logging.getLogger(__name__).exception("Whisper reprocessing failed; continuing without it")
-            whisper_res = None
-
-    res = await llm_finalize(session_id=req.session_id, include_example_improvements=req.include_example_improvements, whisper_result=whisper_res)
-    # Attach whisper result if available for transparency/provenance
-    if whisper_res:
-        res["whisper_reprocessed"] = True
-
-    # Cleanup downloaded temp file if we created one
-    if local_tmp:
-        try:
-            os.remove(local_tmp)
-        except Exception:
-            pass
-
+            if spooled:
+                job = queue.submit("whisper_reprocess", reprocess_session_audio, spooled)
+            elif req.audio_path:
+                job = queue.submit("whisper_reprocess", reprocess_source, req.audio_path)
+            else:
+                # download (or revalidate the cached copy) on this process's event loop, transcribe in the worker pool
+                job = queue.submit("whisper_reprocess", reprocess_fetched, prepare=fetch_audio_cached(req.audio_url), discard=_remove_quietly)
+        except QueueFullError as e:
+            raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+        # GET /jobs/{job_id} returns this report again, with the Whisper transcript, once the job succeeds
+        job.meta.update(session_id=req.session_id, include_example_improvements=req.include_example_improvements)
+        res["whisper_reprocessed"] = False
+        res["whisper_job"] = {"job_id": job.id, "status": job.status}
     return res
 
+@router.get("/sessions/{session_id}/artifacts")
+async def list_session_artifacts(session_id: str, limit: int = 50, cursor: str | None = None):
+    from .storage.filesystem import list_artifacts
+    if not 1 <= limit <= 500:
+        raise HTTPException(status_code=400, detail="limit must be between 1 and 500")
+    try:
+        page = list_artifacts(session_id, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {
+        "session_id": session_id,
+        "artifacts": [
+            {"name": a["name"], "size": a["size"], "created_at": a["created_at"], "url": f"/v1/tts/files/{a['name']}"}
+            for a in page["items"]
+        ],
+        "next_cursor": page["next_cursor"],
+    }
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    from .jobs.queue import get_reprocess_queue
+    job = get_reprocess_queue().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="job not found")
+    out = job.to_dict()
+    if out["status"] == "succeeded" and "session_id" in job.meta:
+        # a finalize job: rebuild the session's report with the higher-accuracy transcript (once)
+        if "report" not in job.meta:
+            report = await llm_finalize(session_id=job.meta["session_id"],
+                                        include_example_improvements=job.meta["include_example_improvements"],
+                                        whisper_result=out["result"])
+            report["whisper_reprocessed"] = True
+            job.meta["report"] = report
+        out["report"] = job.meta["report"]
+    return out
+
+@router.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    from .jobs.queue import get_reprocess_queue
+    queue = get_reprocess_queue()
+    if queue.get(job_id) is None:
+        raise HTTPException(status_code=404, detail="job not found")
+    cancelled = queue.cancel(job_id)
+    return {"job_id": job_id, "cancelled": cancelled, "status": queue.get(job_id).status}
+
+@router.get("/metrics")
+async def metrics():
+    from .stt.executor import get_executor
+    from .jobs.queue import get_reprocess_queue
+    from .stt.audio_cache import get_audio_cache
+    from .tts.cache import stats as tts_cache_stats
+    from .tts.singleflight import get_singleflight
+    from .tts.metrics import stream_metrics
+    from .tts.artifacts import get_artifact_store
+    from .pipeline.prefetch import get_prefetcher
+    from .storage.write_behind import get_write_behind
+    from .storage.filesystem import get_index
+    from .storage.azure_blob import sas_cache
+    from .state.session_store import near_cache
+    # the audio cache opens its SQLite index on first use and sums its sizes per call
+    cache = await asyncio.to_thread(get_audio_cache)
+    audio_cache_stats = await asyncio.to_thread(cache.stats) if cache is not None else None
+    prefetcher = get_prefetcher()
+    return {
+        "stt_executor": get_executor().stats(),
+        "reprocess_queue": get_reprocess_queue().stats(),
+        "audio_cache": audio_cache_stats,
+        "tts_cache": tts_cache_stats(),
+        "tts_singleflight": get_singleflight().stats(),
+        "tts_stream": stream_metrics.stats(),
+        "tts_artifacts": get_artifact_store().stats(),
+        "prefetch": prefetcher.stats() if prefetcher is not None else None,
+        "persistence": get_write_behind().stats(),
+        "storage": get_index().stats(),
+        "azure_sas": sas_cache.stats(),
+        "session_cache": near_cache.stats(),
+    }
+
 @router.post("/annotations")
 async def log_annotation(annotation: dict):
     # Placeholder - would persist in DB
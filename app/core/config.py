@@ -3,7 +3,39 @@ import os
 class Settings:
     def __init__(self):
         self.REDIS_URL = os.getenv("REDIS_URL")
+        # Connection pool size of the asyncio Redis client used by the session store
+        self.REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", "50"))
+        # Per-process near-cache for Redis session reads (0 disables); writes publish invalidations on the channel
+        self.SESSION_CACHE_TTL_SECONDS = float(os.getenv("SESSION_CACHE_TTL_SECONDS", "5"))
+        self.SESSION_CACHE_MAX_ENTRIES = int(os.getenv("SESSION_CACHE_MAX_ENTRIES", "10000"))
+        self.SESSION_INVALIDATION_CHANNEL = os.getenv("SESSION_INVALIDATION_CHANNEL", "session-invalidate")
+        # TTS cache: in-process LRU tier (entries / TTL) in front of Redis; 0 = Redis entries expire with
+        # STORAGE_RETENTION_SECONDS (never if that is 0 too)
+        self.TTS_CACHE_MAX_ENTRIES = int(os.getenv("TTS_CACHE_MAX_ENTRIES", "1024"))
+        self.TTS_CACHE_TTL_SECONDS = float(os.getenv("TTS_CACHE_TTL_SECONDS", "3600"))
+        self.TTS_CACHE_REDIS_TTL_SECONDS = int(os.getenv("TTS_CACHE_REDIS_TTL_SECONDS", "0"))
+        # Synthesized audio bytes, stored by content hash and streamed from mmap in TTS_STREAM_CHUNK_BYTES slices
+        self.TTS_ARTIFACT_DIR = os.getenv("TTS_ARTIFACT_DIR", "storage/tts_artifacts")
+        self.TTS_STREAM_CHUNK_BYTES = int(os.getenv("TTS_STREAM_CHUNK_BYTES", str(16 * 1024)))
+        # Least recently used artifacts are deleted to keep the store under this size (0 = unbounded)
+        self.TTS_ARTIFACT_MAX_BYTES = int(os.getenv("TTS_ARTIFACT_MAX_BYTES", str(1024 * 1024 * 1024)))
+        # Cache-Control max-age for audio served by name from STORAGE_DIR (content-addressed artifacts are immutable)
+        self.TTS_FILE_MAX_AGE_SECONDS = int(os.getenv("TTS_FILE_MAX_AGE_SECONDS", "3600"))
+        # Sentence mode: long texts are synthesized (and cached) sentence by sentence, concurrently
+        self.TTS_SENTENCE_MODE = os.getenv("TTS_SENTENCE_MODE", "false").lower() in ("1", "true", "yes")
+        self.TTS_SENTENCE_MIN_CHARS = int(os.getenv("TTS_SENTENCE_MIN_CHARS", "120"))
+        self.TTS_SENTENCE_CONCURRENCY = int(os.getenv("TTS_SENTENCE_CONCURRENCY", "4"))
+        # Concurrent identical TTS requests share one generation; the Redis lock extends that across workers
+        self.TTS_SINGLEFLIGHT_REDIS_LOCK = os.getenv("TTS_SINGLEFLIGHT_REDIS_LOCK", "false").lower() in ("1", "true", "yes")
+        self.TTS_SINGLEFLIGHT_LOCK_TTL_MS = int(os.getenv("TTS_SINGLEFLIGHT_LOCK_TTL_MS", "30000"))
         self.STORAGE_DIR = os.getenv("STORAGE_DIR", "./storage")
+        # STORAGE_DIR layout and retention: files are sharded into hash-named subdirectories and indexed
+        # in SQLite; the GC thread keeps the total under STORAGE_MAX_BYTES (0 = unbounded) and deletes
+        # files older than STORAGE_RETENTION_SECONDS (0 = keep)
+        self.STORAGE_SHARD_DEPTH = int(os.getenv("STORAGE_SHARD_DEPTH", "2"))
+        self.STORAGE_MAX_BYTES = int(os.getenv("STORAGE_MAX_BYTES", "0"))
+        self.STORAGE_RETENTION_SECONDS = float(os.getenv("STORAGE_RETENTION_SECONDS", "0"))
+        self.STORAGE_GC_INTERVAL_SECONDS = float(os.getenv("STORAGE_GC_INTERVAL_SECONDS", "300"))
         # AWS keys kept for backwards compatibility only; S3 support is not enabled in this repo by default
         self.AWS_S3_BUCKET = os.getenv("AWS_S3_BUCKET")
         self.AWS_REGION = os.getenv("AWS_REGION")
@@ -12,5 +44,74 @@ class Settings:
         self.AZURE_STORAGE_CONTAINER = os.getenv("AZURE_STORAGE_CONTAINER")
         # SAS TTL for generated signed URLs (seconds). If 0 or unset, SAS won't be generated.
         self.AZURE_BLOB_SAS_TTL_SECONDS = int(os.getenv("AZURE_BLOB_SAS_TTL_SECONDS", "0"))
+        # SAS URLs are cached per (container, blob, permission) and reused until less than
+        # AZURE_SAS_REUSE_FRACTION of their TTL remains
+        self.AZURE_SAS_CACHE_MAX_ENTRIES = int(os.getenv("AZURE_SAS_CACHE_MAX_ENTRIES", "10000"))
+        self.AZURE_SAS_REUSE_FRACTION = float(os.getenv("AZURE_SAS_REUSE_FRACTION", "0.5"))
+        # Uploads over AZURE_UPLOAD_BLOCK_BYTES are staged as blocks on up to AZURE_UPLOAD_CONCURRENCY threads
+        self.AZURE_UPLOAD_BLOCK_BYTES = int(os.getenv("AZURE_UPLOAD_BLOCK_BYTES", str(4 * 1024 * 1024)))
+        self.AZURE_UPLOAD_CONCURRENCY = int(os.getenv("AZURE_UPLOAD_CONCURRENCY", "4"))
+        # Artifact persistence (Azure/filesystem) runs write-behind: URL returned at once, writes retried on
+        # PERSIST_WORKERS threads; past PERSIST_MAX_PENDING_BYTES queued (0 = no cap) writes happen inline
+        self.PERSIST_WRITE_BEHIND = os.getenv("PERSIST_WRITE_BEHIND", "true").lower() in ("1", "true", "yes")
+        self.PERSIST_WORKERS = int(os.getenv("PERSIST_WORKERS", "4"))
+        self.PERSIST_MAX_PENDING_BYTES = int(os.getenv("PERSIST_MAX_PENDING_BYTES", str(256 * 1024 * 1024)))
+        self.PERSIST_MAX_RETRIES = int(os.getenv("PERSIST_MAX_RETRIES", "3"))
+        self.PERSIST_RETRY_BACKOFF_SECONDS = float(os.getenv("PERSIST_RETRY_BACKOFF_SECONDS", "0.2"))
+        self.PERSIST_SHUTDOWN_TIMEOUT_SECONDS = float(os.getenv("PERSIST_SHUTDOWN_TIMEOUT_SECONDS", "30"))
+        # STT: load the VOSK model once at startup instead of on the first WebSocket connection
+        self.VOSK_PRELOAD = os.getenv("VOSK_PRELOAD", "false").lower() in ("1", "true", "yes")
+        # Threads available for blocking recognition calls (0 = one per CPU core)
+        self.STT_EXECUTOR_WORKERS = int(os.getenv("STT_EXECUTOR_WORKERS", "0"))
+        # Turn pipeline per-stage timeouts (seconds)
+        self.TURN_STT_TIMEOUT_SECONDS = float(os.getenv("TURN_STT_TIMEOUT_SECONDS", "10"))
+        self.TURN_EMOTION_TIMEOUT_SECONDS = float(os.getenv("TURN_EMOTION_TIMEOUT_SECONDS", "2"))
+        self.TURN_LLM_TIMEOUT_SECONDS = float(os.getenv("TURN_LLM_TIMEOUT_SECONDS", "15"))
+        # Whisper reprocessing job queue: worker pool size ("process" or "thread" pool),
+        # max queued+running jobs before finalize returns 503, and how long finished jobs are kept
+        self.REPROCESS_WORKERS = int(os.getenv("REPROCESS_WORKERS", "2"))
+        self.REPROCESS_EXECUTOR = os.getenv("REPROCESS_EXECUTOR", "process")
+        self.REPROCESS_MAX_PENDING = int(os.getenv("REPROCESS_MAX_PENDING", "16"))
+        self.REPROCESS_JOB_TTL_SECONDS = int(os.getenv("REPROCESS_JOB_TTL_SECONDS", "3600"))
+        # Remote audio fetching: pooled keep-alive HTTP client; bodies up to FETCH_MEMORY_THRESHOLD_BYTES stay in memory
+        self.FETCH_MAX_CONNECTIONS = int(os.getenv("FETCH_MAX_CONNECTIONS", "20"))
+        self.FETCH_KEEPALIVE_SECONDS = float(os.getenv("FETCH_KEEPALIVE_SECONDS", "30"))
+        self.FETCH_CHUNK_BYTES = int(os.getenv("FETCH_CHUNK_BYTES", str(64 * 1024)))
+        self.FETCH_MEMORY_THRESHOLD_BYTES = int(os.getenv("FETCH_MEMORY_THRESHOLD_BYTES", str(1024 * 1024)))
+        # azure:// downloads: blobs over AZURE_DOWNLOAD_RANGE_BYTES are fetched as parallel byte ranges
+        self.AZURE_DOWNLOAD_RANGE_BYTES = int(os.getenv("AZURE_DOWNLOAD_RANGE_BYTES", str(8 * 1024 * 1024)))
+        self.AZURE_DOWNLOAD_CONCURRENCY = int(os.getenv("AZURE_DOWNLOAD_CONCURRENCY", "4"))
+        # On-disk cache for fetched http(s) audio (revalidated with conditional GETs); 0 bytes disables it
+        self.AUDIO_CACHE_DIR = os.getenv("AUDIO_CACHE_DIR", os.path.join(self.STORAGE_DIR, "audio_cache"))
+        self.AUDIO_CACHE_MAX_BYTES = int(os.getenv("AUDIO_CACHE_MAX_BYTES", str(2 * 1024 * 1024 * 1024)))
+        # Opt-in: WebSocket audio is spooled per session under SESSION_AUDIO_DIR for reprocessing at finalize.
+        # Frames are buffered up to SESSION_AUDIO_FLUSH_BYTES before each write; a spool is deleted once
+        # reprocessed (or at finalize when unused) and the GC removes spools untouched for
+        # SESSION_AUDIO_RETENTION_SECONDS (0 = keep). The default cap is about 35 minutes of audio.
+        self.SESSION_AUDIO_SPOOL = os.getenv("SESSION_AUDIO_SPOOL", "false").lower() in ("1", "true", "yes")
+        self.SESSION_AUDIO_DIR = os.getenv("SESSION_AUDIO_DIR", os.path.join(self.STORAGE_DIR, "session_audio"))
+        self.SESSION_AUDIO_MAX_BYTES = int(os.getenv("SESSION_AUDIO_MAX_BYTES", str(64 * 1024 * 1024)))
+        self.SESSION_AUDIO_FLUSH_BYTES = int(os.getenv("SESSION_AUDIO_FLUSH_BYTES", str(64 * 1024)))
+        self.SESSION_AUDIO_RETENTION_SECONDS = float(os.getenv("SESSION_AUDIO_RETENTION_SECONDS", "86400"))
+        # Opt-in: speculative next-question prefetch (LLM + TTS) while the candidate answers
+        self.PREFETCH_ENABLED = os.getenv("PREFETCH_ENABLED", "false").lower() in ("1", "true", "yes")
+        # generations (restarts included) a turn may start; resets when the turn's question is taken
+        self.PREFETCH_BUDGET_PER_TURN = int(os.getenv("PREFETCH_BUDGET_PER_TURN", "4"))
+        self.PREFETCH_PURPOSES = [p.strip() for p in os.getenv("PREFETCH_PURPOSES", "next").split(",") if p.strip()]
+        # how long after turn_result an unfinished prefetch may still be pushed as next_question
+        self.PREFETCH_TAKE_TIMEOUT_SECONDS = float(os.getenv("PREFETCH_TAKE_TIMEOUT_SECONDS", "0.5"))
+        # faster-whisper model settings; WHISPER_WARMUP loads the model in each reprocessing worker at startup
+        self.WHISPER_MODEL = os.getenv("WHISPER_MODEL", "small")
+        self.WHISPER_COMPUTE_TYPE = os.getenv("WHISPER_COMPUTE_TYPE", "default")
+        self.WHISPER_CPU_THREADS = int(os.getenv("WHISPER_CPU_THREADS", "0"))
+        self.WHISPER_WARMUP = os.getenv("WHISPER_WARMUP", "false").lower() in ("1", "true", "yes")
+        # Long recordings: split at silences into ~WHISPER_SEGMENT_TARGET_SECONDS pieces transcribed in parallel
+        self.WHISPER_PARALLEL = os.getenv("WHISPER_PARALLEL", "false").lower() in ("1", "true", "yes")
+        self.WHISPER_PARALLEL_WORKERS = int(os.getenv("WHISPER_PARALLEL_WORKERS", "2"))
+        self.WHISPER_PARALLEL_MIN_SECONDS = float(os.getenv("WHISPER_PARALLEL_MIN_SECONDS", "120"))
+        self.WHISPER_SEGMENT_TARGET_SECONDS = float(os.getenv("WHISPER_SEGMENT_TARGET_SECONDS", "60"))
+        # Use Whisper's own word timings and report gaps of at least WHISPER_PAUSE_MIN_MS as pauses
+        self.WHISPER_WORD_TIMESTAMPS = os.getenv("WHISPER_WORD_TIMESTAMPS", "false").lower() in ("1", "true", "yes")
+        self.WHISPER_PAUSE_MIN_MS = int(os.getenv("WHISPER_PAUSE_MIN_MS", "500"))
 
 settings = Settings()
@@ -0,0 +1,10 @@
+"""Helpers shared by the `stats()` of the STT, TTS, storage and session layers."""
+
+
+def percentile(samples, pct: float) -> float:
+    """Nearest-rank `pct` percentile of `samples` (0.0 when there are none), rounded to 3 places."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    idx = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return round(ordered[idx], 3)
@@ -0,0 +1,206 @@
+"""Background job queue for slow, blocking work (e.g. Whisper reprocessing).
+
+Jobs run on a bounded worker pool (processes by default, so CPU-heavy transcription
+doesn't compete with the event loop for the GIL). `submit` returns immediately with a
+job id; callers poll `get` for status/result. The queue rejects new work with
+QueueFullError once `max_pending` jobs are queued or running (backpressure), and
+queued jobs can be cancelled. A job that is already running can't be interrupted:
+cancelling it only discards its result, and it counts as pending ("cancelling") until
+the worker is done with it.
+
+Job state lives in this process only.
+"""
+import asyncio
+import multiprocessing
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from ..core.config import settings
+
+
+class QueueFullError(Exception):
+    pass
+
+
+def _noop() -> None:
+    return None
+
+
+class Job:
+    def __init__(self, kind: str):
+        self.id = f"job-{uuid.uuid4().hex[:12]}"
+        self.kind = kind
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.cancelled = False
+        self.future: Optional[Future] = None
+        # set for jobs with an async prepare stage: the loop task, and the pool future once submitted
+        self.task: Optional[asyncio.Task] = None
+        self.inner: Optional[Future] = None
+        # caller data kept with the job (e.g. the session it belongs to)
+        self.meta: Dict[str, Any] = {}
+
+    def settled(self) -> bool:
+        """True once no worker is busy with the job any more."""
+        return self.future is not None and self.future.done() and (self.inner is None or self.inner.done())
+
+    @property
+    def status(self) -> str:
+        f = self.future
+        if self.cancelled or (f is not None and f.cancelled()):
+            return "cancelled" if self.settled() else "cancelling"
+        if f is None or not (f.running() or f.done()):
+            return "queued"
+        if not f.done():
+            return "running"
+        return "failed" if f.exception() is not None else "succeeded"
+
+    def to_dict(self) -> Dict[str, Any]:
+        status = self.status
+        out = {"job_id": self.id, "kind": self.kind, "status": status, "created_at": self.created_at, "finished_at": self.finished_at}
+        if status == "succeeded":
+            out["result"] = self.future.result()
+        elif status == "failed":
+            out["error"] = repr(self.future.exception())
+        return out
+
+
+class JobQueue:
+    def __init__(self, max_workers: int, max_pending: int, use_processes: bool = True, ttl_seconds: int = 3600,
+                 initializer: Optional[Callable] = None):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.ttl_seconds = ttl_seconds
+        if use_processes:
+            # spawn: don't fork a process that already runs the event loop and executor threads
+            self._pool = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn"), initializer=initializer)
+        else:
+            self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="jobs", initializer=initializer)
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+        self._rejected = 0
+
+    def _pending(self) -> int:
+        return sum(1 for j in self._jobs.values() if j.status in ("queued", "running", "cancelling"))
+
+    def _prune(self) -> None:
+        cutoff = time.time() - self.ttl_seconds
+        for job_id in [k for k, j in self._jobs.items() if j.finished_at and j.finished_at < cutoff]:
+            del self._jobs[job_id]
+
+    def submit(self, kind: str, fn: Callable, *args, prepare: Optional[Awaitable] = None,
+               discard: Optional[Callable[[Any], None]] = None) -> Job:
+        """Queue `fn(*args)`; `fn` must be a picklable module-level function.
+
+        With `prepare` (an awaitable run on the caller's event loop first, e.g. an async
+        download), `fn` is called as `fn(prepared, *args)`. `discard(prepared)` is called if
+        the job is cancelled or fails before `fn` gets to run.
+        """
+        with self._lock:
+            self._prune()
+            if self._pending() >= self.max_pending:
+                self._rejected += 1
+                if asyncio.iscoroutine(prepare):
+                    prepare.close()
+                raise QueueFullError(f"{kind} queue is full ({self.max_pending} pending)")
+            job = Job(kind)
+            self._jobs[job.id] = job
+            if prepare is None:
+                job.future = self._pool.submit(fn, *args)
+            else:
+                job.future = Future()
+                job.task = asyncio.get_running_loop().create_task(self._prepare_then_run(job, prepare, discard, fn, args))
+
+        def _done(_f, job=job):
+            job.finished_at = time.time()
+
+        job.future.add_done_callback(_done)
+        return job
+
+    async def _prepare_then_run(self, job: Job, prepare: Awaitable, discard, fn: Callable, args) -> None:
+        job.future.set_running_or_notify_cancel()
+        prepared = None
+        try:
+            prepared = await prepare
+            job.inner = self._pool.submit(fn, prepared, *args)
+            result = await asyncio.wrap_future(job.inner)
+        except BaseException as e:
+            never_ran = job.inner is None or job.inner.cancelled()
+            if never_ran and prepared is not None and discard is not None:
+                discard(prepared)
+            if not job.future.done():
+                job.future.set_exception(e)
+            return
+        job.future.set_result(result)
+
+    def prestart(self) -> None:
+        """Start every worker now (running the initializer) instead of on the first jobs."""
+        for _ in range(self.max_workers):
+            self._pool.submit(_noop)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a queued or running job.
+
+        Returns True if the job was stopped before its work started. Work already running in
+        the pool can't be stopped: the job is marked "cancelling" (its result will be
+        discarded) and False is returned, as for unknown or finished jobs.
+        """
+        job = self._jobs.get(job_id)
+        if job is None or job.status not in ("queued", "running"):
+            return False
+        if job.task is not None:
+            # still preparing, or waiting for a worker: stop the task; otherwise let it collect the result
+            stopped = job.inner is None or job.inner.cancel()
+            if stopped:
+                job.task.cancel()
+        else:
+            stopped = job.future.cancel()
+        job.cancelled = True
+        return stopped
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counts: Dict[str, int] = {}
+            for j in self._jobs.values():
+                counts[j.status] = counts.get(j.status, 0) + 1
+            return {"workers": self.max_workers, "max_pending": self.max_pending, "pending": self._pending(), "rejected": self._rejected, "jobs": counts}
+
+    def shutdown(self, wait: bool = False) -> None:
+        self._pool.shutdown(wait=wait, cancel_futures=True)
+
+
+_reprocess_queue: Optional[JobQueue] = None
+_queue_lock = threading.Lock()
+
+
+def get_reprocess_queue() -> JobQueue:
+    global _reprocess_queue
+    if _reprocess_queue is None:
+        with _queue_lock:
+            if _reprocess_queue is None:
+                initializer = None
+                if settings.WHISPER_WARMUP:
+                    from ..stt.whisper_worker import warmup
+                    initializer = warmup
+                _reprocess_queue = JobQueue(
+                    max_workers=settings.REPROCESS_WORKERS,
+                    max_pending=settings.REPROCESS_MAX_PENDING,
+                    use_processes=settings.REPROCESS_EXECUTOR == "process",
+                    ttl_seconds=settings.REPROCESS_JOB_TTL_SECONDS,
+                    initializer=initializer,
+                )
+    return _reprocess_queue
+
+
+def shutdown_queues() -> None:
+    global _reprocess_queue
+    with _queue_lock:
+        if _reprocess_queue is not None:
+            _reprocess_queue.shutdown()
+            _reprocess_queue = None
@@ -1,9 +1,13 @@
+import asyncio
+import logging
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from .api import router as api_router
 from .ws import router as ws_router
 from .tts.api import router as tts_router
 from fastapi.staticfiles import StaticFiles
+from .core.config import settings
 
 app = FastAPI(title="InterviewSense AI Backend")
 
@@ -22,6 +26,55 @@ app.include_router(api_router, prefix="/v1")
 app.include_router(ws_router, prefix="/v1")
 app.include_router(tts_router, prefix="/v1/tts")
 
+@app.on_event("startup")
+async def preload_stt_models():
+    # Optional: load the shared VOSK model before the first interview connects
+    if not settings.VOSK_PRELOAD:
+        return
+    try:
+        from .stt.vosk_registry import preload
+        path = await asyncio.to_thread(preload)
+        if path:
+            logging.getLogger(__name__).info("Preloaded VOSK model from %s", path)
+    except Exception:
+        logging.getLogger(__name__).exception("VOSK preload failed; models will load on first connection")
+
+@app.on_event("startup")
+async def warm_reprocess_workers():
+    # Optional: spin up reprocessing workers now so each loads its Whisper model before the first finalize
+    if not settings.WHISPER_WARMUP:
+        return
+    from .jobs.queue import get_reprocess_queue
+    get_reprocess_queue().prestart()
+
+@app.on_event("startup")
+async def start_storage_gc():
+    # Retention GC for STORAGE_DIR (when STORAGE_MAX_BYTES or STORAGE_RETENTION_SECONDS is set) and spooled session audio
+    from .storage.filesystem import start_gc
+    await asyncio.to_thread(start_gc)
+
+@app.on_event("startup")
+async def start_session_invalidation():
+    # Drop near-cached sessions when another process updates them (Redis only)
+    from .state.session_store import start_invalidation_listener
+    start_invalidation_listener()
+
+@app.on_event("shutdown")
+async def shutdown_workers():
+    from .stt.executor import shutdown_executor
+    from .jobs.queue import shutdown_queues
+    from .stt.audio_fetcher import close_client
+    from .storage.write_behind import shutdown_write_behind
+    from .storage.filesystem import stop_gc
+    from .state.session_store import close as close_session_store
+    shutdown_executor()
+    shutdown_queues()
+    await close_client()
+    await close_session_store()
+    # don't lose artifacts whose URLs were already handed out
+    await asyncio.to_thread(shutdown_write_behind, settings.PERSIST_SHUTDOWN_TIMEOUT_SECONDS)
+    stop_gc()
+
 @app.get("/")
 async def root():
     return {"status": "ok", "service": "InterviewSense AI Backend"}
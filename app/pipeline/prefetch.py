@@ -0,0 +1,166 @@
+"""Speculative prefetch of the next interview question and its TTS audio.
+
+While the candidate is answering, each session gets a background task per likely next
+question (`purpose` in PREFETCH_PURPOSES): it asks the LLM for the question and then
+synthesizes its audio through the shared TTS cache. When the turn is scored, the
+finished question is handed over with its audio already cached, so TTS is off the
+critical path between turns.
+
+A prefetch is seeded with the question being answered: the id passed to `start`, or
+else the id of the question handed over by the previous `take`. A `start` with a
+different seed than the running prefetch replaces it. Each turn may start at most
+PREFETCH_BUDGET_PER_TURN generations (restarts included); the budget resets when the
+turn's question is taken. A prefetch not finished by then is cancelled rather than kept
+for a later turn, and outstanding work is cancelled when the session closes (WebSocket
+disconnect or finalize).
+"""
+import asyncio
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+from ..core.config import settings
+from ..llm.agent import generate_question
+from ..state.session_store import get_session
+
+logger = logging.getLogger(__name__)
+
+
+class _SessionPrefetch:
+    def __init__(self):
+        self.tasks: Dict[str, asyncio.Task] = {}
+        # seed each running task was started with, and the seed for the next start
+        self.seeds: Dict[str, Optional[str]] = {}
+        self.seed: Optional[str] = None
+        self.spent = 0
+
+
+class Prefetcher:
+    def __init__(self, budget_per_turn: int, purposes: List[str]):
+        self.budget_per_turn = budget_per_turn
+        self.purposes = purposes
+        self._sessions: Dict[str, _SessionPrefetch] = {}
+        self._lock = threading.Lock()
+        self._stats = {"started": 0, "restarted": 0, "completed": 0, "failed": 0, "used": 0, "discarded": 0, "cancelled": 0,
+                       "over_budget": 0}
+
+    def _count(self, key: str, n: int = 1) -> None:
+        with self._lock:
+            self._stats[key] += n
+
+    def start(self, session_id: str, seed_question_id: Optional[str] = None) -> int:
+        """Begin prefetching candidates for the session's next turn.
+
+        A no-op for purposes already running with the same seed; without `seed_question_id`
+        the question handed over last is used. Returns the number of new prefetch tasks started.
+        """
+        state = self._sessions.setdefault(session_id, _SessionPrefetch())
+        if seed_question_id is not None:
+            state.seed = seed_question_id
+        seed = state.seed
+        started = 0
+        for purpose in self.purposes:
+            if purpose in state.tasks:
+                if state.seeds.get(purpose) == seed:
+                    continue
+                # started for another question than the one being answered
+                self._drop(state.tasks.pop(purpose))
+                self._count("restarted")
+            if state.spent >= self.budget_per_turn:
+                self._count("over_budget")
+                break
+            state.spent += 1
+            state.tasks[purpose] = asyncio.get_running_loop().create_task(self._prefetch(session_id, seed, purpose))
+            state.seeds[purpose] = seed
+            started += 1
+        self._count("started", started)
+        return started
+
+    async def _prefetch(self, session_id: str, seed_question_id: Optional[str], purpose: str) -> Dict[str, Any]:
+        try:
+            question = await generate_question(session_id, seed_question_id=seed_question_id, purpose=purpose)
+            sess = await get_session(session_id)
+            if not sess.get("client_tts"):
+                from ..tts.service import synthesize
+                question["tts"] = await synthesize(session_id, question["question_text"], sess.get("persona", "neutral"))
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self._count("failed")
+            logger.exception("prefetch of %s question failed for session %s", purpose, session_id)
+            raise
+        self._count("completed")
+        return question
+
+    async def take(self, session_id: str, purpose: str = "next", timeout: float = 0.0) -> Optional[Dict[str, Any]]:
+        """Hand over the prefetched question for `purpose` and end the turn's prefetching.
+
+        Waits up to `timeout` seconds for an unfinished prefetch; if it is still running
+        after that it is cancelled (its question would be stale by the next turn) and None
+        is returned. The turn's other candidates are dropped and its budget is reset.
+        """
+        state = self._sessions.get(session_id)
+        if state is None:
+            return None
+        state.spent = 0
+        for other in [p for p in state.tasks if p != purpose]:
+            self._drop(state.tasks.pop(other))
+        state.seeds.clear()
+        task = state.tasks.pop(purpose, None)
+        if task is None:
+            return None
+        if not task.done() and timeout > 0:
+            # shield: the timeout is handled below, not by wait_for cancelling the task
+            try:
+                await asyncio.wait_for(asyncio.shield(task), timeout)
+            except Exception:
+                pass
+        if not task.done():
+            self._drop(task)
+            return None
+        if task.cancelled() or task.exception() is not None:
+            return None
+        self._count("used")
+        question = task.result()
+        # the candidate answers this question next, so it seeds the next prefetch
+        state.seed = question.get("question_id")
+        return question
+
+    def _drop(self, task: asyncio.Task) -> None:
+        if task.done():
+            if not task.cancelled():
+                task.exception()  # mark retrieved; failures were already logged
+            self._count("discarded")
+        else:
+            task.cancel()
+            self._count("cancelled")
+
+    def cancel(self, session_id: str) -> int:
+        """Forget the session and cancel its outstanding prefetches. Returns how many were still running."""
+        state = self._sessions.pop(session_id, None)
+        if state is None:
+            return 0
+        running = sum(1 for t in state.tasks.values() if not t.done())
+        for task in state.tasks.values():
+            self._drop(task)
+        return running
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            out: Dict[str, Any] = dict(self._stats)
+        out["sessions"] = len(self._sessions)
+        out["inflight"] = sum(1 for s in list(self._sessions.values()) for t in list(s.tasks.values()) if not t.done())
+        return out
+
+
+_prefetcher: Optional[Prefetcher] = None
+
+
+def get_prefetcher() -> Optional[Prefetcher]:
+    """The process-wide prefetcher, or None when PREFETCH_ENABLED is off."""
+    global _prefetcher
+    if not settings.PREFETCH_ENABLED:
+        return None
+    if _prefetcher is None:
+        _prefetcher = Prefetcher(settings.PREFETCH_BUDGET_PER_TURN, settings.PREFETCH_PURPOSES)
+    return _prefetcher
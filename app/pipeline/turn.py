@@ -0,0 +1,127 @@
+"""Turn pipeline shared by the `finalize` and `sim_transcript` paths of `audio_ws`.
+
+Stages:
+  stt      -> final transcript + delivery metrics (required)
+  emotion  -> emotion events, only when the session opted in   } run concurrently
+  llm      -> component scores and feedback (required)         }
+  scoring  -> refined turn score from LLM scores, STT metrics and emotion events
+
+Emotion and LLM only depend on the transcript, so they run side by side; emotion
+events are folded in by the scoring stage. Each stage has its own timeout; optional
+stages fall back to an empty result and are listed under `degraded`.
+Per-stage wall-clock timings are reported in `timings_ms`.
+"""
+import asyncio
+import logging
+import time
+import uuid
+from typing import Any, Awaitable, Dict, List
+
+from ..core.config import settings
+from ..emotion.mock_emotion import analyze_transcript
+from ..llm.agent import process_answer
+from ..scoring.engine import compute_turn_score
+from ..state.session_store import get_session
+
+logger = logging.getLogger(__name__)
+
+
+class TurnPipelineError(Exception):
+    """A required stage (STT or LLM) failed or timed out."""
+    def __init__(self, stage: str, message: str):
+        super().__init__(message)
+        self.stage = stage
+
+
+async def _timed(name: str, aw: Awaitable, timeout: float, timings: Dict[str, float]):
+    start = time.perf_counter()
+    try:
+        return await asyncio.wait_for(aw, timeout=timeout)
+    finally:
+        timings[name] = round((time.perf_counter() - start) * 1000, 2)
+
+
+async def _optional(name: str, aw: Awaitable, timeout: float, fallback, timings: Dict[str, float], degraded: List[str]):
+    try:
+        return await _timed(name, aw, timeout, timings)
+    except asyncio.TimeoutError:
+        logger.warning("%s stage timed out after %.2fs; using fallback", name, timeout)
+    except Exception:
+        logger.exception("%s stage failed; using fallback", name)
+    degraded.append(name)
+    return fallback
+
+
+async def _no_emotion() -> List[Dict[str, Any]]:
+    # advisory note: emotion analysis skipped due to opt-out
+    return []
+
+
+async def run_turn(session_id: str, stt_stage: Awaitable[Dict[str, Any]], question_id: str | None = None,
+                   expected_topics: List[str] | None = None) -> Dict[str, Any]:
+    """Run one answer through the pipeline and return the `turn_result` payload.
+
+    `stt_stage` is an awaitable producing the STT finalize output. Raises
+    TurnPipelineError if the STT or LLM stage fails.
+    """
+    started = time.perf_counter()
+    timings: Dict[str, float] = {}
+    degraded: List[str] = []
+    # Minimal turn id for traceability
+    turn_id = f"t-{uuid.uuid4().hex[:8]}"
+
+    try:
+        stt_result = await _timed("stt", stt_stage, settings.TURN_STT_TIMEOUT_SECONDS, timings)
+    except Exception as e:
+        logger.exception("STT finalize failed")
+        raise TurnPipelineError("stt", "STT processing failed") from e
+    transcript = stt_result.get("transcript", "") or ""
+
+    # Check session opt-in for emotion analysis
+    sess = await get_session(session_id)
+    emotion_aw = analyze_transcript(transcript) if sess.get("emotion_opt_in") else _no_emotion()
+    llm_aw = process_answer(
+        session_id=session_id,
+        turn_id=turn_id,
+        transcript=transcript,
+        word_timestamps=stt_result.get("word_timestamps", []),
+        filler_words=stt_result.get("filler_words", []),
+        pause_segments=stt_result.get("pause_segments", []),
+        speech_rate_wpm=stt_result.get("speech_rate_wpm", 140),
+        audio_quality=stt_result.get("audio_quality", {}),
+        question_id=question_id,
+    )
+    emotion_events, llm_result = await asyncio.gather(
+        _optional("emotion", emotion_aw, settings.TURN_EMOTION_TIMEOUT_SECONDS, [], timings, degraded),
+        _timed("llm", llm_aw, settings.TURN_LLM_TIMEOUT_SECONDS, timings),
+        return_exceptions=True,
+    )
+    if isinstance(llm_result, BaseException):
+        logger.error("LLM processing failed", exc_info=llm_result)
+        raise TurnPipelineError("llm", "LLM processing failed") from llm_result
+
+    # Refine via scoring engine using STT metrics, expected topics, and emotion events
+    score_start = time.perf_counter()
+    try:
+        scoring = compute_turn_score(
+            llm_result.get("component_scores", {}),
+            stt_metrics=stt_result,
+            expected_topics=expected_topics or [],
+            emotion_events=emotion_events,
+        )
+    except Exception:
+        logger.exception("Scoring engine failed; returning LLM result only")
+        scoring = {}
+        degraded.append("scoring")
+    timings["scoring"] = round((time.perf_counter() - score_start) * 1000, 2)
+    timings["total"] = round((time.perf_counter() - started) * 1000, 2)
+
+    return {
+        "turn_id": turn_id,
+        "stt": stt_result,
+        "emotion_events": emotion_events,
+        "llm": llm_result,
+        "scoring": scoring,
+        "timings_ms": timings,
+        "degraded": degraded,
+    }
@@ -1,10 +1,29 @@
 """Session store with optional Redis backing. Falls back to in-memory store when REDIS_URL not set.
+
+All functions are coroutines. With Redis, a session is a hash (`session:<id>`) holding one
+JSON-encoded value per field, accessed through a pooled asyncio client
+(REDIS_MAX_CONNECTIONS). Updating a field is a single atomic HSET, so concurrent
+preference updates cannot overwrite each other, and multi-field writes go out in one
+round trip. The in-memory store has the same API.
+
+Reads through Redis are served from a per-process near-cache for up to
+SESSION_CACHE_TTL_SECONDS. Every write publishes the session id on
+SESSION_INVALIDATION_CHANNEL in the same round trip, and each process's listener
+(`start_invalidation_listener`) drops its copy, so a preference change is seen
+everywhere right away and the TTL only bounds staleness if a message is missed.
 """
+import asyncio
 import json
-import os
-from typing import Any
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Dict, Optional
 
 from ..core.config import settings
+from ..core.metrics import percentile
+
+logger = logging.getLogger(__name__)
 
 _sessions: dict = {}
 
@@ -12,58 +31,274 @@ _sessions: dict = {}
 _redis = None
 if settings.REDIS_URL:
     try:
-        import redis
-        _redis = redis.Redis.from_url(settings.REDIS_URL)
+        import redis.asyncio as aioredis
+        _redis = aioredis.Redis(
+            connection_pool=aioredis.ConnectionPool.from_url(settings.REDIS_URL, max_connections=settings.REDIS_MAX_CONNECTIONS)
+        )
     except Exception:
         _redis = None
 
 
-def _redis_get(key: str):
-    try:
-        v = _redis.get(key)
-        if not v:
-            return None
-        return json.loads(v)
-    except Exception:
-        return None
+class NearCache:
+    """Short-lived local copies of sessions read from Redis.
 
+    A generation counter, bumped by every invalidation, keeps a read that started before
+    an invalidation from storing its (possibly stale) result after it. Writers invalidate
+    both before and after their Redis write: a read that starts in between can still see
+    the old hash, and the second bump stops it from being cached. Writes are rare next to
+    reads, so the occasional skipped fill costs little.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int, sample_size: int = 1024):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._served_age_ms = deque(maxlen=sample_size)
+        self.listening = False
+        self._stats = {"hits": 0, "misses": 0, "expired": 0, "invalidations": 0, "resets": 0}
+
+    def get(self, session_id: str) -> Optional[dict]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is not None and now - entry[1] > self.ttl_seconds:
+                del self._entries[session_id]
+                self._stats["expired"] += 1
+                entry = None
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            self._stats["hits"] += 1
+            # how old the served copy was: the window in which a missed invalidation would show
+            self._served_age_ms.append((now - entry[1]) * 1000)
+            return dict(entry[0])
+
+    def generation(self) -> int:
+        with self._lock:
+            return self._generation
+
+    def put(self, session_id: str, value: dict, generation: int) -> None:
+        with self._lock:
+            if self._generation != generation:
+                return
+            self._entries[session_id] = (dict(value), time.monotonic())
+            self._entries.move_to_end(session_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, session_id: str) -> None:
+        with self._lock:
+            self._entries.pop(session_id, None)
+            self._generation += 1
+            self._stats["invalidations"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+            self._stats["resets"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            out: Dict[str, Any] = dict(self._stats)
+            ages = list(self._served_age_ms)
+            out["entries"] = len(self._entries)
+        lookups = out["hits"] + out["misses"]
+        out["hit_ratio"] = round(out["hits"] / lookups, 4) if lookups else 0.0
+        out["served_age_ms_p50"] = percentile(ages, 50)
+        out["served_age_ms_p99"] = percentile(ages, 99)
+        out["listening"] = self.listening
+        return out
+
+
+near_cache = NearCache(settings.SESSION_CACHE_TTL_SECONDS, settings.SESSION_CACHE_MAX_ENTRIES)
+_listener: Optional[asyncio.Task] = None
+
+
+def _cache_enabled() -> bool:
+    return _redis is not None and near_cache.ttl_seconds > 0
+
+
+def _key(session_id: str) -> str:
+    return f"session:{session_id}"
+
+
+def _encode(mapping: Dict[str, Any]) -> Dict[str, str]:
+    return {k: json.dumps(v) for k, v in mapping.items()}
+
+
+def _decode(raw: dict) -> dict:
+    out = {}
+    for k, v in raw.items():
+        if isinstance(k, bytes):
+            k = k.decode()
+        out[k] = json.loads(v)
+    return out
+
+
+def _wrong_type(e: Exception) -> bool:
+    return "WRONGTYPE" in str(e)
 
-def _redis_set(key: str, val: Any):
-    try:
-        _redis.set(key, json.dumps(val))
-        return True
-    except Exception:
-        return False
 
+async def _upgrade_legacy(key: str) -> dict:
+    # sessions written by older versions are one JSON string; rewrite them as a hash
+    raw = await _redis.get(key)
+    sess = json.loads(raw) if raw else {}
+    async with _redis.pipeline(transaction=True) as pipe:
+        pipe.delete(key)
+        if sess:
+            pipe.hset(key, mapping=_encode(sess))
+        await pipe.execute()
+    return sess
 
-def create_session(session_id: str, data: dict) -> None:
+
+async def create_session(session_id: str, data: dict) -> None:
     if _redis:
-        _redis_set(f"session:{session_id}", data)
+        near_cache.invalidate(session_id)
+        try:
+            async with _redis.pipeline(transaction=True) as pipe:
+                pipe.delete(_key(session_id))
+                if data:
+                    pipe.hset(_key(session_id), mapping=_encode(data))
+                pipe.publish(settings.SESSION_INVALIDATION_CHANNEL, session_id)
+                await pipe.execute()
+        except Exception:
+            pass
+        finally:
+            near_cache.invalidate(session_id)
     else:
-        _sessions[session_id] = data
+        _sessions[session_id] = dict(data)
+
+
+async def get_session(session_id: str) -> dict:
+    if _redis:
+        if _cache_enabled():
+            cached = near_cache.get(session_id)
+            if cached is not None:
+                return cached
+            generation = near_cache.generation()
+        try:
+            sess = _decode(await _redis.hgetall(_key(session_id)))
+            if _cache_enabled():
+                near_cache.put(session_id, sess, generation)
+            return sess
+        except Exception as e:
+            if _wrong_type(e):
+                try:
+                    return await _upgrade_legacy(_key(session_id))
+                except Exception:
+                    pass
+            return {}
+    return dict(_sessions.get(session_id, {}))
 
 
-def get_session(session_id: str) -> dict:
+async def get_session_field(session_id: str, key: str, default: Any = None) -> Any:
     if _redis:
-        val = _redis_get(f"session:{session_id}")
-        return val or {}
-    return _sessions.get(session_id, {})
+        if _cache_enabled():
+            return (await get_session(session_id)).get(key, default)
+        try:
+            raw = await _redis.hget(_key(session_id), key)
+        except Exception:
+            return (await get_session(session_id)).get(key, default)
+        return json.loads(raw) if raw is not None else default
+    return _sessions.get(session_id, {}).get(key, default)
 
 
-def set_session_field(session_id: str, key: str, value) -> None:
+async def set_session_fields(session_id: str, fields: Dict[str, Any]) -> None:
+    """Set several fields at once (one HSET with Redis); other fields are left untouched."""
+    if not fields:
+        return
     if _redis:
-        sess = _redis_get(f"session:{session_id}") or {}
-        sess[key] = value
-        _redis_set(f"session:{session_id}", sess)
+        near_cache.invalidate(session_id)
+        try:
+            for attempt in range(2):
+                try:
+                    async with _redis.pipeline(transaction=False) as pipe:
+                        pipe.hset(_key(session_id), mapping=_encode(fields))
+                        pipe.publish(settings.SESSION_INVALIDATION_CHANNEL, session_id)
+                        await pipe.execute()
+                    return
+                except Exception as e:
+                    if attempt or not _wrong_type(e):
+                        return
+                    try:
+                        await _upgrade_legacy(_key(session_id))
+                    except Exception:
+                        return
+        finally:
+            near_cache.invalidate(session_id)
     else:
-        _sessions.setdefault(session_id, {})[key] = value
+        _sessions.setdefault(session_id, {}).update(fields)
 
 
-def delete_session(session_id: str) -> None:
+async def set_session_field(session_id: str, key: str, value) -> None:
+    await set_session_fields(session_id, {key: value})
+
+
+async def delete_session(session_id: str) -> None:
     if _redis:
+        near_cache.invalidate(session_id)
         try:
-            _redis.delete(f"session:{session_id}")
+            async with _redis.pipeline(transaction=False) as pipe:
+                pipe.delete(_key(session_id))
+                pipe.publish(settings.SESSION_INVALIDATION_CHANNEL, session_id)
+                await pipe.execute()
         except Exception:
             pass
+        finally:
+            near_cache.invalidate(session_id)
     else:
         _sessions.pop(session_id, None)
+
+
+async def _listen(retry_seconds: float = 1.0) -> None:
+    while True:
+        pubsub = _redis.pubsub(ignore_subscribe_messages=True)
+        try:
+            await pubsub.subscribe(settings.SESSION_INVALIDATION_CHANNEL)
+            near_cache.listening = True
+            async for msg in pubsub.listen():
+                if msg.get("type") == "message":
+                    data = msg["data"]
+                    near_cache.invalidate(data.decode() if isinstance(data, bytes) else data)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.warning("session invalidation listener lost its subscription; retrying", exc_info=True)
+        finally:
+            # messages may have been missed while disconnected
+            near_cache.listening = False
+            near_cache.clear()
+            try:
+                await pubsub.aclose()
+            except Exception:
+                pass
+        await asyncio.sleep(retry_seconds)
+
+
+def start_invalidation_listener() -> Optional[asyncio.Task]:
+    """Subscribe to session invalidations on the running loop (no-op without Redis or near-cache)."""
+    global _listener
+    if not _cache_enabled():
+        return None
+    if _listener is None or _listener.done():
+        _listener = asyncio.get_running_loop().create_task(_listen())
+    return _listener
+
+
+async def close() -> None:
+    global _listener
+    if _listener is not None:
+        _listener.cancel()
+        try:
+            await _listener
+        except BaseException:
+            pass
+        _listener = None
+    if _redis is not None:
+        try:
+            await _redis.aclose()
+        except Exception:
+            pass
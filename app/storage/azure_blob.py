@@ -1,8 +1,15 @@
+import asyncio
 import base64
-from typing import Optional
+import functools
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, BinaryIO, Dict, Iterator, Optional, Tuple, Union
 from urllib.parse import quote_plus
 
 from ..core.config import settings
+from ..core.metrics import percentile
 import datetime
 
 # Lazy import for azure SDK to avoid hard dependency during lightweight runs
@@ -20,50 +27,120 @@ def _ensure_client():
     return _blob_service_client
 
 
-def generate_sas_url(container: str, blob_name: str, expiry_seconds: int = 3600) -> Optional[str]:
-    """Generate a read-only SAS URL for the given blob. Returns None on failure or if SDK not installed."""
-    if not settings.AZURE_STORAGE_CONNECTION_STRING:
+@functools.lru_cache(maxsize=8)
+def _account_credentials(conn_str: str) -> Tuple[Optional[str], Optional[str]]:
+    """(AccountName, AccountKey) from a connection string; parsed once per string."""
+    parts = dict(p.split('=', 1) for p in conn_str.split(';') if '=' in p)
+    return parts.get('AccountName'), parts.get('AccountKey')
+
+
+_sdk_sas = None
+
+
+def _sas_generator():
+    """(generate_blob_sas, BlobSasPermissions), preferring a module-level generate_blob_sas (tests/mocking)."""
+    global _sdk_sas
+    gen = globals().get('generate_blob_sas')
+    if gen:
+        return gen, None
+    if _sdk_sas is None:
+        from azure.storage.blob import generate_blob_sas as _gen, BlobSasPermissions as _perm
+        _sdk_sas = (_gen, _perm)
+    return _sdk_sas
+
+
+class SasCache:
+    """SAS URLs keyed by (container, blob, permission), reused while enough of their lifetime remains.
+
+    A cached URL is handed out again as long as at least `reuse_fraction` of the requested
+    TTL is left on it, so a popular blob is signed once per TTL window instead of per request.
+    """
+
+    def __init__(self, max_entries: int, reuse_fraction: float, sample_size: int = 1024):
+        self.max_entries = max_entries
+        self.reuse_fraction = reuse_fraction
+        self._entries: "OrderedDict[tuple, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._sign_ms = deque(maxlen=sample_size)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple, ttl_seconds: float) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            # a token issued for a longer TTL than asked for is not reused
+            if entry is not None and self.reuse_fraction * ttl_seconds <= entry[1] - now <= ttl_seconds:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+            return None
+
+    def put(self, key: tuple, url: str, expires_at: float, sign_ms: float) -> None:
+        with self._lock:
+            self._sign_ms.append(sign_ms)
+            self._entries[key] = (url, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            samples = list(self._sign_ms)
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "sign_ms_p50": percentile(samples, 50),
+                "sign_ms_p99": percentile(samples, 99),
+            }
+
+
+sas_cache = SasCache(settings.AZURE_SAS_CACHE_MAX_ENTRIES, settings.AZURE_SAS_REUSE_FRACTION)
+
+
+def generate_sas_url(container: str, blob_name: str, expiry_seconds: int = 3600, permission: str = "r") -> Optional[str]:
+    """Generate a SAS URL (read-only by default) for the given blob. Returns None on failure or if SDK not installed.
+
+    URLs are served from `sas_cache` while at least AZURE_SAS_REUSE_FRACTION of `expiry_seconds` remains.
+    """
+    cs = settings.AZURE_STORAGE_CONNECTION_STRING
+    if not cs:
         return None
+    key = (cs, container, blob_name, permission)
+    cached = sas_cache.get(key, expiry_seconds)
+    if cached:
+        return cached
     try:
-        # Parse connection string for account name & key
-        cs = settings.AZURE_STORAGE_CONNECTION_STRING
-        parts = dict(p.split('=', 1) for p in cs.split(';') if '=' in p)
-        account_name = parts.get('AccountName')
-        account_key = parts.get('AccountKey')
+        account_name, account_key = _account_credentials(cs)
         if not account_name or not account_key:
             return None
-        # Prefer a module-level generate_blob_sas if present (useful for tests/mocking)
-        gen = globals().get('generate_blob_sas')
-        BlobSasPermissions_local = None
-        if not gen:
-            try:
-                from azure.storage.blob import generate_blob_sas as _gen, BlobSasPermissions as _perm
-                gen = _gen
-                BlobSasPermissions_local = _perm
-            except Exception:
-                # SDK not available and no module-level generator -> cannot create SAS
-                return None
-
-        expiry = datetime.datetime.utcnow() + datetime.timedelta(seconds=expiry_seconds)
-        if BlobSasPermissions_local is not None:
-            sas = gen(
-                account_name=account_name,
-                container_name=container,
-                blob_name=blob_name,
-                account_key=account_key,
-                permission=BlobSasPermissions_local(read=True),
-                expiry=expiry,
-            )
-        else:
-            # Call generator without real permission object (test fakes can accept it)
-            sas = gen(
-                account_name=account_name,
-                container_name=container,
-                blob_name=blob_name,
-                account_key=account_key,
-                permission=None,
-                expiry=expiry,
-            )
+        try:
+            gen, BlobSasPermissions_local = _sas_generator()
+        except Exception:
+            # SDK not available and no module-level generator -> cannot create SAS
+            return None
+
+        started = time.perf_counter()
+        expires_at = time.time() + expiry_seconds
+        expiry = datetime.datetime.fromtimestamp(expires_at, tz=datetime.timezone.utc)
+        sas = gen(
+            account_name=account_name,
+            container_name=container,
+            blob_name=blob_name,
+            account_key=account_key,
+            # test fakes are called without a real permission object
+            permission=BlobSasPermissions_local.from_string(permission) if BlobSasPermissions_local is not None else None,
+            expiry=expiry,
+        )
+        sign_ms = (time.perf_counter() - started) * 1000
         if not sas:
             return None
         client = _ensure_client()
@@ -71,13 +148,111 @@ def generate_sas_url(container: str, blob_name: str, expiry_seconds: int = 3600)
             return None
         container_client = client.get_container_client(container)
         base_url = f"{container_client.url}/{quote_plus(blob_name)}"
-        return f"{base_url}?{sas}"
+        url = f"{base_url}?{sas}"
+        sas_cache.put(key, url, expires_at, sign_ms)
+        return url
     except Exception:
         return None
 
 
-def upload_base64(container: str, blob_name: str, b64: str) -> Optional[str]:
-    """Upload base64 audio to Azure Blob and return the blob URL (SAS-protected if configured).
+def blob_url(container: str, blob_name: str) -> Optional[str]:
+    """URL an uploaded blob will be served from (SAS-protected if AZURE_BLOB_SAS_TTL_SECONDS is set).
+
+    Computed locally, so it can be handed out before the upload has happened.
+    Returns None if Azure is not configured or the SDK is unavailable.
+    """
+    client = _ensure_client()
+    if client is None:
+        return None
+    try:
+        container_client = client.get_container_client(container)
+        base_url = f"{container_client.url}/{quote_plus(blob_name)}"
+    except Exception:
+        return None
+    # Optionally generate SAS if configured
+    try:
+        ttl = int(getattr(settings, "AZURE_BLOB_SAS_TTL_SECONDS", 0) or 0)
+    except Exception:
+        ttl = 0
+    if ttl > 0:
+        sas_url = generate_sas_url(container, blob_name, expiry_seconds=ttl)
+        if sas_url:
+            return sas_url
+    return base_url
+
+
+# Containers known to exist; create_container() is only attempted the first time a container is used
+_known_containers: set = set()
+_containers_lock = threading.Lock()
+
+
+def _ensure_container(client, container: str) -> None:
+    if container in _known_containers:
+        return
+    try:
+        client.get_container_client(container).create_container()
+    except Exception as e:
+        # 409 ContainerAlreadyExists is the normal case; anything else is left to the upload to report
+        if getattr(e, "status_code", None) != 409:
+            return
+    with _containers_lock:
+        _known_containers.add(container)
+
+
+def _blocks(data: Union[bytes, BinaryIO], block_size: int) -> Iterator[bytes]:
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        view = memoryview(data)
+        for start in range(0, len(view), block_size):
+            yield bytes(view[start:start + block_size])
+    else:
+        while True:
+            chunk = data.read(block_size)
+            if not chunk:
+                return
+            yield chunk
+
+
+def _upload(blob_client, data: Union[bytes, BinaryIO]) -> None:
+    """Single put for small payloads; larger ones are staged as blocks in parallel and committed.
+
+    File handles are read one block at a time, with at most 2 * AZURE_UPLOAD_CONCURRENCY
+    blocks in memory, so large files never have to be loaded whole.
+    """
+    block_size = settings.AZURE_UPLOAD_BLOCK_BYTES
+    blocks = _blocks(data, block_size)
+    first = next(blocks, b"")
+    second = next(blocks, None)
+    if second is None:
+        blob_client.upload_blob(first, overwrite=True)
+        return
+    from azure.storage.blob import BlobBlock
+    workers = max(1, settings.AZURE_UPLOAD_CONCURRENCY)
+    block_ids = []
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="azure-ul") as pool:
+        pending = set()
+
+        def stage(chunk: bytes) -> None:
+            nonlocal pending
+            # block IDs within a blob must all have the same length
+            block_id = f"{len(block_ids):08d}"
+            block_ids.append(block_id)
+            pending.add(pool.submit(blob_client.stage_block, block_id, chunk))
+            if len(pending) >= 2 * workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for f in done:
+                    f.result()
+
+        stage(first)
+        stage(second)
+        for chunk in blocks:
+            stage(chunk)
+        for f in pending:
+            f.result()
+    blob_client.commit_block_list([BlobBlock(block_id=b) for b in block_ids])
+
+
+def upload_bytes(container: str, blob_name: str, data: Union[bytes, BinaryIO]) -> Optional[str]:
+    """Upload raw bytes or a binary file handle to Azure Blob and return the blob URL (SAS-protected if configured).
     Returns None on error or if Azure not configured.
     """
     if not settings.AZURE_STORAGE_CONNECTION_STRING or not settings.AZURE_STORAGE_CONTAINER:
@@ -86,26 +261,30 @@ def upload_base64(container: str, blob_name: str, b64: str) -> Optional[str]:
     if client is None:
         return None
     try:
-        container_client = client.get_container_client(container)
-        # ensure container exists (idempotent)
-        try:
-            container_client.create_container()
-        except Exception:
-            pass
+        _ensure_container(client, container)
+        _upload(client.get_container_client(container).get_blob_client(blob_name), data)
+        # the upload proves the container exists, even when creating it was refused (e.g. 403)
+        with _containers_lock:
+            _known_containers.add(container)
+        return blob_url(container, blob_name)
+    except Exception:
+        # the container may have been deleted behind our back; check again next time
+        with _containers_lock:
+            _known_containers.discard(container)
+        return None
+
+
+async def upload_async(container: str, blob_name: str, data: Union[bytes, BinaryIO]) -> Optional[str]:
+    """`upload_bytes` without blocking the event loop (the block uploads run on worker threads)."""
+    return await asyncio.to_thread(upload_bytes, container, blob_name, data)
+
+
+def upload_base64(container: str, blob_name: str, b64: str) -> Optional[str]:
+    """Upload base64 audio to Azure Blob and return the blob URL (SAS-protected if configured).
+    Returns None on error or if Azure not configured.
+    """
+    try:
         blob_bytes = base64.b64decode(b64)
-        blob_client = container_client.get_blob_client(blob_name)
-        blob_client.upload_blob(blob_bytes, overwrite=True)
-        # Construct URL (SAS may be added depending on settings)
-        base_url = f"{container_client.url}/{quote_plus(blob_name)}"
-        # Optionally generate SAS if configured
-        try:
-            ttl = int(getattr(settings, "AZURE_BLOB_SAS_TTL_SECONDS", 0) or 0)
-        except Exception:
-            ttl = 0
-        if ttl > 0:
-            sas_url = generate_sas_url(container, blob_name, expiry_seconds=ttl)
-            if sas_url:
-                return sas_url
-        return base_url
     except Exception:
         return None
+    return upload_bytes(container, blob_name, blob_bytes)
@@ -1,32 +1,156 @@
 import os
 import base64
+import hashlib
+import tempfile
+import threading
 from pathlib import Path
-from typing import Dict
+from typing import Any, Dict, List, Optional
 
 from ..core.config import settings
+from .index import ArtifactIndex, RetentionGC
 
 STORAGE_DIR = Path(settings.STORAGE_DIR)
 STORAGE_DIR.mkdir(parents=True, exist_ok=True)
 
+# Files are spread over hash-named subdirectories (STORAGE_SHARD_DEPTH levels of 256)
+# so no single directory grows to millions of entries; the SQLite index records each one.
+INDEX_NAME = "index.sqlite3"
 
-def save_bytes(filename: str, b: bytes) -> str:
-    path = STORAGE_DIR / filename
-    with open(path, "wb") as f:
-        f.write(b)
-    return str(path.resolve())
+_index: Optional[ArtifactIndex] = None
+_index_lock = threading.Lock()
+_gc: Optional[RetentionGC] = None
 
 
-def save_base64(filename: str, b64: str) -> str:
+def get_index() -> ArtifactIndex:
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = ArtifactIndex(str(STORAGE_DIR / INDEX_NAME))
+    return _index
+
+
+def _check_name(filename: str) -> None:
+    if not filename or os.path.basename(filename) != filename or filename in (".", "..", INDEX_NAME):
+        raise ValueError(f"invalid artifact name: {filename!r}")
+
+
+def _is_legacy_artifact(name: str) -> bool:
+    # the index database (with its -wal/-shm and backups) and half-written temp files also sit in STORAGE_DIR
+    return not name.startswith(INDEX_NAME) and not name.endswith(".tmp")
+
+
+def _shard_dir(filename: str) -> Path:
+    digest = hashlib.sha256(filename.encode("utf-8")).hexdigest()
+    parts = [digest[2 * i:2 * i + 2] for i in range(settings.STORAGE_SHARD_DEPTH)]
+    return STORAGE_DIR.joinpath(*parts)
+
+
+def path_for(filename: str) -> str:
+    """Absolute path `filename` is (or will be) saved at."""
+    _check_name(filename)
+    return str((_shard_dir(filename) / filename).resolve())
+
+
+def save_bytes(filename: str, b: bytes, owner: Optional[str] = None) -> str:
+    path = Path(path_for(filename))
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(b)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+    get_index().add(filename, str(path), len(b), owner)
+    return str(path)
+
+
+def save_base64(filename: str, b64: str, owner: Optional[str] = None) -> str:
     b = base64.b64decode(b64)
-    return save_bytes(filename, b)
+    return save_bytes(filename, b, owner)
 
 
 def get_path(filename: str) -> str:
-    path = STORAGE_DIR / filename
+    path = Path(path_for(filename))
     if path.exists():
-        return str(path.resolve())
+        return str(path)
+    # files saved before sharding sit directly in STORAGE_DIR
+    legacy = STORAGE_DIR / filename
+    if _is_legacy_artifact(filename) and legacy.is_file():
+        return str(legacy.resolve())
     raise FileNotFoundError
 
 
-def list_files():
-    return [str(p) for p in STORAGE_DIR.iterdir() if p.is_file()]
+def delete(filename: str) -> bool:
+    try:
+        os.remove(get_path(filename))
+        removed = True
+    except FileNotFoundError:
+        removed = False
+    get_index().remove(filename)
+    return removed
+
+
+def list_files() -> List[str]:
+    return get_index().paths()
+
+
+def list_artifacts(owner: str, limit: int = 100, cursor: Optional[str] = None) -> Dict[str, Any]:
+    """A page of `owner`'s artifacts (name, size, created_at, ...) and the cursor for the next page."""
+    return get_index().list(owner, limit, cursor)
+
+
+def adopt_legacy_files() -> int:
+    """Move files saved flat in STORAGE_DIR (before sharding) into their shard and index them."""
+    moved = 0
+    with os.scandir(STORAGE_DIR) as it:
+        for entry in it:
+            if not entry.is_file() or not _is_legacy_artifact(entry.name):
+                continue
+            dest = Path(path_for(entry.name))
+            if dest.exists():
+                continue
+            dest.parent.mkdir(parents=True, exist_ok=True)
+            st = entry.stat()
+            os.replace(entry.path, dest)
+            get_index().add(entry.name, str(dest), st.st_size, None, st.st_mtime)
+            moved += 1
+    return moved
+
+
+def _sweepers() -> list:
+    sweepers = []
+    if settings.SESSION_AUDIO_RETENTION_SECONDS > 0:
+        from ..stt.session_audio import collect_expired
+        sweepers.append(collect_expired)
+    return sweepers
+
+
+def start_gc() -> Optional[RetentionGC]:
+    """Start the retention GC thread if a byte budget or retention period is configured.
+
+    Besides STORAGE_DIR's index it expires spooled session audio (SESSION_AUDIO_RETENTION_SECONDS).
+    """
+    global _gc
+    sweepers = _sweepers()
+    indexed = settings.STORAGE_MAX_BYTES > 0 or settings.STORAGE_RETENTION_SECONDS > 0
+    if not indexed and not sweepers:
+        return None
+    if _gc is None:
+        if indexed:
+            adopt_legacy_files()
+        _gc = RetentionGC(get_index(), settings.STORAGE_MAX_BYTES, settings.STORAGE_RETENTION_SECONDS, settings.STORAGE_GC_INTERVAL_SECONDS, sweepers)
+        _gc.start()
+    return _gc
+
+
+def stop_gc() -> None:
+    global _gc
+    if _gc is not None:
+        _gc.stop(timeout=5)
+        _gc = None
@@ -0,0 +1,248 @@
+"""SQLite index of the artifacts saved under STORAGE_DIR, and retention GC over it.
+
+Every file written through `app.storage.filesystem` is recorded with its size, owner
+(the interview session) and creation time, so listing a session's artifacts is an
+indexed query (paginated by a keyset cursor) instead of a directory scan, and the
+total footprint is known without walking the tree. The file count and byte total are
+kept as running counters (read once at startup and re-synced by every GC run, which
+also picks up other processes' writes), so reporting them costs no query.
+
+`RetentionGC` runs on a background thread every STORAGE_GC_INTERVAL_SECONDS and deletes
+the oldest artifacts until the total fits in STORAGE_MAX_BYTES, plus anything older
+than STORAGE_RETENTION_SECONDS when that is set. Stores kept outside the index register
+a sweeper with it, so their retention runs on the same schedule.
+"""
+import base64
+import contextlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS artifacts (
+        name TEXT PRIMARY KEY,
+        path TEXT NOT NULL,
+        size INTEGER NOT NULL,
+        owner TEXT,
+        created_at REAL NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS artifacts_owner ON artifacts (owner, created_at, name)",
+    "CREATE INDEX IF NOT EXISTS artifacts_created ON artifacts (created_at, name)",
+]
+
+_FIELDS = ("name", "path", "size", "owner", "created_at")
+
+
+def _encode_cursor(created_at: float, name: str) -> str:
+    return base64.urlsafe_b64encode(json.dumps([created_at, name]).encode()).decode("ascii")
+
+
+def _decode_cursor(cursor: str) -> Tuple[float, str]:
+    try:
+        created_at, name = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return float(created_at), str(name)
+    except Exception:
+        raise ValueError("invalid cursor")
+
+
+class ArtifactIndex:
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._stats = {"gc_runs": 0, "gc_deleted": 0, "gc_bytes_freed": 0}
+        with self._db() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            for stmt in _SCHEMA:
+                db.execute(stmt)
+        self._files, self._bytes = self.totals()
+
+    @contextlib.contextmanager
+    def _db(self):
+        db = sqlite3.connect(self.db_path, timeout=5)
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def _count(self, key: str, n: int = 1) -> None:
+        with self._lock:
+            self._stats[key] += n
+
+    def _adjust(self, files: int, size: int) -> None:
+        with self._lock:
+            self._files += files
+            self._bytes += size
+
+    def add(self, name: str, path: str, size: int, owner: Optional[str] = None, created_at: Optional[float] = None) -> None:
+        with self._db() as db:
+            old = db.execute("SELECT size FROM artifacts WHERE name = ?", (name,)).fetchone()
+            db.execute(
+                "INSERT OR REPLACE INTO artifacts (name, path, size, owner, created_at) VALUES (?, ?, ?, ?, ?)",
+                (name, path, size, owner, created_at if created_at is not None else time.time()),
+            )
+        self._adjust(0 if old else 1, size - (old[0] if old else 0))
+
+    def get(self, name: str) -> Optional[Dict[str, Any]]:
+        with self._db() as db:
+            row = db.execute("SELECT name, path, size, owner, created_at FROM artifacts WHERE name = ?", (name,)).fetchone()
+        return dict(zip(_FIELDS, row)) if row else None
+
+    def remove(self, name: str) -> None:
+        with self._db() as db:
+            old = db.execute("SELECT size FROM artifacts WHERE name = ?", (name,)).fetchone()
+            db.execute("DELETE FROM artifacts WHERE name = ?", (name,))
+        if old:
+            self._adjust(-1, -old[0])
+
+    def paths(self) -> List[str]:
+        with self._db() as db:
+            return [r[0] for r in db.execute("SELECT path FROM artifacts ORDER BY created_at, name")]
+
+    def list(self, owner: str, limit: int = 100, cursor: Optional[str] = None) -> Dict[str, Any]:
+        """One page of `owner`'s artifacts, oldest first; pass `next_cursor` back for the next page."""
+        query = "SELECT name, path, size, owner, created_at FROM artifacts WHERE owner = ?"
+        args: list = [owner]
+        if cursor:
+            created_at, name = _decode_cursor(cursor)
+            query += " AND (created_at > ? OR (created_at = ? AND name > ?))"
+            args += [created_at, created_at, name]
+        query += " ORDER BY created_at, name LIMIT ?"
+        args.append(limit + 1)
+        with self._db() as db:
+            rows = db.execute(query, args).fetchall()
+        items = [dict(zip(_FIELDS, r)) for r in rows[:limit]]
+        next_cursor = _encode_cursor(items[-1]["created_at"], items[-1]["name"]) if len(rows) > limit else None
+        return {"items": items, "next_cursor": next_cursor}
+
+    def totals(self) -> Tuple[int, int]:
+        with self._db() as db:
+            count, size = db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM artifacts").fetchone()
+        return int(count), int(size)
+
+    def _delete(self, db, rows) -> Tuple[int, int]:
+        """Delete files and their rows; returns (bytes freed, rows that could not be deleted)."""
+        freed, failed = 0, 0
+        for name, path, size in rows:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError:
+                logger.warning("could not delete artifact %s", path, exc_info=True)
+                failed += 1
+                continue
+            db.execute("DELETE FROM artifacts WHERE name = ?", (name,))
+            freed += size
+            self._count("gc_deleted")
+            self._adjust(-1, -size)
+        # commit per batch so writers are not blocked for the whole run
+        db.commit()
+        return freed, failed
+
+    def collect(self, max_bytes: int = 0, max_age_seconds: float = 0, batch: int = 500) -> int:
+        """Delete expired artifacts, then the oldest until the total is within `max_bytes` (0 = no cap).
+
+        Returns bytes freed.
+        """
+        freed = 0
+        with self._db() as db:
+            if max_age_seconds > 0:
+                cutoff = time.time() - max_age_seconds
+                while True:
+                    rows = db.execute(
+                        "SELECT name, path, size FROM artifacts WHERE created_at < ? ORDER BY created_at, name LIMIT ?", (cutoff, batch)
+                    ).fetchall()
+                    if not rows:
+                        break
+                    removed, failed = self._delete(db, rows)
+                    freed += removed
+                    if len(rows) < batch or failed == len(rows):
+                        break
+            if max_bytes > 0:
+                total = db.execute("SELECT COALESCE(SUM(size), 0) FROM artifacts").fetchone()[0]
+                offset = 0
+                while total > max_bytes:
+                    rows = db.execute(
+                        "SELECT name, path, size FROM artifacts ORDER BY created_at, name LIMIT ? OFFSET ?", (batch, offset)
+                    ).fetchall()
+                    if not rows:
+                        break
+                    picked, excess = [], total - max_bytes
+                    for row in rows:
+                        if excess <= 0:
+                            break
+                        picked.append(row)
+                        excess -= row[2]
+                    removed, failed = self._delete(db, picked)
+                    freed += removed
+                    total -= removed
+                    # rows whose files could not be deleted stay in the index; skip past them
+                    offset += failed
+            count, size = db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM artifacts").fetchone()
+        with self._lock:
+            self._files, self._bytes = int(count), int(size)
+        self._count("gc_runs")
+        self._count("gc_bytes_freed", freed)
+        return freed
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            out: Dict[str, Any] = dict(self._stats)
+            out["files"] = self._files
+            out["bytes"] = self._bytes
+        return out
+
+
+class RetentionGC:
+    """Background thread calling `ArtifactIndex.collect`, then each sweeper, every `interval` seconds.
+
+    A sweeper is a callable taking no arguments and returning the bytes it freed.
+    """
+
+    def __init__(self, index: ArtifactIndex, max_bytes: int, max_age_seconds: float, interval: float,
+                 sweepers: Sequence[Callable[[], int]] = ()):
+        self.index = index
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.interval = interval
+        self.sweepers = list(sweepers)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="storage-gc", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            if self.max_bytes > 0 or self.max_age_seconds > 0:
+                try:
+                    freed = self.index.collect(self.max_bytes, self.max_age_seconds)
+                    if freed:
+                        logger.info("storage GC freed %d bytes", freed)
+                except Exception:
+                    logger.exception("storage GC failed")
+            for sweep in self.sweepers:
+                try:
+                    freed = sweep()
+                    if freed:
+                        logger.info("storage GC freed %d bytes (%s)", freed, getattr(sweep, "__qualname__", sweep))
+                except Exception:
+                    logger.exception("storage GC sweeper failed")
+            self._stop.wait(self.interval)
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
@@ -0,0 +1,280 @@
+"""Write-behind persistence for generated artifacts (TTS audio).
+
+`persist_artifact` works out the artifact's final URL up front (Azure blob URL when
+Azure is configured, else the local storage path), queues the bytes and returns at
+once, so requests no longer wait on a file write or an Azure upload. A background
+thread hands each queued artifact to one of PERSIST_WORKERS threads as soon as one is
+free, so a slow upload holds up only its own worker; failed writes are retried with
+exponential backoff.
+
+Until an artifact is written its bytes stay in memory and `read_artifact` serves
+them from there. At most PERSIST_MAX_PENDING_BYTES are held that way; past that,
+`persist_artifact` writes inline instead of queueing. An Azure upload that still fails
+after its retries is written to local storage instead; an artifact that cannot be
+written anywhere is remembered as failed and its `on_failure` callback runs, so
+callers that handed out its URL can react. `shutdown_write_behind` (app shutdown)
+flushes everything queued.
+"""
+import functools
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindQueue:
+    def __init__(self, workers: int = 4, max_retries: int = 3, backoff_seconds: float = 0.2,
+                 max_pending_bytes: int = 0, max_failed: int = 10000):
+        self.workers = workers
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.max_pending_bytes = max_pending_bytes
+        self.max_failed = max_failed
+        # key -> (data, writer, version, fallback, on_failure); entries stay until written so reads can be served from memory
+        self._pending: "OrderedDict[str, tuple]" = OrderedDict()
+        self._pending_bytes = 0
+        self._inflight: set = set()
+        # keys that could not be written anywhere (most recent last)
+        self._failed: "OrderedDict[str, None]" = OrderedDict()
+        self._version = 0
+        self._cond = threading.Condition()
+        self._closed = False
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="persist")
+        self._thread: Optional[threading.Thread] = None
+        self._stats = {"enqueued": 0, "written": 0, "failed": 0, "retries": 0, "fallback_writes": 0, "rejected": 0,
+                       "memory_reads": 0}
+
+    def submit(self, key: str, data: bytes, writer: Callable[[str, bytes], Any],
+               fallback: Optional[Callable[[str, bytes], Any]] = None,
+               on_failure: Optional[Callable[[str], None]] = None) -> bool:
+        """Queue `writer(key, data)`; a writer signals failure by raising or returning None.
+
+        If every attempt fails, `fallback(key, data)` is tried once, then `on_failure(key)`
+        is called. Returns False, without queueing, when the bytes would take the queue
+        past `max_pending_bytes`; the caller should write them itself.
+        """
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("write-behind queue is shut down")
+            previous = self._pending.get(key)
+            replaced = len(previous[0]) if previous is not None else 0
+            if self.max_pending_bytes > 0 and self._pending_bytes - replaced + len(data) > self.max_pending_bytes:
+                self._stats["rejected"] += 1
+                return False
+            self._version += 1
+            self._pending[key] = (data, writer, self._version, fallback, on_failure)
+            self._pending.move_to_end(key)
+            self._pending_bytes += len(data) - replaced
+            self._failed.pop(key, None)
+            self._stats["enqueued"] += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+            return True
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Bytes of a queued, not yet written artifact."""
+        with self._cond:
+            item = self._pending.get(key)
+            if item is None:
+                return None
+            self._stats["memory_reads"] += 1
+            return item[0]
+
+    def is_pending(self, key: str) -> bool:
+        with self._cond:
+            return key in self._pending
+
+    def failed(self, key: str) -> bool:
+        """True if `key` was given up on (not written by its writer or its fallback)."""
+        with self._cond:
+            return key in self._failed
+
+    def _write(self, key: str, data: bytes, writer) -> bool:
+        for attempt in range(self.max_retries + 1):
+            try:
+                if writer(key, data) is not None:
+                    return True
+            except Exception:
+                logger.warning("persisting %s failed (attempt %d)", key, attempt + 1, exc_info=True)
+            if attempt < self.max_retries:
+                with self._cond:
+                    self._stats["retries"] += 1
+                time.sleep(self.backoff_seconds * (2 ** attempt))
+        return False
+
+    def _fallback(self, key: str, data: bytes, fallback) -> bool:
+        try:
+            return fallback(key, data) is not None
+        except Exception:
+            logger.warning("fallback write of %s failed", key, exc_info=True)
+            return False
+
+    def _next(self) -> Optional[str]:
+        # oldest queued key not already being written; only a few are in flight, so this stops early
+        for key in self._pending:
+            if key not in self._inflight:
+                return key
+        return None
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while True:
+                    key = self._next() if len(self._inflight) < self.workers else None
+                    if key is not None:
+                        break
+                    if self._closed and not self._pending:
+                        return
+                    self._cond.wait()
+                self._inflight.add(key)
+                item = self._pending[key]
+            try:
+                self._pool.submit(self._process, key, item)
+            except RuntimeError:
+                # pool shut down after a flush timed out; what is left stays unwritten
+                with self._cond:
+                    self._inflight.discard(key)
+                return
+
+    def _process(self, key: str, item: tuple) -> None:
+        data, writer, version, fallback, on_failure = item
+        ok = self._write(key, data, writer)
+        fell_back = False
+        if not ok and fallback is not None:
+            ok = fell_back = self._fallback(key, data, fallback)
+        if (fell_back or not ok) and on_failure is not None:
+            # the URL handed out for this artifact does not point at it; report before flush() can return
+            try:
+                on_failure(key)
+            except Exception:
+                logger.exception("on_failure callback for %s failed", key)
+        with self._cond:
+            self._inflight.discard(key)
+            if fell_back:
+                self._stats["fallback_writes"] += 1
+            self._stats["written" if ok else "failed"] += 1
+            if not ok:
+                logger.error("giving up on persisting %s after %d attempts", key, self.max_retries + 1)
+                self._failed[key] = None
+                while len(self._failed) > self.max_failed:
+                    self._failed.popitem(last=False)
+            # a newer submit for the same key stays queued
+            current = self._pending.get(key)
+            if current is not None and current[2] == version:
+                del self._pending[key]
+                self._pending_bytes -= len(data)
+            self._cond.notify_all()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until everything queued so far is written (or given up on). Returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._pending:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            return True
+
+    def shutdown(self, timeout: Optional[float] = None) -> bool:
+        flushed = self.flush(timeout)
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._pool.shutdown(wait=False)
+        return flushed
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            out: Dict[str, Any] = dict(self._stats)
+            out["pending"] = len(self._pending)
+            out["pending_bytes"] = self._pending_bytes
+            out["inflight"] = len(self._inflight)
+        out["max_pending_bytes"] = self.max_pending_bytes
+        return out
+
+
+_queue: Optional[WriteBehindQueue] = None
+_queue_lock = threading.Lock()
+
+
+def get_write_behind() -> WriteBehindQueue:
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                _queue = WriteBehindQueue(
+                    workers=settings.PERSIST_WORKERS,
+                    max_retries=settings.PERSIST_MAX_RETRIES,
+                    backoff_seconds=settings.PERSIST_RETRY_BACKOFF_SECONDS,
+                    max_pending_bytes=settings.PERSIST_MAX_PENDING_BYTES,
+                )
+    return _queue
+
+
+def shutdown_write_behind(timeout: Optional[float] = None) -> None:
+    global _queue
+    with _queue_lock:
+        if _queue is not None:
+            if not _queue.shutdown(timeout):
+                logger.error("write-behind queue shut down with %d artifacts unwritten", _queue.stats()["pending"])
+            _queue = None
+
+
+def _write_azure(key: str, data: bytes):
+    from . import azure_blob
+    return azure_blob.upload_bytes(settings.AZURE_STORAGE_CONTAINER, key, data)
+
+
+def _write_file(key: str, data: bytes, owner: Optional[str] = None):
+    from . import filesystem
+    return filesystem.save_bytes(key, data, owner)
+
+
+def persist_artifact(filename: str, data: bytes, owner: Optional[str] = None,
+                     on_failure: Optional[Callable[[str], None]] = None) -> str:
+    """Persist `data` as `filename` and return its URL (Azure blob if configured, else local storage).
+
+    `owner` (the session id) is recorded in the local storage index. With
+    PERSIST_WRITE_BEHIND the write is queued and the URL returned immediately (unless the
+    queue is over PERSIST_MAX_PENDING_BYTES, in which case the write happens inline);
+    `on_failure(filename)` is called if the returned URL ends up not holding the bytes.
+    """
+    url, writer, fallback = None, functools.partial(_write_file, owner=owner), None
+    if settings.AZURE_STORAGE_CONNECTION_STRING and settings.AZURE_STORAGE_CONTAINER:
+        from . import azure_blob
+        url = azure_blob.blob_url(settings.AZURE_STORAGE_CONTAINER, filename)
+        if url:
+            writer, fallback = _write_azure, writer
+    if url is None:
+        from . import filesystem
+        url = filesystem.path_for(filename)
+    if settings.PERSIST_WRITE_BEHIND and get_write_behind().submit(filename, data, writer, fallback, on_failure):
+        return url
+    if writer(filename, data) is None:
+        raise IOError(f"persisting {filename} failed")
+    return url
+
+
+def read_artifact(filename: str) -> Optional[bytes]:
+    """Bytes of an artifact: from the write-behind queue if not yet flushed, else from local storage."""
+    if _queue is not None:
+        data = _queue.get(filename)
+        if data is not None:
+            return data
+    from . import filesystem
+    try:
+        with open(filesystem.get_path(filename), "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
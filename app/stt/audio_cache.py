@@ -0,0 +1,207 @@
+"""On-disk cache for fetched interview audio.
+
+Retries, re-finalize and admin re-scores fetch the same `audio_url` again and again.
+Bodies are stored content-addressed (`blobs/<sha256><ext>`, so identical audio behind
+different URLs is kept once) and indexed by URL in SQLite together with the ETag /
+Last-Modified validators the server sent. A repeat fetch is a conditional GET: a 304
+serves the cached blob without transferring the body. Total blob size is bounded by
+AUDIO_CACHE_MAX_BYTES with least-recently-used eviction.
+
+Callers get a hard link to the blob (a copy if linking fails) that they own and may
+delete, so eviction never pulls a file out from under a queued reprocessing job.
+"""
+import asyncio
+import contextlib
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from ..core.config import settings
+from .audio_fetcher import fetch_audio, fetch_audio_to_path, _guess_suffix_from_url
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    url TEXT PRIMARY KEY,
+    sha256 TEXT NOT NULL,
+    suffix TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    last_access REAL NOT NULL
+)
+"""
+
+
+class AudioCache:
+    def __init__(self, root: str, max_bytes: int):
+        # absolute: checked-out paths are handed to reprocessing workers
+        root = os.path.abspath(root)
+        self.root = root
+        self.max_bytes = max_bytes
+        self.blob_dir = os.path.join(root, "blobs")
+        self.tmp_dir = os.path.join(root, "tmp")
+        os.makedirs(self.blob_dir, exist_ok=True)
+        os.makedirs(self.tmp_dir, exist_ok=True)
+        self._db_path = os.path.join(root, "index.sqlite3")
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "revalidated": 0, "evictions": 0, "bytes_saved": 0}
+        with self._db() as db:
+            db.execute(_SCHEMA)
+
+    @contextlib.contextmanager
+    def _db(self):
+        db = sqlite3.connect(self._db_path, timeout=5)
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def _count(self, key: str, n: int = 1) -> None:
+        with self._lock:
+            self._stats[key] += n
+
+    def blob_path(self, sha256: str, suffix: str) -> str:
+        return os.path.join(self.blob_dir, f"{sha256}{suffix}")
+
+    def lookup(self, url: str) -> Optional[Dict[str, Any]]:
+        with self._db() as db:
+            row = db.execute("SELECT sha256, suffix, size, etag, last_modified FROM entries WHERE url = ?", (url,)).fetchone()
+        if row is None:
+            return None
+        entry = dict(zip(("sha256", "suffix", "size", "etag", "last_modified"), row))
+        if not os.path.exists(self.blob_path(entry["sha256"], entry["suffix"])):
+            return None
+        return entry
+
+    def touch(self, url: str, etag: Optional[str] = None, last_modified: Optional[str] = None) -> None:
+        with self._db() as db:
+            db.execute(
+                "UPDATE entries SET last_access = ?, etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified) WHERE url = ?",
+                (time.time(), etag, last_modified, url),
+            )
+
+    def store(self, url: str, spooled_path: str, sha256: str, size: int, etag: Optional[str], last_modified: Optional[str]) -> Dict[str, Any]:
+        """Move a downloaded file into the blob store and index it under `url`."""
+        suffix = _guess_suffix_from_url(url)
+        dest = self.blob_path(sha256, suffix)
+        if os.path.exists(dest):
+            # same content already cached (other URL or unchanged re-upload)
+            os.remove(spooled_path)
+        else:
+            os.replace(spooled_path, dest)
+        with self._db() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO entries (url, sha256, suffix, size, etag, last_modified, last_access) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, sha256, suffix, size, etag, last_modified, time.time()),
+            )
+        self.evict(keep=sha256)
+        return {"sha256": sha256, "suffix": suffix, "size": size, "etag": etag, "last_modified": last_modified}
+
+    def total_bytes(self) -> int:
+        with self._db() as db:
+            row = db.execute("SELECT COALESCE(SUM(size), 0) FROM (SELECT sha256, MAX(size) AS size FROM entries GROUP BY sha256)").fetchone()
+        return int(row[0])
+
+    def evict(self, keep: Optional[str] = None) -> int:
+        """Drop least-recently-used blobs until the cache fits in `max_bytes`. Returns blobs evicted."""
+        evicted = 0
+        with self._db() as db:
+            rows = db.execute(
+                "SELECT sha256, MAX(suffix), MAX(size), MAX(last_access) AS la FROM entries GROUP BY sha256 ORDER BY la ASC"
+            ).fetchall()
+            total = sum(r[2] for r in rows)
+            for sha256, suffix, size, _ in rows:
+                if total <= self.max_bytes:
+                    break
+                if sha256 == keep:
+                    continue
+                db.execute("DELETE FROM entries WHERE sha256 = ?", (sha256,))
+                try:
+                    os.remove(self.blob_path(sha256, suffix))
+                except FileNotFoundError:
+                    pass
+                total -= size
+                evicted += 1
+        if evicted:
+            self._count("evictions", evicted)
+        return evicted
+
+    def checkout(self, entry: Dict[str, Any]) -> str:
+        """Return a private path to the cached blob.
+
+        The path is in `tmp_dir`, on the same filesystem as the blobs, so it is a hard link;
+        the copy is only a fallback for filesystems without links.
+        """
+        src = self.blob_path(entry["sha256"], entry["suffix"])
+        fd, dest = tempfile.mkstemp(suffix=entry["suffix"], dir=self.tmp_dir)
+        os.close(fd)
+        os.remove(dest)
+        try:
+            os.link(src, dest)
+        except OSError:
+            shutil.copyfile(src, dest)
+        return dest
+
+    async def fetch(self, url: str, **kwargs) -> str:
+        """Fetch `url` through the cache and return a private local path the caller deletes.
+
+        Index (sqlite) and blob file operations run on worker threads, off the event loop.
+        """
+        entry = await asyncio.to_thread(self.lookup, url)
+        headers = {}
+        if entry:
+            if entry["etag"]:
+                headers["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                headers["If-Modified-Since"] = entry["last_modified"]
+        if entry and headers:
+            fetched = await fetch_audio(url, headers=headers, memory_threshold=0, spool_dir=self.tmp_dir, **kwargs)
+            if fetched.not_modified:
+                await asyncio.to_thread(self.touch, url, fetched.etag, fetched.last_modified)
+                self._count("hits")
+                self._count("revalidated")
+                self._count("bytes_saved", entry["size"])
+                return await asyncio.to_thread(self.checkout, entry)
+        else:
+            fetched = await fetch_audio(url, memory_threshold=0, spool_dir=self.tmp_dir, **kwargs)
+        self._count("misses")
+        entry = await asyncio.to_thread(self.store, url, fetched.path, fetched.sha256, fetched.size, fetched.etag, fetched.last_modified)
+        return await asyncio.to_thread(self.checkout, entry)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            out = dict(self._stats)
+        lookups = out["hits"] + out["misses"]
+        out["hit_ratio"] = round(out["hits"] / lookups, 4) if lookups else 0.0
+        out["bytes"] = self.total_bytes()
+        out["max_bytes"] = self.max_bytes
+        return out
+
+
+_cache: Optional[AudioCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_audio_cache() -> Optional[AudioCache]:
+    """The process-wide cache, or None when AUDIO_CACHE_MAX_BYTES is 0 (disabled)."""
+    global _cache
+    if settings.AUDIO_CACHE_MAX_BYTES <= 0:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = AudioCache(settings.AUDIO_CACHE_DIR, settings.AUDIO_CACHE_MAX_BYTES)
+    return _cache
+
+
+async def fetch_audio_cached(audio_url: str, **kwargs) -> str:
+    """Fetch remote audio to a local path the caller owns, going through the cache for http(s)."""
+    cache = get_audio_cache()
+    if cache is None or not audio_url.startswith(("http://", "https://")):
+        return await fetch_audio_to_path(audio_url, **kwargs)
+    return await cache.fetch(audio_url, **kwargs)
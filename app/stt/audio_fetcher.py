@@ -1,11 +1,34 @@
+"""Fetch remote interview audio for reprocessing.
+
+HTTP(S) downloads use an asyncio-native `httpx.AsyncClient` shared by the whole
+process (one per event loop), so keep-alive connections to the same storage host
+are reused across finalize calls. Retries back off with `asyncio.sleep` and bodies
+are streamed chunk by chunk: into memory when the response is small enough, else
+straight to a temp file. azure:// blobs go through a cached BlobServiceClient and
+large ones are downloaded as parallel byte ranges.
+
+`fetch_audio_to_temp` is kept as a synchronous wrapper for callers outside the loop.
+"""
+import asyncio
+import hashlib
+import io
 import os
 import tempfile
-import time
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
 
-import requests
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
+import httpx
+
+from ..core.config import settings
+
+RETRY_STATUSES = (500, 502, 503, 504)
+
+# One pooled client per event loop (httpx connections are bound to the loop that opened them)
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+_azure_clients: dict = {}
+_azure_lock = threading.Lock()
 
 
 def _guess_suffix_from_url(url: str) -> str:
@@ -17,100 +40,257 @@ def _guess_suffix_from_url(url: str) -> str:
     return '.wav'
 
 
-def _create_session_with_retries(retries: int = 3, backoff_factor: float = 0.5, status_forcelist=(500, 502, 503, 504)) -> requests.Session:
-    session = requests.Session()
-    retry = Retry(
-        total=retries,
-        backoff_factor=backoff_factor,
-        status_forcelist=status_forcelist,
-        allowed_methods=["GET", "HEAD"]
-    )
-    adapter = HTTPAdapter(max_retries=retry)
-    session.mount("http://", adapter)
-    session.mount("https://", adapter)
-    return session
+def get_client() -> httpx.AsyncClient:
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=settings.FETCH_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.FETCH_MAX_CONNECTIONS,
+                keepalive_expiry=settings.FETCH_KEEPALIVE_SECONDS,
+            ),
+            follow_redirects=True,
+        )
+        _clients[loop] = client
+    return client
 
 
-def fetch_audio_to_temp(audio_url: str, timeout: int = 10, max_bytes: int = 50 * 1024 * 1024, retries: int = 3, backoff_factor: float = 0.5) -> Optional[str]:
-    """Fetch an audio URL or cloud identifier to a local temp file.
+async def close_client() -> None:
+    """Close the current loop's pooled client (call on shutdown)."""
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
 
-    Supports:
-      - http(s) URLs (including signed URLs/SAS)
-      - s3://bucket/key (uses boto3 if available)
-      - azure://container/blob_path (uses azure-storage-blob if available)
 
-    Retries with exponential backoff on transient HTTP errors.
+class FetchedAudio:
+    """A downloaded audio body, held in memory (`data`) or spooled to a temp file (`path`).
 
-    Returns a local file path on success, raises an Exception on failure.
+    `not_modified` is set (with no body) when a conditional request got 304.
     """
-    # S3 support removed. This project uses HTTP(S) and Azure blob sources for remote audio.
-    # If S3 support is required in the future, reintroduce it behind an optional dependency and tests.
+    def __init__(self, path: Optional[str] = None, data: Optional[bytes] = None, size: int = 0, content_type: Optional[str] = None,
+                 sha256: Optional[str] = None, etag: Optional[str] = None, last_modified: Optional[str] = None, not_modified: bool = False):
+        self.path = path
+        self.data = data
+        self.size = size
+        self.content_type = content_type
+        self.sha256 = sha256
+        self.etag = etag
+        self.last_modified = last_modified
+        self.not_modified = not_modified
 
-    # Azure direct fetch helper (azure://container/blob_path)
-    if audio_url.startswith('azure://'):
-        try:
-            from azure.storage.blob import BlobServiceClient
-        except Exception as e:
-            raise RuntimeError("azure-storage-blob required for azure:// downloads") from e
-        _, _, rest = audio_url.partition('azure://')
-        parts = rest.split('/', 1)
-        if len(parts) != 2:
-            raise ValueError('azure URL must be of form azure://container/blob')
-        container, blob = parts[0], parts[1]
-        client = BlobServiceClient.from_connection_string(os.getenv('AZURE_STORAGE_CONNECTION_STRING'))
-        container_client = client.get_container_client(container)
-        blob_client = container_client.get_blob_client(blob)
-        downloader = blob_client.download_blob()
-        tmp = tempfile.NamedTemporaryFile(delete=False, suffix=_guess_suffix_from_url(blob))
-        try:
-            total = 0
-            stream = downloader.chunks()
-            for chunk in stream:
-                total += len(chunk)
-                if total > max_bytes:
-                    raise ValueError('downloaded data exceeds max_bytes limit')
-                tmp.write(chunk)
-            tmp.flush()
-            return tmp.name
-        finally:
+    def open(self):
+        return open(self.path, 'rb') if self.path else io.BytesIO(self.data or b'')
+
+    def cleanup(self) -> None:
+        if self.path:
+            try:
+                os.remove(self.path)
+            except Exception:
+                pass
+
+
+class _Sink:
+    """Collects a streamed body: in memory up to `memory_limit` bytes, then on disk (in `spool_dir`)."""
+    def __init__(self, suffix: str, memory_limit: int, max_bytes: int, spool_dir: Optional[str] = None):
+        self.suffix = suffix
+        self.memory_limit = memory_limit
+        self.max_bytes = max_bytes
+        self.spool_dir = spool_dir
+        self.total = 0
+        self.hasher = hashlib.sha256()
+        self._buf: Optional[bytearray] = bytearray() if memory_limit > 0 else None
+        self._file = None
+        self.path: Optional[str] = None
+
+    def _to_disk(self):
+        tmp = tempfile.NamedTemporaryFile(delete=False, suffix=self.suffix, dir=self.spool_dir)
+        self._file, self.path = tmp, tmp.name
+        if self._buf:
+            tmp.write(self._buf)
+        self._buf = None
+
+    def write(self, chunk: bytes) -> None:
+        self.total += len(chunk)
+        if self.total > self.max_bytes:
+            raise ValueError("downloaded data exceeds max_bytes limit")
+        self.hasher.update(chunk)
+        if self._buf is not None and self.total > self.memory_limit:
+            self._to_disk()
+        if self._buf is not None:
+            self._buf += chunk
+        else:
+            if self._file is None:
+                self._to_disk()
+            self._file.write(chunk)
+
+    def finish(self, headers) -> FetchedAudio:
+        meta = dict(size=self.total, content_type=headers.get("content-type"), sha256=self.hasher.hexdigest(),
+                    etag=headers.get("etag"), last_modified=headers.get("last-modified"))
+        if self._file is None and self._buf is None:
+            # empty body with memory buffering disabled
+            self._to_disk()
+        if self._file is not None:
+            self._file.close()
+            return FetchedAudio(path=self.path, **meta)
+        return FetchedAudio(data=bytes(self._buf), **meta)
+
+    def discard(self) -> None:
+        if self._file is not None:
             try:
-                tmp.close()
+                self._file.close()
+                os.remove(self.path)
             except Exception:
                 pass
 
-    # Otherwise, treat as an HTTP/HTTPS resource and use requests with retries
-    session = _create_session_with_retries(retries=retries, backoff_factor=backoff_factor)
 
+async def _fetch_http(audio_url: str, timeout: float, max_bytes: int, retries: int, backoff_factor: float, memory_threshold: int,
+                      headers: Optional[dict] = None, spool_dir: Optional[str] = None) -> FetchedAudio:
+    client = get_client()
+    suffix = _guess_suffix_from_url(audio_url)
     attempt = 0
-    last_exc = None
-    while attempt <= retries:
+    while True:
+        sink = None
         try:
-            resp = session.get(audio_url, stream=True, timeout=timeout)
-            resp.raise_for_status()
-            suffix = _guess_suffix_from_url(audio_url)
-            tmp = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
-            total = 0
-            try:
-                for chunk in resp.iter_content(chunk_size=8192):
-                    if not chunk:
-                        continue
-                    total += len(chunk)
-                    if total > max_bytes:
-                        raise ValueError("downloaded data exceeds max_bytes limit")
-                    tmp.write(chunk)
-                tmp.flush()
-                return tmp.name
-            finally:
-                try:
-                    tmp.close()
-                except Exception:
-                    pass
-        except Exception as e:
-            last_exc = e
-            if attempt == retries:
-                break
-            sleep = backoff_factor * (2 ** attempt)
-            time.sleep(sleep)
+            async with client.stream("GET", audio_url, timeout=timeout, headers=headers) as resp:
+                if resp.status_code == 304:
+                    return FetchedAudio(not_modified=True, etag=resp.headers.get("etag"), last_modified=resp.headers.get("last-modified"))
+                if resp.status_code in RETRY_STATUSES:
+                    raise httpx.HTTPStatusError(f"server error {resp.status_code}", request=resp.request, response=resp)
+                resp.raise_for_status()
+                length = resp.headers.get("content-length")
+                if length is not None and int(length) > max_bytes:
+                    raise ValueError("downloaded data exceeds max_bytes limit")
+                # Small bodies stay in memory; unknown/large ones go to disk as they stream
+                memory_limit = memory_threshold if length is not None and int(length) <= memory_threshold else 0
+                sink = _Sink(suffix, memory_limit, max_bytes, spool_dir)
+                async for chunk in resp.aiter_bytes(settings.FETCH_CHUNK_BYTES):
+                    sink.write(chunk)
+                return sink.finish(resp.headers)
+        except (httpx.TransportError, httpx.HTTPStatusError) as e:
+            if sink is not None:
+                sink.discard()
+            retryable = isinstance(e, httpx.TransportError) or e.response.status_code in RETRY_STATUSES
+            if not retryable or attempt >= retries:
+                raise
+            await asyncio.sleep(backoff_factor * (2 ** attempt))
             attempt += 1
-    raise last_exc
+        except BaseException:
+            if sink is not None:
+                sink.discard()
+            raise
+
+
+def _azure_client(conn_str: Optional[str]):
+    """One BlobServiceClient per connection string, reused across downloads (and its HTTP pool with it)."""
+    with _azure_lock:
+        client = _azure_clients.get(conn_str)
+        if client is None:
+            from azure.storage.blob import BlobServiceClient
+            client = _azure_clients[conn_str] = BlobServiceClient.from_connection_string(conn_str)
+        return client
+
+
+def _azure_ranges(size: int, range_bytes: int):
+    return [(start, min(range_bytes, size - start)) for start in range(0, size, range_bytes)]
+
+
+def _fetch_azure(audio_url: str, max_bytes: int) -> str:
+    """Download an azure:// blob into a preallocated temp file.
+
+    Blobs larger than AZURE_DOWNLOAD_RANGE_BYTES are fetched as byte ranges on up to
+    AZURE_DOWNLOAD_CONCURRENCY threads, each written in place at its offset.
+    """
+    try:
+        import azure.storage.blob  # noqa: F401
+        from azure.core import MatchConditions
+    except Exception as e:
+        raise RuntimeError("azure-storage-blob required for azure:// downloads") from e
+    _, _, rest = audio_url.partition('azure://')
+    parts = rest.split('/', 1)
+    if len(parts) != 2:
+        raise ValueError('azure URL must be of form azure://container/blob')
+    container, blob = parts[0], parts[1]
+    client = _azure_client(os.getenv('AZURE_STORAGE_CONNECTION_STRING'))
+    blob_client = client.get_container_client(container).get_blob_client(blob)
+    props = blob_client.get_blob_properties()
+    size = props.size
+    if size > max_bytes:
+        raise ValueError('downloaded data exceeds max_bytes limit')
+
+    fd, path = tempfile.mkstemp(suffix=_guess_suffix_from_url(blob))
+    try:
+        os.ftruncate(fd, size)
 
+        def _fetch_range(rng):
+            offset, length = rng
+            # pinned to the version we sized: an overwrite mid-download fails (412) instead of mixing versions
+            data = blob_client.download_blob(
+                offset=offset, length=length, etag=props.etag, match_condition=MatchConditions.IfNotModified
+            ).readall()
+            if len(data) != length:
+                raise IOError(f'short read for range {offset}+{length}: got {len(data)} bytes')
+            os.pwrite(fd, data, offset)
+
+        ranges = _azure_ranges(size, settings.AZURE_DOWNLOAD_RANGE_BYTES)
+        if len(ranges) <= 1:
+            for rng in ranges:
+                _fetch_range(rng)
+        else:
+            workers = min(settings.AZURE_DOWNLOAD_CONCURRENCY, len(ranges))
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="azure-dl") as pool:
+                # list() re-raises the first failed range
+                list(pool.map(_fetch_range, ranges))
+        return path
+    except BaseException:
+        os.close(fd)
+        fd = None
+        os.remove(path)
+        raise
+    finally:
+        if fd is not None:
+            os.close(fd)
+
+
+async def fetch_audio(audio_url: str, timeout: float = 10, max_bytes: int = 50 * 1024 * 1024, retries: int = 3,
+                      backoff_factor: float = 0.5, memory_threshold: int | None = None, headers: Optional[dict] = None,
+                      spool_dir: Optional[str] = None) -> FetchedAudio:
+    """Fetch an audio URL or cloud identifier without blocking the event loop.
+
+    Supports:
+      - http(s) URLs (including signed URLs/SAS)
+      - azure://container/blob_path (uses azure-storage-blob if available)
+
+    Bodies whose Content-Length is at most `memory_threshold` (default
+    FETCH_MEMORY_THRESHOLD_BYTES) are returned in memory; anything else is spooled to a
+    temp file (in `spool_dir` if given). Retries with exponential backoff on connection
+    errors and 5xx responses. Extra request `headers` (e.g. If-None-Match) are sent as-is;
+    a 304 answer comes back as `not_modified`.
+    """
+    if memory_threshold is None:
+        memory_threshold = settings.FETCH_MEMORY_THRESHOLD_BYTES
+    # S3 support removed. This project uses HTTP(S) and Azure blob sources for remote audio.
+    if audio_url.startswith('azure://'):
+        path = await asyncio.to_thread(_fetch_azure, audio_url, max_bytes)
+        return FetchedAudio(path=path, size=os.path.getsize(path))
+    return await _fetch_http(audio_url, timeout, max_bytes, retries, backoff_factor, memory_threshold, headers, spool_dir)
+
+
+async def fetch_audio_to_path(audio_url: str, **kwargs) -> str:
+    """Like `fetch_audio`, but always returns a local temp file path (caller deletes it)."""
+    kwargs["memory_threshold"] = 0
+    fetched = await fetch_audio(audio_url, **kwargs)
+    return fetched.path
+
+
+def fetch_audio_to_temp(audio_url: str, timeout: int = 10, max_bytes: int = 50 * 1024 * 1024, retries: int = 3, backoff_factor: float = 0.5) -> Optional[str]:
+    """Synchronous wrapper around `fetch_audio_to_path` for code running outside an event loop.
+
+    Returns a local file path on success, raises an Exception on failure.
+    """
+    async def _run():
+        try:
+            return await fetch_audio_to_path(audio_url, timeout=timeout, max_bytes=max_bytes, retries=retries, backoff_factor=backoff_factor)
+        finally:
+            await close_client()
+    return asyncio.run(_run())
@@ -0,0 +1,115 @@
+"""Bounded executor for blocking speech recognition calls.
+
+VOSK's `AcceptWaveform`/`FinalResult` are CPU-bound C calls (they release the GIL),
+so running them inline in `audio_ws` stalls every other WebSocket and REST request
+on the worker. Recognition work is submitted here instead: a fixed-size thread pool
+shared by the process, with a per-session `SessionLane` that keeps each session's
+chunks in order and allows at most one queued call per session.
+"""
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from ..core.config import settings
+from ..core.metrics import percentile
+
+
+class RecognitionExecutor:
+    def __init__(self, max_workers: int, sample_size: int = 1024):
+        self.max_workers = max_workers
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="stt-rec")
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._completed = 0
+        self._wait_ms = deque(maxlen=sample_size)
+        self._run_ms = deque(maxlen=sample_size)
+
+    async def run(self, fn: Callable, *args) -> Any:
+        """Run `fn(*args)` on the pool and await its result without blocking the loop."""
+        submitted = time.perf_counter()
+        with self._lock:
+            self._queued += 1
+
+        def _task():
+            started = time.perf_counter()
+            with self._lock:
+                self._queued -= 1
+                self._running += 1
+                self._wait_ms.append((started - submitted) * 1000)
+            try:
+                return fn(*args)
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    self._completed += 1
+                    self._run_ms.append((time.perf_counter() - started) * 1000)
+
+        cf = self._pool.submit(_task)
+        try:
+            return await asyncio.wrap_future(cf)
+        except asyncio.CancelledError:
+            # task never started: it won't decrement the queue itself
+            if cf.cancel():
+                with self._lock:
+                    self._queued -= 1
+            raise
+
+    def lane(self) -> "SessionLane":
+        return SessionLane(self)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            wait = list(self._wait_ms)
+            run = list(self._run_ms)
+            return {
+                "workers": self.max_workers,
+                "queue_depth": self._queued,
+                "in_flight": self._running,
+                "completed": self._completed,
+                "wait_ms_p50": percentile(wait, 50),
+                "wait_ms_p99": percentile(wait, 99),
+                "wait_ms_max": round(max(wait), 3) if wait else 0.0,
+                "run_ms_p50": percentile(run, 50),
+                "run_ms_p99": percentile(run, 99),
+            }
+
+    def shutdown(self, wait: bool = False) -> None:
+        self._pool.shutdown(wait=wait, cancel_futures=True)
+
+
+class SessionLane:
+    """Serializes one session's recognition calls so chunks are decoded in arrival order."""
+    def __init__(self, executor: RecognitionExecutor):
+        self._executor = executor
+        self._lock = asyncio.Lock()
+
+    async def run(self, fn: Callable, *args) -> Any:
+        async with self._lock:
+            return await self._executor.run(fn, *args)
+
+
+_executor: Optional[RecognitionExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> RecognitionExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                workers = settings.STT_EXECUTOR_WORKERS or os.cpu_count() or 1
+                _executor = RecognitionExecutor(max_workers=workers)
+    return _executor
+
+
+def shutdown_executor() -> None:
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown()
+            _executor = None
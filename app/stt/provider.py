@@ -1,11 +1,15 @@
+import json
 from typing import Dict, Any, List
-import os
-from pathlib import Path
+
+from .executor import get_executor
 
 class BaseSTTProvider:
     async def process_chunk(self, chunk_bytes: bytes):
         raise NotImplementedError
 
+    def get_partial(self) -> str:
+        return ""
+
     async def finalize(self) -> Dict[str, Any]:
         raise NotImplementedError
 
@@ -17,8 +21,11 @@ class MockSTTProvider(BaseSTTProvider):
         self._impl = MockSTT(session_id=session_id)
 
     async def process_chunk(self, chunk_bytes: bytes):
-        # chunk_bytes for mock is actually a UTF-8 string for tests
-        await self._impl.process_chunk(chunk_bytes.decode('utf-8'))
+        # chunk_bytes for mock is actually UTF-8 text for tests
+        await self._impl.process_chunk(chunk_bytes.decode('utf-8', errors='ignore'))
+
+    def get_partial(self) -> str:
+        return self._impl.get_partial()
 
     async def finalize(self) -> Dict[str, Any]:
         return await self._impl.finalize()
@@ -31,40 +38,46 @@ class VoskSTTProvider(BaseSTTProvider):
     """
     def __init__(self, session_id: str, model_path: str = None):
         try:
-            from vosk import Model, KaldiRecognizer
+            from vosk import KaldiRecognizer
         except Exception as e:
             raise ImportError("VOSK not installed or not available") from e
+        from .vosk_registry import resolve_model_path, get_model
         self.session_id = session_id
-        # Determine model path: explicit > env VOSK_MODEL_PATH > ./models/vosk-model-small-*
-        if not model_path:
-            model_path = os.getenv("VOSK_MODEL_PATH")
-            if not model_path:
-                # try to auto-detect
-                base = Path("models")
-                if base.exists():
-                    for child in base.iterdir():
-                        if child.is_dir() and child.name.startswith("vosk-model"):
-                            model_path = str(child)
-                            break
+        model_path = resolve_model_path(model_path)
         if not model_path:
             raise ValueError("No VOSK model found. Set VOSK_MODEL_PATH or download a model into ./models")
-        self.model = Model(model_path)
+        # Model is shared process-wide; only the recognizer is per-session
+        self.model = get_model(model_path)
         self.rec = KaldiRecognizer(self.model, 16000)
-        self._chunks = []
+        self.rec.SetWords(True)
+        # words of utterances the recognizer already closed; FinalResult only covers the open one
+        self._words = []
+        self._partial = ""
+        # Recognition runs on the shared bounded executor, in this session's chunk order
+        self._lane = get_executor().lane()
 
     async def process_chunk(self, chunk_bytes: bytes):
-        # push raw audio bytes to recognizer
-        self._chunks.append(chunk_bytes)
-        self.rec.AcceptWaveform(chunk_bytes)
+        # push raw audio bytes to recognizer (the WebSocket spools the audio itself)
+        self._partial = await self._lane.run(self._accept, chunk_bytes)
+
+    def get_partial(self) -> str:
+        return self._partial
+
+    def _accept(self, chunk_bytes: bytes) -> str:
+        # runs on an executor thread
+        if self.rec.AcceptWaveform(chunk_bytes):
+            done = json.loads(self.rec.Result())
+            self._words.extend(done.get('result', []))
+            return done.get('text', '')
+        return json.loads(self.rec.PartialResult()).get('partial', '')
 
     async def finalize(self) -> Dict[str, Any]:
         # produce final result
-        import json
-        final = self.rec.FinalResult()
+        final = await self._lane.run(self.rec.FinalResult)
         # Vosk returns JSON; convert to our schema as best effort
         try:
             parsed = json.loads(final)
-            words = parsed.get('result', [])
+            words = self._words + parsed.get('result', [])
             transcript = ' '.join(w['word'] for w in words)
             word_timestamps = [{'word': w['word'], 'start_ms': int(w['start']*1000), 'end_ms': int(w['end']*1000), 'confidence': w.get('conf', 1.0)} for w in words]
             # simple filler detection
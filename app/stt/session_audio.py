@@ -0,0 +1,207 @@
+"""Server-side copy of each session's streamed audio.
+
+With SESSION_AUDIO_SPOOL on, the STT WebSocket opens a per-session WAV file under
+SESSION_AUDIO_DIR on the first audio frame and appends every PCM frame (16 kHz mono
+s16le) to it, so `/sessions/finalize` can run Whisper reprocessing without the client
+uploading the recording again. Frames are buffered in memory and written
+SESSION_AUDIO_FLUSH_BYTES at a time (the socket does the writes off the event loop),
+keeping per-connection memory flat however long the interview runs.
+
+A spool is held under an exclusive lock while open, so a second connection for the same
+session cannot interleave its frames; it is deleted after a successful reprocess, and
+`collect_expired` (run by the storage GC) removes spools idle for
+SESSION_AUDIO_RETENTION_SECONDS.
+
+Readers memory-map the file and take the PCM after the 44-byte header, sized from the
+file length. That means a spool still being written (header sizes not yet patched)
+reads correctly from another process.
+"""
+import fcntl
+import logging
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+from typing import Optional
+
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+SAMPLE_RATE = 16000
+HEADER_BYTES = 44
+
+
+def _wav_header(data_bytes: int) -> bytes:
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF", 36 + data_bytes, b"WAVE",
+        b"fmt ", 16, 1, 1, SAMPLE_RATE, SAMPLE_RATE * 2, 2, 16,
+        b"data", data_bytes,
+    )
+
+
+def spool_file(session_id: str) -> str:
+    safe = re.sub(r"[^A-Za-z0-9_-]", "_", session_id)
+    return os.path.join(settings.SESSION_AUDIO_DIR, f"{safe}.wav")
+
+
+class SpoolBusyError(Exception):
+    """Another connection is already recording this session."""
+
+
+def _lock(f) -> bool:
+    try:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except BlockingIOError:
+        return False
+
+
+class SessionAudioSpool:
+    """Append-only WAV writer for one session (a reconnect keeps appending to the same file).
+
+    Opening takes an exclusive lock on the file and raises SpoolBusyError if another
+    connection holds it. `append` only buffers; `flush`, `sync` and `close` do the I/O.
+    """
+
+    def __init__(self, session_id: str, max_bytes: Optional[int] = None, flush_bytes: Optional[int] = None):
+        self.session_id = session_id
+        self.path = spool_file(session_id)
+        self.max_bytes = settings.SESSION_AUDIO_MAX_BYTES if max_bytes is None else max_bytes
+        self.flush_bytes = settings.SESSION_AUDIO_FLUSH_BYTES if flush_bytes is None else flush_bytes
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        # not "ab": on Linux, pwrite to an O_APPEND descriptor ignores the offset, and sync() rewrites the header in place
+        self._f = os.fdopen(os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644), "r+b")
+        if not _lock(self._f):
+            self._f.close()
+            raise SpoolBusyError(f"session {session_id} audio is already being recorded")
+        if self._f.seek(0, os.SEEK_END) == 0:
+            self._f.write(_wav_header(0))
+            self._f.flush()
+        self.data_bytes = self._f.tell() - HEADER_BYTES
+        self.dropped_bytes = 0
+        self._buffer = bytearray()
+        # flush/sync/close may race when a close on a worker thread is abandoned and redone
+        self._io_lock = threading.Lock()
+
+    def append(self, chunk: bytes) -> bool:
+        """Buffer a frame; returns True once enough is buffered that the caller should `flush`."""
+        room = self.max_bytes - self.data_bytes - len(self._buffer)
+        if room < len(chunk):
+            # over the per-session cap: keep what fits, count the rest
+            self.dropped_bytes += len(chunk) - max(room, 0)
+            chunk = chunk[:max(room, 0)]
+        self._buffer += chunk
+        return len(self._buffer) >= self.flush_bytes
+
+    def flush(self) -> None:
+        """Write buffered frames to the file."""
+        with self._io_lock:
+            self._flush()
+
+    def _flush(self) -> None:
+        if self._f.closed or not self._buffer:
+            return
+        buffered, self._buffer = self._buffer, bytearray()
+        self._f.write(buffered)
+        self.data_bytes += len(buffered)
+        self._f.flush()
+
+    def _sync(self) -> None:
+        if self._f.closed:
+            return
+        self._flush()
+        os.pwrite(self._f.fileno(), _wav_header(self.data_bytes), 0)
+
+    def sync(self) -> None:
+        """Flush buffered frames and patch the WAV header sizes."""
+        with self._io_lock:
+            self._sync()
+
+    def close(self) -> None:
+        with self._io_lock:
+            if not self._f.closed:
+                self._sync()
+                # closing releases the lock
+                self._f.close()
+
+
+def spool_path(session_id: str) -> Optional[str]:
+    """Path of the session's spooled audio, or None if nothing was recorded."""
+    path = spool_file(session_id)
+    try:
+        return path if os.path.getsize(path) > HEADER_BYTES else None
+    except OSError:
+        return None
+
+
+def is_spool(path: str) -> bool:
+    return os.path.dirname(os.path.abspath(path)) == os.path.abspath(settings.SESSION_AUDIO_DIR)
+
+
+def read_pcm(path: str):
+    """Memory-map a spool and return its samples as 16 kHz mono float32 (numpy)."""
+    import numpy as np
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        n = (size - HEADER_BYTES) // 2
+        if n <= 0:
+            return np.zeros(0, dtype=np.float32)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            pcm = np.frombuffer(mm, dtype="<i2", count=n, offset=HEADER_BYTES)
+            # the float conversion copies, so the map can be closed afterwards
+            audio = pcm.astype(np.float32) / 32768.0
+            del pcm
+    return audio
+
+
+def remove_file(path: str) -> bool:
+    """Delete a spool unless a connection is still recording it. Returns True if deleted."""
+    try:
+        with open(path, "rb") as f:
+            if not _lock(f):
+                return False
+            os.remove(path)
+        return True
+    except FileNotFoundError:
+        return False
+
+
+def remove(session_id: str) -> bool:
+    return remove_file(spool_file(session_id))
+
+
+def collect_expired(max_age_seconds: Optional[float] = None) -> int:
+    """Delete spools not written to for `max_age_seconds` (default SESSION_AUDIO_RETENTION_SECONDS).
+
+    Spools a connection is still recording are skipped. Returns bytes freed.
+    """
+    max_age = settings.SESSION_AUDIO_RETENTION_SECONDS if max_age_seconds is None else max_age_seconds
+    if max_age <= 0:
+        return 0
+    cutoff = time.time() - max_age
+    freed = 0
+    try:
+        entries = list(os.scandir(settings.SESSION_AUDIO_DIR))
+    except FileNotFoundError:
+        return 0
+    for entry in entries:
+        if not entry.name.endswith(".wav"):
+            continue
+        try:
+            st = entry.stat()
+            if st.st_mtime >= cutoff:
+                continue
+            with open(entry.path, "rb") as f:
+                if not _lock(f):
+                    continue
+                os.remove(entry.path)
+            freed += st.st_size
+        except FileNotFoundError:
+            continue
+        except OSError:
+            logger.warning("could not delete session audio %s", entry.path, exc_info=True)
+    return freed
@@ -0,0 +1,76 @@
+"""Process-wide registry of loaded VOSK models.
+
+A VOSK model is hundreds of MB on disk, so each model path is loaded once per
+process and shared by every session. Sessions only create a lightweight
+`KaldiRecognizer` against the shared model (recognizers are per-stream state;
+the model itself is read-only and safe to share).
+"""
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional
+
+_models: Dict[str, object] = {}
+_lock = threading.Lock()
+
+
+def resolve_model_path(model_path: Optional[str] = None) -> Optional[str]:
+    """Determine model path: explicit > env VOSK_MODEL_PATH > ./models/vosk-model-*"""
+    if model_path:
+        return model_path
+    model_path = os.getenv("VOSK_MODEL_PATH")
+    if model_path:
+        return model_path
+    base = Path("models")
+    if base.exists():
+        for child in base.iterdir():
+            if child.is_dir() and child.name.startswith("vosk-model"):
+                return str(child)
+    return None
+
+
+def get_model(model_path: str):
+    """Return the shared `vosk.Model` for `model_path`, loading it on first use.
+
+    Raises ImportError if VOSK isn't installed.
+    """
+    key = os.path.abspath(model_path)
+    model = _models.get(key)
+    if model is not None:
+        return model
+    with _lock:
+        # another thread may have finished loading while we waited
+        model = _models.get(key)
+        if model is None:
+            try:
+                from vosk import Model
+            except Exception as e:
+                raise ImportError("VOSK not installed or not available") from e
+            model = Model(model_path)
+            _models[key] = model
+    return model
+
+
+def preload(model_path: Optional[str] = None) -> Optional[str]:
+    """Load the resolved model into the registry (e.g. at app startup).
+
+    Returns the model path that was loaded, or None if no model could be found.
+    """
+    path = resolve_model_path(model_path)
+    if not path:
+        return None
+    get_model(path)
+    return path
+
+
+def unload(model_path: Optional[str] = None) -> None:
+    """Drop one model (or all models when `model_path` is None) from the registry."""
+    with _lock:
+        if model_path is None:
+            _models.clear()
+        else:
+            _models.pop(os.path.abspath(model_path), None)
+
+
+def loaded_models() -> List[str]:
+    return list(_models.keys())
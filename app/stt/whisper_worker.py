@@ -4,63 +4,369 @@
 
 The worker returns a dict compatible with STT finalize outputs: transcript, word_timestamps, filler_words, pause_segments, speech_rate_wpm
 """
-from typing import Dict, Any
+from typing import Dict, Any, List, Tuple
 import os
+import threading
 
+from ..core.config import settings
 
-def reprocess_audio(audio_path: str, model_name: str = "small") -> Dict[str, Any]:
+# Loaded models, per process, keyed by (model_name, compute_type, cpu_threads).
+# Loading dominates reprocessing time for short answers, so models are reused across jobs.
+_models: Dict[Tuple[str, str, int], Any] = {}
+_models_lock = threading.Lock()
+
+
+def _model_key(model_name: str | None, compute_type: str | None, cpu_threads: int | None) -> Tuple[str, str, int]:
+    return (
+        model_name or settings.WHISPER_MODEL,
+        compute_type or settings.WHISPER_COMPUTE_TYPE,
+        settings.WHISPER_CPU_THREADS if cpu_threads is None else cpu_threads,
+    )
+
+
+def get_model(model_name: str | None = None, compute_type: str | None = None, cpu_threads: int | None = None):
+    """Return a cached faster-whisper model, loading it on first use.
+
+    Raises ImportError if faster-whisper is not installed.
+    """
+    key = _model_key(model_name, compute_type, cpu_threads)
+    model = _models.get(key)
+    if model is not None:
+        return model
+    with _models_lock:
+        model = _models.get(key)
+        if model is None:
+            # Prefer a module-level WhisperModel if present (useful for tests/mocking)
+            cls = globals().get("WhisperModel")
+            if cls is None:
+                from faster_whisper import WhisperModel as cls
+            name, ctype, threads = key
+            kwargs: Dict[str, Any] = {"device": "cpu"}
+            if ctype != "default":
+                kwargs["compute_type"] = ctype
+            if threads:
+                kwargs["cpu_threads"] = threads
+            model = cls(name, **kwargs)
+            _models[key] = model
+    return model
+
+
+def warmup(model_name: str | None = None) -> bool:
+    """Load the configured model ahead of the first job. Returns False if it can't be loaded."""
+    try:
+        get_model(model_name)
+        return True
+    except Exception:
+        return False
+
+
+def evict(model_name: str | None = None, compute_type: str | None = None, cpu_threads: int | None = None) -> int:
+    """Drop cached models matching the given fields (all models when none are given).
+
+    Returns the number of models evicted.
+    """
+    with _models_lock:
+        doomed = [
+            k for k in _models
+            if (model_name is None or k[0] == model_name)
+            and (compute_type is None or k[1] == compute_type)
+            and (cpu_threads is None or k[2] == cpu_threads)
+        ]
+        for k in doomed:
+            del _models[k]
+    return len(doomed)
+
+
+def cached_models() -> List[Tuple[str, str, int]]:
+    return list(_models.keys())
+
+
+SAMPLE_RATE = 16000
+
+
+def _decode(audio_path: str):
+    """Decode any input file to 16 kHz mono float32 (numpy)."""
+    from .session_audio import is_spool, read_pcm
+    if is_spool(audio_path):
+        # spooled session PCM is already 16 kHz mono; just map it
+        return read_pcm(audio_path)
+    # Prefer a module-level decode_audio if present (useful for tests/mocking)
+    dec = globals().get("decode_audio")
+    if dec is None:
+        from faster_whisper import decode_audio as dec
+    return dec(audio_path, sampling_rate=SAMPLE_RATE)
+
+
+def silence_split_ranges(audio, sr: int = SAMPLE_RATE, target_seconds: float = 60.0, min_silence_ms: int = 500,
+                         silence_db: float = -40.0, frame_ms: int = 30) -> List[Tuple[int, int]]:
+    """Split `audio` into (start, end) sample ranges, cutting in the middle of silences.
+
+    A cut is placed at the first silence of at least `min_silence_ms` found after
+    `target_seconds` of audio since the previous cut, so no word is cut in half.
+    """
+    import numpy as np
+    frame = sr * frame_ms // 1000
+    n_frames = len(audio) // frame
+    if n_frames == 0:
+        return [(0, len(audio))]
+    frames = np.asarray(audio[:n_frames * frame], dtype=np.float32).reshape(n_frames, frame)
+    db = 20 * np.log10(np.sqrt(np.mean(frames * frames, axis=1)) + 1e-10)
+    silent = np.concatenate(([False], db < silence_db, [False]))
+    edges = np.flatnonzero(np.diff(silent.astype(np.int8)))
+    starts, ends = edges[0::2], edges[1::2]
+    long_enough = (ends - starts) * frame_ms >= min_silence_ms
+    mids = ((starts[long_enough] + ends[long_enough]) // 2) * frame
+
+    target = int(target_seconds * sr)
+    cuts = []
+    last = 0
+    for m in mids.tolist():
+        if m - last >= target and len(audio) - m >= sr:
+            cuts.append(m)
+            last = m
+    bounds = [0] + cuts + [len(audio)]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def _segment_dict(segment, offset_s: float) -> Dict[str, Any]:
+    words = getattr(segment, "words", None) or []
+    return {
+        "start": segment.start + offset_s,
+        "end": segment.end + offset_s,
+        "text": segment.text,
+        "avg_logprob": getattr(segment, "avg_logprob", 0),
+        "words": [{"word": w.word, "start": w.start + offset_s, "end": w.end + offset_s, "probability": w.probability} for w in words],
+    }
+
+
+def _transcribe_kwargs(word_timestamps: bool) -> Dict[str, Any]:
+    kwargs: Dict[str, Any] = {"beam_size": 5}
+    if word_timestamps:
+        kwargs["word_timestamps"] = True
+    return kwargs
+
+
+def _transcribe_range(pcm_path: str, start: int, end: int, model_name: str | None, compute_type: str | None,
+                      cpu_threads: int | None, word_timestamps: bool = False) -> List[Dict[str, Any]]:
+    """Segment pool entry point: transcribe samples [start, end) of the decoded PCM file."""
+    import numpy as np
+    audio = np.memmap(pcm_path, dtype=np.float32, mode="r", offset=start * 4, shape=(end - start,))
+    model = get_model(model_name, compute_type, cpu_threads)
+    segments, _ = model.transcribe(audio, **_transcribe_kwargs(word_timestamps))
+    # shift segment times from range-relative to absolute
+    return [_segment_dict(seg, start / SAMPLE_RATE) for seg in segments]
+
+
+_segment_executor = None
+
+
+def _segment_pool():
+    global _segment_executor
+    if _segment_executor is None:
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        _segment_executor = ProcessPoolExecutor(max_workers=settings.WHISPER_PARALLEL_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _segment_executor
+
+
+def _transcribe_parallel(model, audio_path: str, model_name: str | None, compute_type: str | None, cpu_threads: int | None,
+                         word_timestamps: bool = False):
+    """Split long audio at silences and transcribe the pieces across the segment pool.
+
+    Short recordings (or ones without a usable silence) are transcribed in-process.
+    """
+    import tempfile
+    from types import SimpleNamespace
+    audio = _decode(audio_path)
+    ranges = silence_split_ranges(audio, target_seconds=settings.WHISPER_SEGMENT_TARGET_SECONDS)
+    if len(audio) < settings.WHISPER_PARALLEL_MIN_SECONDS * SAMPLE_RATE or len(ranges) < 2:
+        segments, _ = model.transcribe(audio, **_transcribe_kwargs(word_timestamps))
+        return segments
+    # workers memory-map the decoded PCM instead of receiving pickled slices
+    fd, pcm_path = tempfile.mkstemp(suffix=".f32")
+    os.close(fd)
+    try:
+        audio.astype("float32", copy=False).tofile(pcm_path)
+        del audio
+        pool = _segment_pool()
+        futures = [pool.submit(_transcribe_range, pcm_path, start, end, model_name, compute_type, cpu_threads, word_timestamps)
+                   for start, end in ranges]
+        # ranges are in time order, so concatenating per-range results keeps segments ordered
+        segments = []
+        for f in futures:
+            for seg in f.result():
+                seg["words"] = [SimpleNamespace(**w) for w in seg["words"]]
+                segments.append(SimpleNamespace(**seg))
+        return segments
+    finally:
+        try:
+            os.remove(pcm_path)
+        except Exception:
+            pass
+
+
+def reprocess_audio(audio_path: str, model_name: str | None = None, compute_type: str | None = None, cpu_threads: int | None = None,
+                    parallel: bool | None = None, word_timestamps: bool | None = None) -> Dict[str, Any]:
     """Reprocess an audio file for higher-accuracy transcript.
     Returns a dict similar to STT finalize output.
+    With `parallel` (default: WHISPER_PARALLEL), long recordings are split at silences and
+    transcribed across a process pool.
+    With `word_timestamps` (default: WHISPER_WORD_TIMESTAMPS), word times come from the model
+    and pauses are derived from the gaps between words.
     If faster-whisper is not available, produce a simulated transcript.
     """
     try:
         # try faster-whisper first
-        from faster_whisper import WhisperModel
-        model = WhisperModel(model_name, device="cpu")
-        segments, info = model.transcribe(audio_path, beam_size=5)
-        # build transcript and simple word timestamps by splitting segments
-        words = []
-        current_ms = 0
-        word_timestamps = []
-        transcript_parts = []
-        for segment in segments:
-            text = segment.text.strip()
-            transcript_parts.append(text)
-            # naive split into words and assign times proportionally within segment
-            seg_ms = int((segment.end - segment.start) * 1000)
-            wlist = text.split()
-            if not wlist:
-                continue
-            per_word = max(10, seg_ms // len(wlist))
-            start = int(segment.start * 1000)
-            for i, w in enumerate(wlist):
-                s = start + i * per_word
-                e = s + per_word
-                word_timestamps.append({"word": w, "start_ms": s, "end_ms": e, "confidence": getattr(segment, "avg_logprob", 0)})
-        transcript = " ".join(transcript_parts)
-        # simple fillers detection
-        filler_words = [w for w in word_timestamps if w["word"].lower() in ("um", "uh", "like", "you", "know")] 
-        pause_segments = []
-        speech_rate_wpm = int(len(transcript.split()) / (max(1, (word_timestamps[-1]["end_ms"] - word_timestamps[0]["start_ms"]) / 60000))) if word_timestamps else 140
-        return {
-            "transcript": transcript,
-            "word_timestamps": word_timestamps,
-            "filler_words": filler_words,
-            "pause_segments": pause_segments,
-            "speech_rate_wpm": speech_rate_wpm,
-        }
+        return transcribe_audio(audio_path, model_name, compute_type, cpu_threads, parallel, word_timestamps)
     except Exception:
-        # Fallback: simulate by using MockSTT behavior
+        return _simulated_result(audio_path)
+
+
+def transcribe_audio(audio_path: str, model_name: str | None = None, compute_type: str | None = None, cpu_threads: int | None = None,
+                     parallel: bool | None = None, word_timestamps: bool | None = None) -> Dict[str, Any]:
+    """`reprocess_audio` without the simulated fallback: raises if faster-whisper is missing or fails."""
+    if parallel is None:
+        parallel = settings.WHISPER_PARALLEL
+    if word_timestamps is None:
+        word_timestamps = settings.WHISPER_WORD_TIMESTAMPS
+    model = get_model(model_name, compute_type, cpu_threads)
+    if parallel:
+        segments = _transcribe_parallel(model, audio_path, model_name, compute_type, cpu_threads, word_timestamps)
+    else:
+        from .session_audio import is_spool, read_pcm
+        source = read_pcm(audio_path) if is_spool(audio_path) else audio_path
+        segments, info = model.transcribe(source, **_transcribe_kwargs(word_timestamps))
+    if word_timestamps:
+        return _build_word_result(segments)
+    return _build_result(segments)
+
+
+def _simulated_result(audio_path: str) -> Dict[str, Any]:
+    # Fallback: simulate by using MockSTT behavior
+    try:
+        from .mock_stt import MockSTT
+        # simulate reading file name as text for deterministic output in tests
+        base = os.path.basename(audio_path)
+        simulated_text = os.path.splitext(base)[0].replace("_", " ")
+        stt = MockSTT(session_id="reprocess")
+        return awaitable_finalize_simulated(stt, simulated_text)
+    except Exception:
+        # final fallback minimal
+        return {"transcript": "", "word_timestamps": [], "filler_words": [], "pause_segments": [], "speech_rate_wpm": 0}
+
+
+def _build_result(segments) -> Dict[str, Any]:
+    # build transcript and simple word timestamps by splitting segments
+    word_timestamps = []
+    transcript_parts = []
+    for segment in segments:
+        text = segment.text.strip()
+        transcript_parts.append(text)
+        # naive split into words and assign times proportionally within segment
+        seg_ms = int((segment.end - segment.start) * 1000)
+        wlist = text.split()
+        if not wlist:
+            continue
+        per_word = max(10, seg_ms // len(wlist))
+        start = int(segment.start * 1000)
+        for i, w in enumerate(wlist):
+            s = start + i * per_word
+            e = s + per_word
+            word_timestamps.append({"word": w, "start_ms": s, "end_ms": e, "confidence": getattr(segment, "avg_logprob", 0)})
+    transcript = " ".join(transcript_parts)
+    # simple fillers detection
+    filler_words = [w for w in word_timestamps if w["word"].lower() in ("um", "uh", "like", "you", "know")]
+    pause_segments = []
+    speech_rate_wpm = int(len(transcript.split()) / (max(1, (word_timestamps[-1]["end_ms"] - word_timestamps[0]["start_ms"]) / 60000))) if word_timestamps else 140
+    return {
+        "transcript": transcript,
+        "word_timestamps": word_timestamps,
+        "filler_words": filler_words,
+        "pause_segments": pause_segments,
+        "speech_rate_wpm": speech_rate_wpm,
+    }
+
+
+def _build_word_result(segments) -> Dict[str, Any]:
+    # word times come from the model; pauses are the gaps between consecutive words
+    import numpy as np
+    transcript_parts = []
+    words = []
+    for segment in segments:
+        transcript_parts.append(segment.text.strip())
+        words.extend(getattr(segment, "words", None) or [])
+    n = len(words)
+    start_ms = np.rint(np.fromiter((w.start for w in words), dtype=np.float64, count=n) * 1000).astype(np.int64)
+    end_ms = np.rint(np.fromiter((w.end for w in words), dtype=np.float64, count=n) * 1000).astype(np.int64)
+    gaps = start_ms[1:] - end_ms[:-1]
+    pause_idx = np.flatnonzero(gaps >= settings.WHISPER_PAUSE_MIN_MS)
+    pause_segments = [{"start_ms": int(end_ms[i]), "end_ms": int(start_ms[i + 1])} for i in pause_idx.tolist()]
+
+    tokens = [w.word.strip() for w in words]
+    word_timestamps = [
+        {"word": t, "start_ms": s, "end_ms": e, "confidence": w.probability}
+        for t, s, e, w in zip(tokens, start_ms.tolist(), end_ms.tolist(), words)
+    ]
+    transcript = " ".join(p for p in transcript_parts if p)
+    # simple fillers detection (whisper attaches punctuation to words)
+    filler_words = [w for w in word_timestamps if w["word"].lower().strip(".,!?") in ("um", "uh", "like", "you", "know")]
+    speech_rate_wpm = int(n / (max(1, (word_timestamps[-1]["end_ms"] - word_timestamps[0]["start_ms"]) / 60000))) if word_timestamps else 140
+    return {
+        "transcript": transcript,
+        "word_timestamps": word_timestamps,
+        "filler_words": filler_words,
+        "pause_segments": pause_segments,
+        "speech_rate_wpm": speech_rate_wpm,
+    }
+
+
+def reprocess_source(audio_path: str | None = None, audio_url: str | None = None, model_name: str | None = None) -> Dict[str, Any]:
+    """Job entry point: fetch `audio_url` (if no local `audio_path`) and reprocess it.
+
+    Runs inside a background job worker; a downloaded temp file is removed afterwards.
+    """
+    local_tmp = None
+    if not audio_path and audio_url:
+        from .audio_fetcher import fetch_audio_to_temp
+        local_tmp = fetch_audio_to_temp(audio_url)
+    target = audio_path or local_tmp
+    if not target:
+        raise ValueError("audio_path or audio_url is required")
+    try:
+        return reprocess_audio(target, model_name=model_name)
+    finally:
+        if local_tmp:
+            try:
+                os.remove(local_tmp)
+            except Exception:
+                pass
+
+
+def reprocess_fetched(local_path: str) -> Dict[str, Any]:
+    """Job entry point for audio already downloaded by the API process; removes the file afterwards."""
+    try:
+        return reprocess_audio(local_path)
+    finally:
         try:
-            from .mock_stt import MockSTT
-            # simulate reading file name as text for deterministic output in tests
-            base = os.path.basename(audio_path)
-            simulated_text = os.path.splitext(base)[0].replace("_", " ")
-            stt = MockSTT(session_id="reprocess")
-            return awaitable_finalize_simulated(stt, simulated_text)
+            os.remove(local_path)
         except Exception:
-            # final fallback minimal
-            return {"transcript": "", "word_timestamps": [], "filler_words": [], "pause_segments": [], "speech_rate_wpm": 0}
+            pass
+
+
+def reprocess_session_audio(spool_path: str) -> Dict[str, Any]:
+    """Job entry point for audio the STT WebSocket spooled on this server.
+
+    The spool is deleted once Whisper has transcribed it. If transcription fails (or
+    faster-whisper is not installed) the simulated result is returned as by
+    `reprocess_audio`, and the spool is kept for a retry until the storage GC expires it.
+    """
+    try:
+        result = transcribe_audio(spool_path)
+    except Exception:
+        return _simulated_result(spool_path)
+    from .session_audio import remove_file
+    remove_file(spool_path)
+    return result
 
 
 def awaitable_finalize_simulated(stt, transcript: str):
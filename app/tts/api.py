@@ -1,9 +1,18 @@
-from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi import APIRouter, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import FileResponse, Response
 from pydantic import BaseModel
 from typing import Optional
-from .provider import get_provider
-from .cache import get_cached, set_cached
+from .provider import get_provider, estimate_duration_ms
+from .cache import get_cached
+from .service import synthesize, remember, sentence_mode, iter_sentences, servable, stream_shared
+from .metrics import stream_metrics
+from .artifacts import get_artifact_store, artifact_url
+from ..core.config import settings
 import base64
+import hashlib
+import os
+import re
+import time
 
 router = APIRouter()
 
@@ -20,11 +29,19 @@ from ..state.session_store import get_session
 
 class TTSResponse(BaseModel):
     audio_url: str | None = None
+    artifact_url: str | None = None
     duration_ms: int | None = None
     voice_parameters_used: dict | None = None
     use_client_tts: bool | None = False
     tts_instructions: dict | None = None
 
+async def _send_audio(websocket: WebSocket, chunk: bytes, binary_audio: bool) -> None:
+    if binary_audio:
+        await websocket.send_bytes(chunk)
+    else:
+        await websocket.send_json({"type":"audio_chunk","data": base64.b64encode(chunk).decode("ascii")})
+
+
 @router.post("/generate", response_model=TTSResponse)
 async def generate_tts(req: TTSRequest):
     # Validate basic constraints
@@ -32,7 +49,7 @@ async def generate_tts(req: TTSRequest):
         raise HTTPException(status_code=400, detail="text is required")
 
     # If session prefers client-side TTS, return instructions for browser SpeechSynthesis
-    sess = get_session(req.session_id)
+    sess = await get_session(req.session_id)
     if sess.get("client_tts"):
         # Provide a small set of voice params mapping persona -> rate/pitch
         persona_map = {
@@ -50,41 +67,192 @@ async def generate_tts(req: TTSRequest):
         }
         return {"use_client_tts": True, "tts_instructions": instructions}
 
-    # Check cache
-    cached = get_cached(req.text, req.persona, req.emotion, req.audio_format, req.pitch, req.rate)
-    if cached:
-        return {"audio_url": cached["audio_url"], "duration_ms": cached["duration_ms"], "voice_parameters_used": cached["voice_parameters_used"]}
-
-    provider = get_provider()
-    res = await provider.generate(req.session_id, req.text, req.persona, req.emotion, req.audio_format, req.pitch, req.rate)
-    set_cached(req.text, req.persona, req.emotion, req.audio_format, req.pitch, req.rate, res)
-    return {"audio_url": res["audio_url"], "duration_ms": res["duration_ms"], "voice_parameters_used": res["voice_parameters_used"]}
+    res = await synthesize(req.session_id, req.text, req.persona, req.emotion, req.audio_format, req.pitch, req.rate, provider=get_provider())
+    return {
+        "audio_url": res["audio_url"],
+        "artifact_url": artifact_url(res.get("audio_sha256"), req.audio_format),
+        "duration_ms": res["duration_ms"],
+        "voice_parameters_used": res["voice_parameters_used"],
+    }
 
-# Minimal WebSocket streaming endpoint for TTS playback
+# WebSocket streaming endpoint for TTS playback: cached audio is streamed from the artifact store,
+# anything else is forwarded as the provider produces it
 @router.websocket("/ws/{session_id}")
 async def ws_tts(websocket: WebSocket, session_id: str):
     await websocket.accept()
+    # Chunks go out base64-in-JSON by default; {"type":"config","audio_encoding":"binary"} switches to bytes frames
+    binary_audio = False
     try:
         while True:
             msg = await websocket.receive_json()
-            if msg.get("type") == "generate":
+            mtype = msg.get("type")
+            if mtype == "config":
+                binary_audio = msg.get("audio_encoding") == "binary"
+                await websocket.send_json({"type":"config_ack","audio_encoding":"binary" if binary_audio else "base64"})
+            elif mtype == "generate":
                 text = msg.get("text")
                 persona = msg.get("persona", "neutral")
                 emotion = msg.get("emotion")
                 audio_format = msg.get("audio_format", "wav")
                 pitch = msg.get("pitch")
                 rate = msg.get("rate")
+                params = (text, persona, emotion, audio_format, pitch, rate)
+                started = time.perf_counter()
+                store = get_artifact_store()
+                cached = servable(params, get_cached(*params))
+                if cached:
+                    # repeated question: stream the stored bytes, no synthesis
+                    first_chunk_ms = None
+                    async for chunk in store.aiter_chunks(cached["audio_sha256"], audio_format):
+                        if first_chunk_ms is None:
+                            first_chunk_ms = (time.perf_counter() - started) * 1000
+                        await _send_audio(websocket, chunk, binary_audio)
+                    stream_metrics.record_cache_hit()
+                    await websocket.send_json({
+                        "type":"complete",
+                        "audio_url": cached["audio_url"],
+                        "artifact_url": artifact_url(cached["audio_sha256"], audio_format),
+                        "duration_ms": cached["duration_ms"],
+                        "cached": True,
+                        "time_to_first_chunk_ms": round(first_chunk_ms or 0.0, 1),
+                        "synthesis_ms": 0.0,
+                    })
+                    continue
                 provider = get_provider()
-                res = await provider.generate(session_id, text, persona, emotion, audio_format, pitch, rate)
-                # Stream simulated small chunks (base64) then send completed flag
-                b64 = res.get("audio_b64")
-                # break into small chunks
-                chunk_size = 200
-                for i in range(0, len(b64), chunk_size):
-                    chunk = b64[i:i+chunk_size]
-                    await websocket.send_json({"type":"audio_chunk","data": chunk})
-                await websocket.send_json({"type":"complete","audio_url": res.get("audio_url"), "duration_ms": res.get("duration_ms")})
+                first_chunk_ms = None
+                chunks = []
+                duration_ms = estimate_duration_ms(text)
+                entry = None
+                try:
+                    if sentence_mode(text):
+                        # sentences synthesize concurrently; each is sent as soon as it and those before it are ready,
+                        # shaped so the stream matches the joined clip that gets stored
+                        duration_ms = 0
+                        size = settings.TTS_STREAM_CHUNK_BYTES
+                        async for piece in iter_sentences(session_id, *params, provider=provider):
+                            duration_ms += piece["duration_ms"]
+                            chunks.append(await store.read_async(piece["audio_sha256"], audio_format))
+                            data = provider.stream_piece(chunks[-1], audio_format, first=len(chunks) == 1)
+                            for offset in range(0, len(data), size):
+                                if first_chunk_ms is None:
+                                    first_chunk_ms = (time.perf_counter() - started) * 1000
+                                await _send_audio(websocket, data[offset:offset + size], binary_audio)
+                        audio = provider.join_audio(chunks, audio_format)
+                    else:
+                        async def _send(chunk: bytes) -> None:
+                            nonlocal first_chunk_ms
+                            if first_chunk_ms is None:
+                                first_chunk_ms = (time.perf_counter() - started) * 1000
+                            await _send_audio(websocket, chunk, binary_audio)
+
+                        # identical requests in flight (WS or HTTP) share one synthesis; joiners get the stored clip
+                        entry = await stream_shared(session_id, params, provider, _send, duration_ms)
+                        duration_ms = entry["duration_ms"]
+                except WebSocketDisconnect:
+                    raise
+                except Exception as e:
+                    stream_metrics.record_failure()
+                    await websocket.send_json({"type":"error","message":f"tts failed: {e}"})
+                    continue
+                synthesis_ms = (time.perf_counter() - started) * 1000
+                stream_metrics.record(first_chunk_ms or synthesis_ms, synthesis_ms)
+                if entry is None:
+                    entry = await remember(session_id, params, audio, provider, duration_ms)
+                await websocket.send_json({
+                    "type":"complete",
+                    "audio_url": entry["audio_url"],
+                    "artifact_url": artifact_url(entry.get("audio_sha256"), audio_format),
+                    "duration_ms": duration_ms,
+                    "cached": False,
+                    "time_to_first_chunk_ms": round(first_chunk_ms or synthesis_ms, 1),
+                    "synthesis_ms": round(synthesis_ms, 1),
+                })
             else:
                 await websocket.send_json({"type":"error","message":"unknown message type"})
     except WebSocketDisconnect:
         return
+
+
+# HTTP serving of stored audio. FileResponse handles Range/If-Range (so players can seek) and
+# hands the file to the server via http.response.pathsend where supported, so bytes are not
+# copied through Python; conditional requests are answered with 304 before opening the file.
+_MEDIA_TYPES = {"wav": "audio/wav", "mp3": "audio/mpeg", "ogg": "audio/ogg", "webm": "audio/webm"}
+_ARTIFACT_NAME = re.compile(r"^([0-9a-f]{64})\.([A-Za-z0-9]{1,8})$")
+_IMMUTABLE = "public, max-age=31536000, immutable"
+
+
+def _not_modified(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = [t.strip() for t in header.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+
+def _media_type(name: str) -> str:
+    return _MEDIA_TYPES.get(name.rsplit(".", 1)[-1].lower(), "application/octet-stream")
+
+
+def _bytes_response(request: Request, data: bytes, headers: dict, media_type: str) -> Response:
+    # single byte range over in-memory bytes (not-yet-flushed artifacts); anything else gets the whole body
+    m = re.fullmatch(r"bytes=(\d*)-(\d*)", request.headers.get("range", "").strip())
+    if m and (m.group(1) or m.group(2)):
+        size = len(data)
+        if m.group(1):
+            start, end = int(m.group(1)), min(int(m.group(2)) if m.group(2) else size - 1, size - 1)
+        else:
+            start, end = max(size - int(m.group(2)), 0), size - 1
+        if start > end:
+            return Response(status_code=416, headers={"content-range": f"bytes */{size}"})
+        headers = dict(headers, **{"content-range": f"bytes {start}-{end}/{size}", "accept-ranges": "bytes"})
+        body = data[start:end + 1] if request.method != "HEAD" else b""
+        return Response(body, status_code=206, headers=headers, media_type=media_type)
+    body = data if request.method != "HEAD" else b""
+    return Response(body, headers=dict(headers, **{"accept-ranges": "bytes", "content-length": str(len(data))}), media_type=media_type)
+
+
+# Content-addressed audio (`<sha256>.<format>`): immutable, so clients may cache it forever
+@router.api_route("/artifacts/{name}", methods=["GET", "HEAD"])
+async def get_artifact(name: str, request: Request):
+    m = _ARTIFACT_NAME.match(name)
+    if not m:
+        raise HTTPException(status_code=404, detail="artifact not found")
+    sha256, audio_format = m.groups()
+    store = get_artifact_store()
+    if not store.has(sha256, audio_format):
+        raise HTTPException(status_code=404, detail="artifact not found")
+    headers = {"etag": f'"{sha256}"', "cache-control": _IMMUTABLE}
+    if _not_modified(request, headers["etag"]):
+        store.record("not_modified")
+        return Response(status_code=304, headers=headers)
+    store.record("http_served")
+    return FileResponse(store.path_for(sha256, audio_format), headers=headers, media_type=_media_type(name))
+
+
+# Audio saved by name under STORAGE_DIR, including artifacts still queued for writing
+@router.api_route("/files/{filename}", methods=["GET", "HEAD"])
+async def get_file(filename: str, request: Request):
+    if os.path.basename(filename) != filename or filename in (".", ".."):
+        raise HTTPException(status_code=404, detail="file not found")
+    from ..storage import filesystem
+    from ..storage.write_behind import get_write_behind
+    queue = get_write_behind()
+    pending = queue.get(filename)
+    if pending is not None:
+        # not on disk yet: serve from memory, but don't let clients cache it under a validator
+        # that changes once the file is written
+        return _bytes_response(request, pending, {"cache-control": "no-cache"}, _media_type(filename))
+    try:
+        path = filesystem.get_path(filename)
+    except (FileNotFoundError, ValueError):
+        if queue.failed(filename):
+            raise HTTPException(status_code=410, detail="file could not be persisted")
+        raise HTTPException(status_code=404, detail="file not found")
+    if not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail="file not found")
+    st = os.stat(path)
+    etag = '"%s"' % hashlib.md5(f"{st.st_mtime_ns}-{st.st_size}".encode()).hexdigest()
+    headers = {"etag": etag, "cache-control": f"public, max-age={settings.TTS_FILE_MAX_AGE_SECONDS}"}
+    if _not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+    return FileResponse(path, headers=headers, media_type=_media_type(filename), stat_result=st)
@@ -0,0 +1,194 @@
+"""Content-addressed on-disk store for synthesized TTS audio.
+
+Bytes are stored once per SHA-256 of their content under TTS_ARTIFACT_DIR
+(`<sha[:2]>/<sha>.<format>`), written atomically. The TTS cache entry for a request
+records the digest, so a cache hit on either the HTTP or the WebSocket path can serve
+the stored audio without synthesizing (or base64-encoding) it again. Reads are
+memory-mapped and streamed in TTS_STREAM_CHUNK_BYTES slices.
+
+The store is kept under TTS_ARTIFACT_MAX_BYTES: after a write, the least recently
+used artifacts are deleted until the total fits. Callers on the event loop use
+`put_async` and `aiter_chunks`, which do the file I/O on worker threads.
+"""
+import asyncio
+import hashlib
+import mmap
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, Iterator, Optional
+
+from ..core.config import settings
+
+
+class ArtifactStore:
+    def __init__(self, root: str, max_bytes: int = 0):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # path -> size, least recently used first; filled from disk on first use
+        self._sizes: "OrderedDict[str, int]" = OrderedDict()
+        self._total = 0
+        self._loaded = False
+        self._stats = {"writes": 0, "dedup_writes": 0, "reads": 0, "bytes_served": 0, "http_served": 0, "not_modified": 0,
+                       "evicted": 0, "evicted_bytes": 0}
+
+    def _count(self, key: str, n: int = 1) -> None:
+        with self._lock:
+            self._stats[key] += n
+
+    def record(self, event: str) -> None:
+        """Count a serving outcome handled outside the store ("http_served", "not_modified")."""
+        self._count(event)
+
+    def path_for(self, sha256: str, audio_format: str) -> str:
+        return os.path.join(self.root, sha256[:2], f"{sha256}.{audio_format}")
+
+    def _load(self) -> None:
+        # artifacts written by earlier runs, oldest first
+        if self._loaded:
+            return
+        found = []
+        if os.path.isdir(self.root):
+            for dirpath, _, names in os.walk(self.root):
+                for name in names:
+                    if name.endswith(".tmp"):
+                        continue
+                    try:
+                        st = os.stat(os.path.join(dirpath, name))
+                    except FileNotFoundError:
+                        continue
+                    found.append((st.st_mtime, os.path.join(dirpath, name), st.st_size))
+        found.sort()
+        with self._lock:
+            if self._loaded:
+                return
+            for _, path, size in found:
+                if path not in self._sizes:
+                    self._sizes[path] = size
+                    self._total += size
+            self._loaded = True
+
+    def _touch(self, path: str, size: Optional[int] = None) -> None:
+        with self._lock:
+            if size is not None and path not in self._sizes:
+                self._sizes[path] = size
+                self._total += size
+            if path in self._sizes:
+                self._sizes.move_to_end(path)
+
+    def _evict(self, keep: str) -> None:
+        if self.max_bytes <= 0:
+            return
+        while True:
+            with self._lock:
+                if self._total <= self.max_bytes:
+                    return
+                victim = next((p for p in self._sizes if p != keep), None)
+                if victim is None:
+                    return
+                size = self._sizes.pop(victim)
+                self._total -= size
+                self._stats["evicted"] += 1
+                self._stats["evicted_bytes"] += size
+            try:
+                os.remove(victim)
+            except FileNotFoundError:
+                pass
+
+    def put(self, data: bytes, audio_format: str) -> str:
+        """Store `data` (if not already present) and return its SHA-256."""
+        self._load()
+        sha256 = hashlib.sha256(data).hexdigest()
+        path = self.path_for(sha256, audio_format)
+        if os.path.exists(path):
+            self._touch(path, len(data))
+            self._count("dedup_writes")
+            return sha256
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+        self._count("writes")
+        self._touch(path, len(data))
+        self._evict(keep=path)
+        return sha256
+
+    async def put_async(self, data: bytes, audio_format: str) -> str:
+        return await asyncio.to_thread(self.put, data, audio_format)
+
+    def has(self, sha256: Optional[str], audio_format: str) -> bool:
+        return bool(sha256) and os.path.exists(self.path_for(sha256, audio_format))
+
+    def iter_chunks(self, sha256: str, audio_format: str, chunk_size: Optional[int] = None) -> Iterator[bytes]:
+        """Yield the stored audio in slices of a read-only memory map."""
+        chunk_size = chunk_size or settings.TTS_STREAM_CHUNK_BYTES
+        path = self.path_for(sha256, audio_format)
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            self._count("reads")
+            self._touch(path)
+            if size == 0:
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                for start in range(0, size, chunk_size):
+                    chunk = mm[start:start + chunk_size]
+                    self._count("bytes_served", len(chunk))
+                    yield chunk
+
+    async def aiter_chunks(self, sha256: str, audio_format: str, chunk_size: Optional[int] = None) -> AsyncIterator[bytes]:
+        """`iter_chunks` for the event loop: each slice is read on a worker thread."""
+        chunks = self.iter_chunks(sha256, audio_format, chunk_size)
+        try:
+            while True:
+                chunk = await asyncio.to_thread(next, chunks, None)
+                if chunk is None:
+                    return
+                yield chunk
+        finally:
+            try:
+                chunks.close()
+            except ValueError:
+                # still running on a worker thread (the stream was cancelled); closed when collected
+                pass
+
+    def read(self, sha256: str, audio_format: str) -> bytes:
+        return b"".join(self.iter_chunks(sha256, audio_format))
+
+    async def read_async(self, sha256: str, audio_format: str) -> bytes:
+        return await asyncio.to_thread(self.read, sha256, audio_format)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            out: Dict[str, Any] = dict(self._stats)
+            if self._loaded:
+                out["files"] = len(self._sizes)
+                out["bytes"] = self._total
+        out["max_bytes"] = self.max_bytes
+        return out
+
+
+def artifact_url(sha256: Optional[str], audio_format: str) -> Optional[str]:
+    """Path of the HTTP route serving a stored artifact (see `app.tts.api`)."""
+    if not sha256:
+        return None
+    return f"/v1/tts/artifacts/{sha256}.{audio_format}"
+
+
+_store: Optional[ArtifactStore] = None
+
+
+def get_artifact_store() -> ArtifactStore:
+    global _store
+    if _store is None:
+        _store = ArtifactStore(settings.TTS_ARTIFACT_DIR, settings.TTS_ARTIFACT_MAX_BYTES)
+    return _store
@@ -1,9 +1,21 @@
-"""Simple in-memory cache for TTS artifacts. Replace with Redis or CDN in production."""
+"""Cache for TTS artifacts: a bounded in-process LRU tier in front of Redis (when configured).
 
-_cache: dict = {}
+Keys are SHA-256 digests of the request parameters, so every worker process (and
+every restart) computes the same key for the same request and they all share the
+Redis entries. Local entries expire after TTS_CACHE_TTL_SECONDS and the tier holds
+at most TTS_CACHE_MAX_ENTRIES, evicting the least recently used.
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict
 
 from ..core.config import settings
 
+KEY_VERSION = "v1"
+
 _redis = None
 if settings.REDIS_URL:
     try:
@@ -13,31 +25,127 @@ if settings.REDIS_URL:
         _redis = None
 
 
+class LRUCache:
+    """Thread-safe LRU with a per-entry TTL (0 = no expiry)."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at and expires_at <= time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value) -> None:
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds > 0 else 0
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+_cache = LRUCache(settings.TTS_CACHE_MAX_ENTRIES, settings.TTS_CACHE_TTL_SECONDS)
+_stats = {"local_hits": 0, "redis_hits": 0, "misses": 0}
+_stats_lock = threading.Lock()
+
+
+def _count(key: str) -> None:
+    with _stats_lock:
+        _stats[key] += 1
+
+
+def tts_digest(text: str, persona: str, emotion: str | None, audio_format: str, pitch: float | None, rate: float | None) -> str:
+    """Stable hex digest of a TTS request (same in every process, unlike `hash()`)."""
+    canonical = json.dumps([KEY_VERSION, text, persona, emotion, audio_format, pitch, rate], ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
 def _make_key(text: str, persona: str, emotion: str | None, audio_format: str, pitch: float | None, rate: float | None) -> str:
-    return f"tts:{hash((text, persona, emotion, audio_format, pitch, rate))}"
+    return f"tts:{KEY_VERSION}:{tts_digest(text, persona, emotion, audio_format, pitch, rate)}"
 
 
-def get_cached(text: str, persona: str, emotion: str | None, audio_format: str, pitch: float | None, rate: float | None):
-    key = _make_key(text, persona, emotion, audio_format, pitch, rate)
+def _lookup(key: str):
+    value = _cache.get(key)
+    if value is not None:
+        return value, "local_hits"
     if _redis:
         try:
             v = _redis.get(key)
             if v:
-                import json
-                return json.loads(v)
+                value = json.loads(v)
+                _cache.set(key, value)
+                return value, "redis_hits"
         except Exception:
             pass
-    return _cache.get(key)
+    return None, "misses"
+
+
+def get_cached(text: str, persona: str, emotion: str | None, audio_format: str, pitch: float | None, rate: float | None):
+    value, outcome = _lookup(_make_key(text, persona, emotion, audio_format, pitch, rate))
+    _count(outcome)
+    return value
+
+
+def peek_cached(text: str, persona: str, emotion: str | None, audio_format: str, pitch: float | None, rate: float | None):
+    """Like `get_cached`, without touching the hit/miss counters (for polling)."""
+    return _lookup(_make_key(text, persona, emotion, audio_format, pitch, rate))[0]
 
 
 def set_cached(text: str, persona: str, emotion: str | None, audio_format: str, pitch: float | None, rate: float | None, value):
     key = _make_key(text, persona, emotion, audio_format, pitch, rate)
     if _redis:
         try:
-            import json
-            _redis.set(key, json.dumps(value))
-            return key
+            # without an explicit TTL, don't outlive the storage retention of the file the entry points at
+            ttl = settings.TTS_CACHE_REDIS_TTL_SECONDS or int(settings.STORAGE_RETENTION_SECONDS)
+            _redis.set(key, json.dumps(value), ex=ttl or None)
         except Exception:
             pass
-    _cache[key] = value
+    _cache.set(key, value)
     return key
+
+
+def forget_cached(text: str, persona: str, emotion: str | None, audio_format: str, pitch: float | None, rate: float | None) -> None:
+    """Drop the entry for a request (e.g. its audio URL turned out not to hold the audio)."""
+    key = _make_key(text, persona, emotion, audio_format, pitch, rate)
+    _cache.delete(key)
+    if _redis:
+        try:
+            _redis.delete(key)
+        except Exception:
+            pass
+
+
+def stats() -> Dict[str, Any]:
+    with _stats_lock:
+        out: Dict[str, Any] = dict(_stats)
+    lookups = out["local_hits"] + out["redis_hits"] + out["misses"]
+    out["hit_ratio"] = round((out["local_hits"] + out["redis_hits"]) / lookups, 4) if lookups else 0.0
+    out.update(entries=len(_cache), max_entries=_cache.max_entries, evictions=_cache.evictions,
+               expirations=_cache.expirations, redis=_redis is not None)
+    return out
@@ -0,0 +1,47 @@
+"""Latency samples for streamed TTS: time to first audio chunk and total synthesis time."""
+import threading
+from collections import deque
+from typing import Any, Dict
+
+from ..core.metrics import percentile
+
+
+class StreamMetrics:
+    def __init__(self, sample_size: int = 1024):
+        self._lock = threading.Lock()
+        self._first_chunk_ms = deque(maxlen=sample_size)
+        self._total_ms = deque(maxlen=sample_size)
+        self.streams = 0
+        self.failed = 0
+        self.cache_hits = 0
+
+    def record(self, first_chunk_ms: float, total_ms: float) -> None:
+        with self._lock:
+            self.streams += 1
+            self._first_chunk_ms.append(first_chunk_ms)
+            self._total_ms.append(total_ms)
+
+    def record_cache_hit(self) -> None:
+        # served from stored audio; kept out of the synthesis latency samples
+        with self._lock:
+            self.cache_hits += 1
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failed += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            first, total = list(self._first_chunk_ms), list(self._total_ms)
+            return {
+                "streams": self.streams,
+                "failed": self.failed,
+                "cache_hits": self.cache_hits,
+                "first_chunk_ms_p50": percentile(first, 50),
+                "first_chunk_ms_p99": percentile(first, 99),
+                "total_ms_p50": percentile(total, 50),
+                "total_ms_p99": percentile(total, 99),
+            }
+
+
+stream_metrics = StreamMetrics()
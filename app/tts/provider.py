@@ -1,11 +1,85 @@
 import asyncio
 import base64
-from typing import Dict, Any
+import io
+import wave
+from typing import Dict, Any, AsyncIterator, List
+
+def estimate_duration_ms(text: str) -> int:
+    """Rough spoken length of `text` (about 80 ms per word, at least 300 ms)."""
+    return max(300, len(text.split()) * 80)
 
 class BaseTTSProvider:
     async def generate(self, session_id: str, text: str, persona: str, emotion: str | None = None, audio_format: str = "wav", pitch: float | None = None, rate: float | None = None) -> Dict[str, Any]:
         raise NotImplementedError
 
+    async def stream(self, session_id: str, text: str, persona: str, emotion: str | None = None, audio_format: str = "wav", pitch: float | None = None, rate: float | None = None) -> AsyncIterator[bytes]:
+        """Yield audio bytes as they are synthesized.
+
+        Providers without incremental synthesis fall back to one chunk from `generate`.
+        """
+        res = await self.generate(session_id, text, persona, emotion, audio_format, pitch, rate)
+        yield base64.b64decode(res["audio_b64"])
+
+    def join_audio(self, parts: List[bytes], audio_format: str) -> bytes:
+        """Concatenate separately synthesized pieces into one clip.
+
+        WAV pieces are merged under a single header; other payloads are concatenated as-is.
+        """
+        if audio_format == "wav" and parts and all(p[:4] == b"RIFF" for p in parts):
+            out = io.BytesIO()
+            with wave.open(out, "wb") as dst:
+                for i, part in enumerate(parts):
+                    with wave.open(io.BytesIO(part)) as src:
+                        if i == 0:
+                            dst.setparams(src.getparams())
+                        dst.writeframes(src.readframes(src.getnframes()))
+            return out.getvalue()
+        return b"".join(parts)
+
+    def stream_piece(self, part: bytes, audio_format: str, first: bool) -> bytes:
+        """Bytes to stream for one piece of a clip that `join_audio` will assemble.
+
+        For WAV, the first piece carries the joined clip's header and every later piece
+        only its frames, so the stream is the stored clip byte for byte except for the
+        RIFF and data sizes, which are sent as 0xFFFFFFFF (length not known yet). Other
+        payloads are streamed as-is.
+        """
+        if audio_format != "wav" or part[:4] != b"RIFF":
+            return part
+        try:
+            with wave.open(io.BytesIO(part)) as src:
+                frames = src.readframes(src.getnframes())
+        except (wave.Error, EOFError):
+            return part
+        if not first:
+            return frames
+        clip = self.join_audio([part], audio_format)
+        header = bytearray(clip[:clip.find(b"data", 12) + 8])
+        header[4:8] = header[-4:] = b"\xff\xff\xff\xff"
+        return bytes(header) + frames
+
+    async def store(self, session_id: str, text: str, persona: str, emotion: str | None, audio_format: str, pitch: float | None, rate: float | None, audio: bytes) -> str:
+        """Queue a synthesized artifact for persistence and return its URL.
+
+        Prefers Azure Blob (if configured), otherwise filesystem, otherwise a mock URL.
+        """
+        # same digest as the TTS cache key, so every worker names an artifact identically
+        from .cache import tts_digest
+        filename = f"{session_id}_{tts_digest(text, persona, emotion, audio_format, pitch, rate)[:16]}.{audio_format}"
+        try:
+            # returns the final URL at once (the upload/file write happens in the background) unless the
+            # write-behind queue is full, so it runs off the event loop
+            from ..storage.write_behind import persist_artifact
+            from .cache import forget_cached
+
+            def _dead_url(_filename):
+                # the cached entry would hand out a URL without the audio behind it
+                forget_cached(text, persona, emotion, audio_format, pitch, rate)
+
+            return await asyncio.to_thread(persist_artifact, filename, audio, session_id, _dead_url)
+        except Exception:
+            return f"https://mock-tts.local/{session_id}/{filename}"
+
 class MockTTSProvider(BaseTTSProvider):
     """Very small mock provider that returns an audio URL and synthetic bytes for streaming.
     This simulates generation latency and streaming and persists artifacts to filesystem storage when available.
@@ -16,37 +90,25 @@ class MockTTSProvider(BaseTTSProvider):
         # Produce a fake binary payload (base64) representing audio bytes for streaming tests
         payload = (f"AUDIO:{persona}:{emotion or 'none'}:" + text).encode("utf-8")
         b64 = base64.b64encode(payload).decode("ascii")
-        duration_ms = max(300, len(text.split()) * 80)
-        # Persist artifact: prefer Azure Blob (if configured), otherwise filesystem, otherwise mock URL
-        filename = f"{session_id}_{abs(hash(text))%100000}.{audio_format}"
-        audio_url = None
-        # Try Azure Blob first
-        try:
-            from ..storage.azure_blob import upload_base64
-            from ..core.config import settings as cfg
-            if cfg.AZURE_STORAGE_CONNECTION_STRING and cfg.AZURE_STORAGE_CONTAINER:
-                blob_url = upload_base64(cfg.AZURE_STORAGE_CONTAINER, filename, b64)
-                if blob_url:
-                    audio_url = blob_url
-        except Exception:
-            audio_url = None
-
-        # Fallback to filesystem
-        if not audio_url:
-            try:
-                from ..storage.filesystem import save_base64
-                saved_path = save_base64(filename, b64)
-                audio_url = saved_path
-            except Exception:
-                audio_url = f"https://mock-tts.local/{session_id}/{filename}"
-
+        audio_url = await self.store(session_id, text, persona, emotion, audio_format, pitch, rate, payload)
         return {
             "audio_url": audio_url,
-            "duration_ms": duration_ms,
+            "duration_ms": estimate_duration_ms(text),
             "audio_b64": b64,
             "voice_parameters_used": {"persona": persona, "emotion": emotion, "pitch": pitch, "rate": rate}
         }
 
+    async def stream(self, session_id: str, text: str, persona: str, emotion: str | None = None, audio_format: str = "wav", pitch: float | None = None, rate: float | None = None) -> AsyncIterator[bytes]:
+        # Same payload as `generate`, produced word by word: a short startup cost, then per-word synthesis
+        await asyncio.sleep(0.05)
+        yield f"AUDIO:{persona}:{emotion or 'none'}:".encode("utf-8")
+        words = text.split(" ")
+        per_char = min(0.005, 2.0 / max(1, len(text)))
+        for i, word in enumerate(words):
+            piece = word if i == 0 else " " + word
+            await asyncio.sleep(len(piece) * per_char)
+            yield piece.encode("utf-8")
+
 # Export a singleton for simplicity
 _provider = MockTTSProvider()
 
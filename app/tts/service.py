@@ -0,0 +1,163 @@
+"""Cached TTS synthesis shared by the HTTP endpoint and background callers (e.g. prefetch).
+
+In sentence mode (TTS_SENTENCE_MODE, for texts of at least TTS_SENTENCE_MIN_CHARS),
+a text is split into sentences that are synthesized concurrently (at most
+TTS_SENTENCE_CONCURRENCY at a time) and cached one by one, so phrases repeated across
+questions and feedback are only synthesized once. The pieces are joined in order and
+the whole text is cached too.
+"""
+import asyncio
+import base64
+import os
+import re
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List
+
+from ..core.config import settings
+
+from .artifacts import get_artifact_store
+from .cache import get_cached, set_cached, peek_cached, forget_cached, _make_key
+from .provider import get_provider
+from .singleflight import get_singleflight
+
+
+def _collected(audio_url) -> bool:
+    # local files (absolute paths) can be deleted by the storage GC; anything else is not checked
+    if not audio_url or not os.path.isabs(audio_url) or os.path.exists(audio_url):
+        return False
+    from ..storage.write_behind import get_write_behind
+    return not get_write_behind().is_pending(os.path.basename(audio_url))
+
+
+def servable(params: tuple, entry):
+    """`entry` if the audio it points at is still there, else None (a miss, to be regenerated).
+
+    Entries whose audio file was collected are dropped from the cache as well.
+    """
+    if not entry or not get_artifact_store().has(entry.get("audio_sha256"), params[3]):
+        return None
+    if _collected(entry.get("audio_url")):
+        forget_cached(*params)
+        return None
+    return entry
+
+
+def cache_entry(audio_url, duration_ms, voice_parameters_used, audio_sha256, audio_format) -> Dict[str, Any]:
+    # cache entries point at the stored bytes by digest; the audio itself stays out of Redis
+    return {
+        "audio_url": audio_url,
+        "duration_ms": duration_ms,
+        "voice_parameters_used": voice_parameters_used,
+        "audio_sha256": audio_sha256,
+        "audio_format": audio_format,
+    }
+
+
+async def synthesize(session_id: str, text: str, persona: str, emotion: str | None = None, audio_format: str = "wav",
+                     pitch: float | None = None, rate: float | None = None, provider=None) -> Dict[str, Any]:
+    """Return the cache entry for this request, generating (once, across concurrent callers) on a miss."""
+    params = (text, persona, emotion, audio_format, pitch, rate)
+    cached = servable(params, get_cached(*params))
+    if cached:
+        return cached
+    provider = provider or get_provider()
+    if sentence_mode(text):
+        return await _synthesize_by_sentence(session_id, params, provider)
+
+    async def _generate():
+        res = await provider.generate(session_id, *params)
+        sha256 = await get_artifact_store().put_async(base64.b64decode(res["audio_b64"]), audio_format)
+        entry = cache_entry(res["audio_url"], res["duration_ms"], res["voice_parameters_used"], sha256, audio_format)
+        set_cached(*params, entry)
+        return entry
+
+    # concurrent identical requests (e.g. many sessions opening with the same question) share one generation
+    return await get_singleflight().do(_make_key(*params), _generate, lookup=lambda: servable(params, peek_cached(*params)))
+
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def split_sentences(text: str) -> List[str]:
+    return [p for p in (part.strip() for part in _SENTENCE_END.split(text)) if p]
+
+
+def sentence_mode(text: str) -> bool:
+    return settings.TTS_SENTENCE_MODE and len(text) >= settings.TTS_SENTENCE_MIN_CHARS and len(split_sentences(text)) > 1
+
+
+async def iter_sentences(session_id: str, text: str, persona: str, emotion: str | None, audio_format: str,
+                         pitch: float | None, rate: float | None, provider=None) -> AsyncIterator[Dict[str, Any]]:
+    """Synthesize `text` sentence by sentence and yield each sentence's cache entry in order.
+
+    All sentences are started up front (bounded by TTS_SENTENCE_CONCURRENCY), so the
+    first can be played while later ones are still being synthesized.
+    """
+    limit = asyncio.Semaphore(settings.TTS_SENTENCE_CONCURRENCY)
+
+    async def _one(sentence: str):
+        async with limit:
+            return await synthesize(session_id, sentence, persona, emotion, audio_format, pitch, rate, provider=provider)
+
+    tasks = [asyncio.ensure_future(_one(s)) for s in split_sentences(text)]
+    try:
+        for task in tasks:
+            yield await task
+    finally:
+        for task in tasks:
+            task.cancel()
+        # wait for the cancellations (and retrieve failures) so no task outlives the stream
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def remember(session_id: str, params: tuple, audio: bytes, provider, duration_ms: int) -> Dict[str, Any]:
+    """Store assembled audio for `params` (artifact store + persisted URL) and cache it."""
+    text, persona, emotion, audio_format, pitch, rate = params
+    sha256 = await get_artifact_store().put_async(audio, audio_format)
+    audio_url = await provider.store(session_id, *params, audio)
+    entry = cache_entry(audio_url, duration_ms, {"persona": persona, "emotion": emotion, "pitch": pitch, "rate": rate}, sha256, audio_format)
+    set_cached(*params, entry)
+    return entry
+
+
+async def stream_shared(session_id: str, params: tuple, provider, send: Callable[[bytes], Awaitable[None]],
+                        duration_ms: int) -> Dict[str, Any]:
+    """Stream a cache miss through `send` and return its cache entry, generating once across concurrent callers.
+
+    The caller that leads the flight sends the provider's chunks as they arrive; callers
+    that join it (or wait on another process's Redis lock) send the stored audio once it
+    is ready. If the leader's `send` fails, generation still finishes for the others and
+    the error is raised afterwards.
+    """
+    led = False
+    send_error = None
+
+    async def _stream():
+        nonlocal led, send_error
+        led = True
+        chunks = []
+        async for chunk in provider.stream(session_id, *params):
+            chunks.append(chunk)
+            if send_error is None:
+                try:
+                    await send(chunk)
+                except Exception as e:
+                    send_error = e
+        return await remember(session_id, params, b"".join(chunks), provider, duration_ms)
+
+    entry = await get_singleflight().do(_make_key(*params), _stream, lookup=lambda: servable(params, peek_cached(*params)))
+    if send_error is not None:
+        raise send_error
+    if not led:
+        async for chunk in get_artifact_store().aiter_chunks(entry["audio_sha256"], params[3]):
+            await send(chunk)
+    return entry
+
+
+async def _synthesize_by_sentence(session_id: str, params: tuple, provider) -> Dict[str, Any]:
+    store = get_artifact_store()
+    audio_format = params[3]
+    parts, duration_ms = [], 0
+    async for entry in iter_sentences(session_id, *params, provider=provider):
+        parts.append(await store.read_async(entry["audio_sha256"], audio_format))
+        duration_ms += entry["duration_ms"]
+    return await remember(session_id, params, provider.join_audio(parts, audio_format), provider, duration_ms)
@@ -0,0 +1,106 @@
+"""Coalesce concurrent identical TTS generations.
+
+Within a process, the first request for a key runs the generation as a task and every
+concurrent request for the same key awaits that task instead of calling the provider
+again. With TTS_SINGLEFLIGHT_REDIS_LOCK (and Redis configured), the leader also takes
+a short Redis lock so other worker processes wait for its result to land in the shared
+cache rather than generating it themselves. The Redis client and `lookup` are blocking,
+so they run on worker threads.
+"""
+import asyncio
+import threading
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from ..core.config import settings
+
+# Release only if we still own the lock
+_RELEASE = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) else return 0 end"
+
+
+class SingleFlight:
+    def __init__(self, redis_client=None, lock_ttl_ms: int = 30000, poll_seconds: float = 0.05):
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._redis = redis_client
+        self.lock_ttl_ms = lock_ttl_ms
+        self.poll_seconds = poll_seconds
+        self._lock = threading.Lock()
+        self._stats = {"leaders": 0, "coalesced": 0, "remote_waits": 0, "remote_hits": 0}
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self._stats[key] += 1
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]],
+                 lookup: Optional[Callable[[], Any]] = None) -> Any:
+        """Return `fn()`'s result, sharing one call among concurrent callers with the same key.
+
+        `lookup` re-reads the shared cache (a blocking call, run on a worker thread); it is
+        polled while another process holds the Redis lock for `key`.
+        """
+        task = self._inflight.get(key)
+        if task is not None:
+            self._count("coalesced")
+        else:
+            self._count("leaders")
+            task = asyncio.ensure_future(self._run(key, fn, lookup))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _t, key=key: self._inflight.pop(key, None))
+        # shield: a caller that goes away must not cancel the generation others are waiting on
+        return await asyncio.shield(task)
+
+    async def _run(self, key: str, fn, lookup) -> Any:
+        if self._redis is None or lookup is None:
+            return await fn()
+        lock_key, token = f"lock:{key}", uuid.uuid4().hex
+        waited = False
+        while True:
+            try:
+                acquired = await asyncio.to_thread(self._redis.set, lock_key, token, nx=True, px=self.lock_ttl_ms)
+            except Exception:
+                # Redis trouble: fall back to per-process coalescing
+                return await fn()
+            if acquired:
+                break
+            if not waited:
+                waited = True
+                self._count("remote_waits")
+            # another worker is generating this; its result shows up in the shared cache
+            await asyncio.sleep(self.poll_seconds)
+            value = await asyncio.to_thread(lookup)
+            if value is not None:
+                self._count("remote_hits")
+                return value
+        try:
+            if waited:
+                # the previous holder may have finished between our last lookup and the lock
+                value = await asyncio.to_thread(lookup)
+                if value is not None:
+                    self._count("remote_hits")
+                    return value
+            return await fn()
+        finally:
+            try:
+                await asyncio.to_thread(self._redis.eval, _RELEASE, 1, lock_key, token)
+            except Exception:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            out: Dict[str, Any] = dict(self._stats)
+        out["inflight"] = len(self._inflight)
+        out["redis_lock"] = self._redis is not None
+        return out
+
+
+_singleflight: Optional[SingleFlight] = None
+
+
+def get_singleflight() -> SingleFlight:
+    global _singleflight
+    if _singleflight is None:
+        redis_client = None
+        if settings.TTS_SINGLEFLIGHT_REDIS_LOCK:
+            from .cache import _redis as redis_client
+        _singleflight = SingleFlight(redis_client, lock_ttl_ms=settings.TTS_SINGLEFLIGHT_LOCK_TTL_MS)
+    return _singleflight
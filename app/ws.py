@@ -1,12 +1,14 @@
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
-from typing import Dict
-import uuid
+from typing import Dict, Optional
+import asyncio
+import base64
+import json
 import logging
 
 from .stt.mock_stt import MockSTT
-from .llm.agent import process_answer
-from .emotion.mock_emotion import analyze_transcript
-from .scoring.engine import compute_turn_score
+from .pipeline.turn import run_turn, TurnPipelineError
+from .pipeline.prefetch import get_prefetcher
+from .core.config import settings
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -14,6 +16,55 @@ router = APIRouter()
 # Simple in-memory mapping for demo purposes
 connections: Dict[str, WebSocket] = {}
 
+async def _push_audio(websocket: WebSocket, session_id: str, stt, chunk: bytes, spool=None):
+    if spool is not None and spool.append(chunk):
+        await asyncio.to_thread(spool.flush)
+    prefetcher = get_prefetcher()
+    if prefetcher is not None:
+        # the candidate is answering: start preparing the next question
+        prefetcher.start(session_id)
+    await stt.process_chunk(chunk)
+    # Optionally return a partial transcript
+    partial = stt.get_partial()
+    if partial:
+        await websocket.send_json({"type":"stt_partial","partial":partial})
+
+
+async def _push_next_question(websocket: WebSocket, session_id: str, prefetcher) -> None:
+    # question (and its TTS) was prepared while the candidate was answering
+    next_question = await prefetcher.take(session_id, timeout=settings.PREFETCH_TAKE_TIMEOUT_SECONDS)
+    if next_question is None:
+        return
+    try:
+        await websocket.send_json({"type":"next_question","question":next_question})
+    except Exception:
+        # the socket closed while the prefetch was finishing
+        pass
+
+
+async def _send_turn(websocket: WebSocket, session_id: str, stt_stage, msg: dict) -> Optional[asyncio.Task]:
+    """Send the turn's result; with prefetch on, returns the task that pushes the next question after it."""
+    prefetcher = get_prefetcher()
+    if prefetcher is not None:
+        # no-op if audio already started it for this question; restarts it if it was seeded with another
+        prefetcher.start(session_id, seed_question_id=msg.get("question_id"))
+    try:
+        result = await run_turn(
+            session_id,
+            stt_stage,
+            question_id=msg.get("question_id"),
+            expected_topics=msg.get("expected_topics"),
+        )
+    except TurnPipelineError as e:
+        await websocket.send_json({"type":"error","message":str(e)})
+        return None
+    await websocket.send_json({"type":"turn_result","result":result})
+    if prefetcher is None:
+        return None
+    # waiting for an unfinished prefetch must not hold up the score
+    return asyncio.get_running_loop().create_task(_push_next_question(websocket, session_id, prefetcher))
+
+
 @router.websocket("/ws/audio/{session_id}")
 async def audio_ws(websocket: WebSocket, session_id: str):
     await websocket.accept()
@@ -24,117 +75,87 @@ async def audio_ws(websocket: WebSocket, session_id: str):
         stt = VoskSTTProvider(session_id=session_id)
     except Exception:
         stt = MockSTTProvider(session_id=session_id)
+    # Keep a server-side copy of the audio so finalize can reprocess it without a re-upload;
+    # the spool is opened on the first audio frame
+    spool = None
+    spooling = settings.SESSION_AUDIO_SPOOL
+    # pushes the prefetched next question after a turn_result
+    next_push: Optional[asyncio.Task] = None
+
+    async def push(chunk: bytes):
+        nonlocal spool, spooling
+        if spooling and spool is None:
+            from .stt.session_audio import SessionAudioSpool, SpoolBusyError
+            try:
+                spool = await asyncio.to_thread(SessionAudioSpool, session_id)
+            except SpoolBusyError:
+                # another connection is recording this session; interleaving would corrupt the file
+                spooling = False
+                await websocket.send_json({"type":"error","message":"session audio is already being recorded by another connection; this connection's audio will not be kept"})
+        await _push_audio(websocket, session_id, stt, chunk, spool)
+
+    # Audio arrives base64-in-JSON by default; a client may negotiate raw PCM bytes frames
+    binary_audio = False
     try:
         while True:
-            msg = await websocket.receive_json()
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+            frame = message.get("bytes")
+            if frame is not None:
+                if not binary_audio:
+                    await websocket.send_json({"type":"error","message":"binary audio not negotiated; send {\"type\":\"config\",\"audio_encoding\":\"binary\"} first"})
+                    continue
+                # raw PCM frame: hand the received buffer straight to the provider
+                await push(frame)
+                continue
+            try:
+                msg = json.loads(message.get("text") or "")
+            except ValueError:
+                await websocket.send_json({"type":"error","message":"invalid JSON message"})
+                continue
             # Expect messages like {"type":"audio_chunk","data":"<base64>"} or {"type":"finalize"}
             mtype = msg.get("type")
-            if mtype == "audio_chunk":
-                chunk = msg.get("data")
-                await stt.process_chunk(chunk)
-                # Optionally return a partial transcript
-                partial = stt.get_partial()
-                if partial:
-                    await websocket.send_json({"type":"stt_partial","partial":partial})
-
-            elif mtype == "finalize":
-                # Finalize STT, run emotion analysis, invoke LLM scoring
-                stt_result = await stt.finalize()
-                transcript = stt_result.get("transcript", "")
-                # Minimal turn id for traceability
-                turn_id = f"t-{uuid.uuid4().hex[:8]}"
-                # Check session opt-in for emotion analysis
-                from .state.session_store import get_session
-                sess = get_session(session_id)
-                emotion_events = []
-                if sess.get("emotion_opt_in"):
-                    try:
-                        emotion_events = await analyze_transcript(transcript)
-                    except Exception:
-                        logger.exception("Emotion analysis failed; continuing without it")
-                        emotion_events = []
-                else:
-                    # advisory note: emotion analysis skipped due to opt-out
-                    emotion_events = []
+            if mtype == "config":
+                # {"type":"config","audio_encoding":"binary"} switches audio to WebSocket bytes frames;
+                # control messages (finalize, sim_transcript, ...) stay JSON
+                binary_audio = msg.get("audio_encoding") == "binary"
+                await websocket.send_json({"type":"config_ack","audio_encoding":"binary" if binary_audio else "base64"})
 
-                # Call LLM agent to process answer
+            elif mtype == "audio_chunk":
                 try:
-                    llm_result = await process_answer(
-                        session_id=session_id,
-                        turn_id=turn_id,
-                        transcript=transcript,
-                        word_timestamps=stt_result.get("word_timestamps", []),
-                        filler_words=stt_result.get("filler_words", []),
-                        pause_segments=stt_result.get("pause_segments", []),
-                        speech_rate_wpm=stt_result.get("speech_rate_wpm", 140),
-                        audio_quality=stt_result.get("audio_quality", {}),
-                        emotion_events=emotion_events,
-                        question_id=msg.get("question_id")
-                    )
-                except Exception:
-                    logger.exception("LLM processing failed")
-                    await websocket.send_json({"type":"error","message":"LLM processing failed"})
+                    chunk = base64.b64decode(msg.get("data") or "")
+                except ValueError:
+                    await websocket.send_json({"type":"error","message":"audio_chunk data must be base64"})
                     continue
+                await push(chunk)
 
-                # Optionally refine via scoring engine using STT metrics, expected topics, and emotion events
-                try:
-                    scoring = compute_turn_score(
-                        llm_result.get("component_scores", {}),
-                        stt_metrics=stt_result,
-                        expected_topics=msg.get("expected_topics") or [],
-                        emotion_events=emotion_events,
-                    )
-                except Exception:
-                    logger.exception("Scoring engine failed; returning LLM result only")
-                    scoring = {}
-
-                response = {
-                    "turn_id": turn_id,
-                    "stt": stt_result,
-                    "emotion_events": emotion_events,
-                    "llm": llm_result,
-                    "scoring": scoring
-                }
-                await websocket.send_json({"type":"turn_result","result":response})
+            elif mtype == "finalize":
+                # Finalize STT, then run emotion analysis and LLM scoring concurrently
+                if spool is not None:
+                    await asyncio.to_thread(spool.sync)
+                next_push = await _send_turn(websocket, session_id, stt.finalize(), msg) or next_push
 
             elif mtype == "sim_transcript":
                 # Shortcut for local testing: send a simulated final transcript
-                transcript = msg.get("transcript")
+                transcript = msg.get("transcript") or ""
                 # build a fake STT result and reuse the finalize path
-                stt_result = await stt._finalize_with_transcript(transcript)
-                turn_id = f"t-{uuid.uuid4().hex[:8]}"
-                # Respect session opt-in for emotion analysis
-                from .state.session_store import get_session
-                sess = get_session(session_id)
-                emotion_events = []
-                if sess.get("emotion_opt_in"):
-                    try:
-                        emotion_events = await analyze_transcript(transcript)
-                    except Exception:
-                        logger.exception("Emotion analysis failed; continuing without it")
-                        emotion_events = []
-                llm_result = await process_answer(
-                    session_id=session_id,
-                    turn_id=turn_id,
-                    transcript=transcript,
-                    word_timestamps=stt_result.get("word_timestamps", []),
-                    filler_words=stt_result.get("filler_words", []),
-                    pause_segments=stt_result.get("pause_segments", []),
-                    speech_rate_wpm=stt_result.get("speech_rate_wpm", 140),
-                    audio_quality=stt_result.get("audio_quality", {}),
-                    emotion_events=emotion_events,
-                    question_id=msg.get("question_id")
-                )
-                scoring = compute_turn_score(llm_result.get("component_scores", {}))
-                response = {
-                    "turn_id": turn_id,
-                    "stt": stt_result,
-                    "emotion_events": emotion_events,
-                    "llm": llm_result,
-                    "scoring": scoring
-                }
-                await websocket.send_json({"type":"turn_result","result":response})
+                sim_stt = MockSTT(session_id=session_id)
+                next_push = await _send_turn(websocket, session_id, sim_stt._finalize_with_transcript(transcript), msg) or next_push
             else:
                 await websocket.send_json({"type":"error","message":"unknown message type"})
     except WebSocketDisconnect:
         connections.pop(session_id, None)
+    finally:
+        if next_push is not None:
+            next_push.cancel()
+        prefetcher = get_prefetcher()
+        if prefetcher is not None:
+            prefetcher.cancel(session_id)
+        if spool is not None:
+            try:
+                await asyncio.to_thread(spool.close)
+            except asyncio.CancelledError:
+                # torn down (e.g. server shutdown) before the thread ran: don't lose buffered audio
+                spool.close()
+                raise
@@ -0,0 +1,76 @@
+"""Benchmark STT connection setup: per-connection VOSK model load vs the shared registry.
+
+Usage:
+    python scripts/bench_vosk_connect.py --model models/vosk-model-small-en-us-0.15 --n 20
+
+If VOSK isn't installed, pass --simulate-load-ms to stand in a fake model whose load
+cost is a fixed sleep (useful to sanity-check the harness without a model on disk).
+"""
+import argparse
+import statistics
+import sys
+import time
+import types
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+
+def _install_fake_vosk(load_ms: int):
+    class Model:
+        def __init__(self, path):
+            time.sleep(load_ms / 1000.0)
+
+    class KaldiRecognizer:
+        def __init__(self, model, rate):
+            self.model = model
+
+        def SetWords(self, enabled):
+            pass
+
+    sys.modules["vosk"] = types.SimpleNamespace(Model=Model, KaldiRecognizer=KaldiRecognizer)
+
+
+def _time_connections(n: int, model_path: str, cold: bool):
+    from app.stt import vosk_registry
+    from app.stt.provider import VoskSTTProvider
+    samples = []
+    for i in range(n):
+        if cold:
+            vosk_registry.unload()
+        t0 = time.perf_counter()
+        VoskSTTProvider(session_id=f"bench-{i}", model_path=model_path)
+        samples.append((time.perf_counter() - t0) * 1000)
+    return samples
+
+
+def _report(label: str, samples):
+    samples = sorted(samples)
+    p95 = samples[max(0, int(len(samples) * 0.95) - 1)]
+    print(f"{label:<28} mean={statistics.mean(samples):9.2f}ms  p50={statistics.median(samples):9.2f}ms  p95={p95:9.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=None, help="VOSK model directory (defaults to VOSK_MODEL_PATH / ./models)")
+    parser.add_argument("--n", type=int, default=10, help="connections per scenario")
+    parser.add_argument("--simulate-load-ms", type=int, default=0, help="use a fake VOSK with this model load time")
+    args = parser.parse_args()
+
+    if args.simulate_load_ms:
+        _install_fake_vosk(args.simulate_load_ms)
+        model_path = args.model or "simulated-model"
+    else:
+        from app.stt.vosk_registry import resolve_model_path
+        model_path = resolve_model_path(args.model)
+        if not model_path:
+            parser.error("no VOSK model found; pass --model or --simulate-load-ms")
+
+    _report("per-connection model load", _time_connections(args.n, model_path, cold=True))
+    from app.stt import vosk_registry
+    vosk_registry.preload(model_path)
+    _report("shared registry (preloaded)", _time_connections(args.n, model_path, cold=False))
+
+
+if __name__ == "__main__":
+    main()
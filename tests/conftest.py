@@ -1,7 +1,30 @@
 import sys
 from pathlib import Path
 
+import pytest
+
 # Ensure repository root is on sys.path so tests can import the `app` package
 ROOT = Path(__file__).resolve().parents[1]
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
+
+
+@pytest.fixture(autouse=True)
+def isolated_storage(tmp_path_factory, monkeypatch):
+    """Point every storage directory at a fresh temp dir so tests never write into ./storage."""
+    from app.core.config import settings
+    from app.storage import filesystem
+    from app.stt import audio_cache
+    from app.tts import artifacts
+
+    root = tmp_path_factory.mktemp("storage")
+    monkeypatch.setattr(settings, "STORAGE_DIR", str(root))
+    monkeypatch.setattr(settings, "AUDIO_CACHE_DIR", str(root / "audio_cache"))
+    monkeypatch.setattr(settings, "TTS_ARTIFACT_DIR", str(root / "tts_artifacts"))
+    monkeypatch.setattr(settings, "SESSION_AUDIO_DIR", str(root / "session_audio"))
+    monkeypatch.setattr(filesystem, "STORAGE_DIR", root)
+    # singletons opened on first use, against whatever directory was configured then
+    monkeypatch.setattr(filesystem, "_index", None)
+    monkeypatch.setattr(audio_cache, "_cache", None)
+    monkeypatch.setattr(artifacts, "_store", None)
+    return root
@@ -1,9 +1,21 @@
 from fastapi.testclient import TestClient
 from app.main import app
 import tempfile
+import time
 
 client = TestClient(app)
 
+
+def wait_for_job(job_id, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = client.get(f"/v1/jobs/{job_id}").json()
+        if job["status"] not in ("queued", "running"):
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
 def test_finalize_with_audio_path(tmp_path):
     # Create a fake audio file
     audio = tmp_path / "sample.wav"
@@ -11,7 +23,14 @@ def test_finalize_with_audio_path(tmp_path):
     r = client.post("/v1/sessions/finalize", json={"session_id":"s_audio","audio_path":str(audio)})
     assert r.status_code == 200
     data = r.json()
-    # Expect whisper_result to be present and contain a transcript key
-    assert "whisper_reprocessed" in data and data["whisper_reprocessed"] is True
-    assert "whisper_result" in data
-    assert "transcript" in data["whisper_result"]
+    # Reprocessing runs in the background; finalize returns a job id right away
+    assert "overall_score" in data
+    assert "whisper_job" in data
+    assert data["whisper_reprocessed"] is False
+    job = wait_for_job(data["whisper_job"]["job_id"])
+    # Expect the job result to contain a transcript key
+    assert job["status"] == "succeeded"
+    assert "transcript" in job["result"]
+    # and the report to be rebuilt with it
+    assert job["report"]["whisper_reprocessed"] is True
+    assert job["report"]["whisper_result"] == job["result"]
@@ -1,31 +1,42 @@
 from fastapi.testclient import TestClient
 from app.main import app
-import os
-from unittest.mock import Mock
-import app.stt.whisper_worker as ww
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 
-client = TestClient(app)
 
 
-def test_finalize_with_audio_url(monkeypatch, tmp_path):
-    # Fake audio content served by a mocked requests.get
-    content = b"FAKEAUDIO"
+class FakeAudioHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
 
-    class FakeResp:
-        def __init__(self, content):
-            self._content = content
-            self.status_code = 200
-        def raise_for_status(self):
-            return None
-        def iter_content(self, chunk_size=8192):
-            for i in range(0, len(self._content), chunk_size):
-                yield self._content[i:i+chunk_size]
+    def do_GET(self):
+        content = b"FAKEAUDIO"
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
 
-    monkeypatch.setattr('requests.get', lambda url, stream=True, timeout=10: FakeResp(content))
 
-    # Call finalize with an audio URL; the server should download, run reprocessing (fallback), and return a whisper_result
-    r = client.post('/v1/sessions/finalize', json={"session_id":"s_url","audio_url":"http://example.com/audio.wav"})
-    assert r.status_code == 200
-    data = r.json()
-    assert data.get('whisper_reprocessed') is True
-    assert 'whisper_result' in data and 'transcript' in data['whisper_result']
+def test_finalize_with_audio_url(tmp_path):
+    # Fake audio content served by a local HTTP stand-in
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeAudioHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/audio.wav"
+    try:
+        # keep one event loop for the whole test: the download runs as a background task on it
+        with TestClient(app) as client:
+            # Call finalize with an audio URL; the server should download, run reprocessing (fallback), and return a transcript
+            r = client.post('/v1/sessions/finalize', json={"session_id":"s_url","audio_url":url})
+            assert r.status_code == 200
+            job_id = r.json()['whisper_job']['job_id']
+            for _ in range(600):
+                job = client.get(f'/v1/jobs/{job_id}').json()
+                if job['status'] not in ('queued', 'running'):
+                    break
+                time.sleep(0.05)
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert job['status'] == 'succeeded', job.get('error')
+    assert 'transcript' in job['result']
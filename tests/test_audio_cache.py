@@ -0,0 +1,113 @@
+import asyncio
+import hashlib
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.stt.audio_cache import AudioCache
+from app.stt.audio_fetcher import close_client
+
+
+class ETagHandler(BaseHTTPRequestHandler):
+    """Local stand-in for a blob host that answers conditional GETs."""
+    protocol_version = "HTTP/1.1"
+    files = {}
+    status = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        body = self.files.get(self.path)
+        if body is None:
+            return self._send(404, b"")
+        etag = '"%s"' % hashlib.md5(body).hexdigest()
+        if self.headers.get("If-None-Match") == etag:
+            return self._send(304, None, etag)
+        self._send(200, body, etag)
+
+    def _send(self, status, body, etag=None):
+        self.status.append((self.path, status))
+        self.send_response(status)
+        if etag:
+            self.send_header("ETag", etag)
+        if body is not None:
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+
+@pytest.fixture
+def etag_server():
+    ETagHandler.files = {"/a.wav": b"A" * 1000, "/a_copy.wav": b"A" * 1000, "/b.wav": b"B" * 1000, "/c.wav": b"C" * 1000}
+    ETagHandler.status = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ETagHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def _fetch_all(cache, urls):
+    async def run():
+        try:
+            return [await cache.fetch(u) for u in urls]
+        finally:
+            await close_client()
+    return asyncio.run(run())
+
+
+def _read_and_remove(path):
+    with open(path, "rb") as f:
+        data = f.read()
+    os.remove(path)
+    return data
+
+
+def test_repeat_fetch_revalidates_with_304(etag_server, tmp_path):
+    cache = AudioCache(str(tmp_path / "cache"), max_bytes=10_000)
+    first, second = _fetch_all(cache, [f"{etag_server}/a.wav", f"{etag_server}/a.wav"])
+    assert first != second
+    # checked out next to the blobs, so it is a hard link rather than a copy
+    assert os.path.dirname(first) == cache.tmp_dir
+    assert os.stat(second).st_nlink >= 2
+    assert _read_and_remove(first) == _read_and_remove(second) == b"A" * 1000
+    assert ETagHandler.status == [("/a.wav", 200), ("/a.wav", 304)]
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 1 and stats["revalidated"] == 1
+    assert stats["bytes_saved"] == 1000
+    # the cached blob survives the caller deleting its copy
+    assert cache.lookup(f"{etag_server}/a.wav") is not None
+
+
+def test_changed_content_is_refetched(etag_server, tmp_path):
+    cache = AudioCache(str(tmp_path / "cache"), max_bytes=10_000)
+    url = f"{etag_server}/a.wav"
+    _read_and_remove(_fetch_all(cache, [url])[0])
+    ETagHandler.files["/a.wav"] = b"NEW" * 10
+    assert _read_and_remove(_fetch_all(cache, [url])[0]) == b"NEW" * 10
+    assert cache.lookup(url)["sha256"] == hashlib.sha256(b"NEW" * 10).hexdigest()
+    assert cache.stats()["misses"] == 2
+
+
+def test_identical_content_is_stored_once(etag_server, tmp_path):
+    cache = AudioCache(str(tmp_path / "cache"), max_bytes=10_000)
+    for p in _fetch_all(cache, [f"{etag_server}/a.wav", f"{etag_server}/a_copy.wav"]):
+        os.remove(p)
+    assert len(os.listdir(cache.blob_dir)) == 1
+    assert cache.stats()["bytes"] == 1000
+
+
+def test_lru_eviction_keeps_cache_under_budget(etag_server, tmp_path):
+    cache = AudioCache(str(tmp_path / "cache"), max_bytes=2500)
+    # a, b, then a again (so b is least recently used), then c
+    urls = [f"{etag_server}/{n}.wav" for n in ("a", "b", "a", "c")]
+    for p in _fetch_all(cache, urls):
+        os.remove(p)
+    assert cache.lookup(urls[1]) is None
+    assert cache.lookup(urls[0]) is not None and cache.lookup(urls[3]) is not None
+    stats = cache.stats()
+    assert stats["evictions"] == 1 and stats["bytes"] <= 2500
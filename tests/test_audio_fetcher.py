@@ -1,120 +1,232 @@
-import io
+import asyncio
+import hashlib
 import os
-import types
-from unittest.mock import Mock
-import pytest
-
-from app.stt.audio_fetcher import fetch_audio_to_temp
-
-
-class FakeResponse:
-    def __init__(self, content: bytes, status_code=200):
-        self._content = content
-        self.status_code = status_code
-        self.headers = {"content-type": "audio/wav"}
-    def raise_for_status(self):
-        if not (200 <= self.status_code < 300):
-            raise Exception("HTTP error")
-    def iter_content(self, chunk_size=8192):
-        for i in range(0, len(self._content), chunk_size):
-            yield self._content[i:i+chunk_size]
-
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 
-def test_fetch_audio_to_temp_success(monkeypatch, tmp_path):
-    data = b"RIFF....WAVE" * 10
-    fake = FakeResponse(data)
-    class FakeSession:
-        def get(self, url, stream=True, timeout=10):
-            return fake
-    monkeypatch.setattr('app.stt.audio_fetcher._create_session_with_retries', lambda retries, backoff_factor: FakeSession())
+import pytest
 
-    path = fetch_audio_to_temp("http://example.com/some_audio.wav")
+from app.stt.audio_fetcher import fetch_audio, fetch_audio_to_temp, close_client
+
+
+class AudioHandler(BaseHTTPRequestHandler):
+    """Local stand-in for a remote audio host."""
+    protocol_version = "HTTP/1.1"
+    files = {}
+    hits = {}
+    peers = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        path = self.path.split("?")[0]
+        self.hits[path] = self.hits.get(path, 0) + 1
+        self.peers.append(self.client_address)
+        if path == "/flaky.wav" and self.hits[path] < 3:
+            return self._send(500, b"")
+        body = self.files.get(path)
+        if body is None:
+            return self._send(404, b"")
+        self._send(200, body)
+
+    def _send(self, status, body):
+        self.send_response(status)
+        self.send_header("Content-Type", "audio/wav")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def audio_server():
+    AudioHandler.files = {
+        "/some_audio.wav": b"RIFF....WAVE" * 10,
+        "/flaky.wav": b"RIFF....WAVE" * 5,
+        "/huge.wav": b"0" * (6 * 1024 * 1024),
+    }
+    AudioHandler.hits = {}
+    AudioHandler.peers = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), AudioHandler)
+    t = threading.Thread(target=server.serve_forever, daemon=True)
+    t.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_fetch_audio_to_temp_success(audio_server):
+    path = fetch_audio_to_temp(f"{audio_server}/some_audio.wav")
     assert os.path.exists(path)
     with open(path, 'rb') as f:
         content = f.read()
-    assert content == data
+    assert content == AudioHandler.files["/some_audio.wav"]
     os.unlink(path)
 
 
-def test_fetch_audio_too_large(monkeypatch):
-    data = b"0" * (60 * 1024 * 1024)
-    fake = FakeResponse(data)
-    class FakeSession:
-        def get(self, url, stream=True, timeout=10):
-            return fake
-    monkeypatch.setattr('app.stt.audio_fetcher._create_session_with_retries', lambda retries, backoff_factor: FakeSession())
+def test_fetch_audio_too_large(audio_server):
     with pytest.raises(ValueError):
-        fetch_audio_to_temp("http://example.com/huge.wav", max_bytes=5*1024*1024)
+        fetch_audio_to_temp(f"{audio_server}/huge.wav", max_bytes=5*1024*1024)
 
 
-def test_fetch_non_200(monkeypatch):
-    fake = FakeResponse(b"", status_code=404)
-    monkeypatch.setattr('requests.get', lambda url, stream=True, timeout=10: fake)
+def test_fetch_non_200(audio_server):
     with pytest.raises(Exception):
-        fetch_audio_to_temp("http://example.com/missing.wav")
-
-
-def test_fetch_with_retries(monkeypatch, tmp_path):
-    # Simulate two transient failures followed by success
-    data = b"RIFF....WAVE" * 5
-    calls = {'n': 0}
-
-    class MaybeFail:
-        def __init__(self, content, status_code=200):
-            self._content = content
-            self.status_code = status_code
-        def raise_for_status(self):
-            if not (200 <= self.status_code < 300):
-                raise Exception("HTTP error")
-        def iter_content(self, chunk_size=8192):
-            for i in range(0, len(self._content), chunk_size):
-                yield self._content[i:i+chunk_size]
-
-    def fake_session_get(url, stream=True, timeout=10):
-        calls['n'] += 1
-        if calls['n'] < 3:
-            return MaybeFail(b"", status_code=500)
-        return MaybeFail(data, status_code=200)
-
-    # Patch requests.Session.get used by _create_session_with_retries
-    class FakeSession:
-        def get(self, *args, **kwargs):
-            return fake_session_get(*args, **kwargs)
-
-    monkeypatch.setattr('app.stt.audio_fetcher._create_session_with_retries', lambda retries, backoff_factor: FakeSession())
-
-    path = fetch_audio_to_temp("http://example.com/retry.wav", retries=3, backoff_factor=0.01)
+        fetch_audio_to_temp(f"{audio_server}/missing.wav")
+    # 4xx is not retried
+    assert AudioHandler.hits["/missing.wav"] == 1
+
+
+def test_fetch_with_retries(audio_server):
+    # Two transient 500s followed by success
+    path = fetch_audio_to_temp(f"{audio_server}/flaky.wav", retries=3, backoff_factor=0.01)
     assert os.path.exists(path)
     with open(path, 'rb') as f:
         content = f.read()
-    assert content == data
+    assert content == AudioHandler.files["/flaky.wav"]
+    assert AudioHandler.hits["/flaky.wav"] == 3
     os.unlink(path)
 
 
-
-
-
-def test_fetch_azure(monkeypatch, tmp_path):
-    data = b"AZDATA"
-    class FakeDownloader:
-        def chunks(self):
-            yield data
-    class FakeBlobClient:
-        def download_blob(self):
-            return FakeDownloader()
-    class FakeContainer:
-        def get_blob_client(self, blob):
-            assert blob == 'a/b.wav'
-            return FakeBlobClient()
-    class FakeService:
-        def get_container_client(self, container):
-            assert container == 'mycont'
-            return FakeContainer()
-    monkeypatch.setattr('azure.storage.blob.BlobServiceClient.from_connection_string', lambda cs: FakeService())
-
+def test_small_bodies_stay_in_memory_and_connections_are_reused(audio_server):
+    async def run():
+        try:
+            small = await fetch_audio(f"{audio_server}/some_audio.wav", memory_threshold=1024)
+            spooled = await fetch_audio(f"{audio_server}/some_audio.wav", memory_threshold=16)
+            return small, spooled
+        finally:
+            await close_client()
+
+    small, spooled = asyncio.run(run())
+    assert small.path is None and small.data == AudioHandler.files["/some_audio.wav"]
+    assert spooled.data is None and os.path.exists(spooled.path)
+    with spooled.open() as f:
+        assert f.read() == small.data
+    spooled.cleanup()
+    assert not os.path.exists(spooled.path)
+    # both requests went over the same keep-alive connection
+    assert len(set(AudioHandler.peers)) == 1
+
+
+class BlobHandler(BaseHTTPRequestHandler):
+    """Azurite-style stand-in: serves blob properties (HEAD) and ranged reads (x-ms-range)."""
+    protocol_version = "HTTP/1.1"
+    blobs = {}
+    ranges = []
+    on_range = None
+
+    def log_message(self, *args):
+        pass
+
+    def _etag(self, body):
+        return '"0x%s"' % hashlib.md5(body).hexdigest()[:12]
+
+    def _blob(self):
+        # /<account>/<container>/<blob path>
+        _, _, container, name = self.path.split("?")[0].split("/", 3)
+        return self.blobs.get((container, name))
+
+    def _headers(self, status, length, extra=()):
+        self.send_response(status)
+        self.send_header("Content-Length", str(length))
+        self.send_header("x-ms-blob-type", "BlockBlob")
+        self.send_header("ETag", self._etag(self._blob() or b""))
+        self.send_header("Last-Modified", "Mon, 01 Jan 2024 00:00:00 GMT")
+        for k, v in extra:
+            self.send_header(k, v)
+        self.end_headers()
+
+    def do_HEAD(self):
+        body = self._blob()
+        if body is None:
+            return self._headers(404, 0)
+        self._headers(200, len(body))
+
+    def do_GET(self):
+        body = self._blob()
+        if body is None:
+            return self._headers(404, 0)
+        if self.headers.get("If-Match") not in (None, self._etag(body)):
+            return self._headers(412, 0, [("x-ms-error-code", "ConditionNotMet")])
+        rng = self.headers.get("x-ms-range") or self.headers.get("Range")
+        start, end = 0, len(body) - 1
+        if rng:
+            a, b = rng.split("=")[1].split("-")
+            start, end = int(a), min(int(b), len(body) - 1)
+        self.ranges.append((start, end))
+        if BlobHandler.on_range:
+            BlobHandler.on_range()
+        chunk = body[start:end + 1]
+        self._headers(206 if rng else 200, len(chunk), [("Content-Range", f"bytes {start}-{end}/{len(body)}")])
+        self.wfile.write(chunk)
+
+
+@pytest.fixture
+def azurite(monkeypatch):
+    import app.stt.audio_fetcher as af
+    BlobHandler.blobs = {}
+    BlobHandler.ranges = []
+    BlobHandler.on_range = None
+    server = ThreadingHTTPServer(("127.0.0.1", 0), BlobHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    conn = (
+        "DefaultEndpointsProtocol=http;AccountName=devstoreaccount1;AccountKey=a2V5;"
+        f"BlobEndpoint=http://127.0.0.1:{server.server_address[1]}/devstoreaccount1;"
+    )
+    monkeypatch.setenv("AZURE_STORAGE_CONNECTION_STRING", conn)
+    monkeypatch.setattr(af, "_azure_clients", {})
+    yield BlobHandler
+    server.shutdown()
+    server.server_close()
+
+
+def test_fetch_azure(azurite):
+    azurite.blobs[("mycont", "a/b.wav")] = b"AZDATA"
     path = fetch_audio_to_temp('azure://mycont/a/b.wav')
-    assert os.path.exists(path)
     with open(path, 'rb') as f:
         content = f.read()
-    assert content == data
+    assert content == b"AZDATA"
+    os.unlink(path)
+
+
+def test_fetch_azure_parallel_ranges(azurite, monkeypatch):
+    import app.stt.audio_fetcher as af
+    from app.core.config import settings
+    monkeypatch.setattr(settings, "AZURE_DOWNLOAD_RANGE_BYTES", 1000)
+    data = os.urandom(4500)
+    azurite.blobs[("mycont", "long.wav")] = data
+    path = fetch_audio_to_temp('azure://mycont/long.wav')
+    with open(path, 'rb') as f:
+        assert f.read() == data
     os.unlink(path)
+    assert sorted(azurite.ranges) == [(0, 999), (1000, 1999), (2000, 2999), (3000, 3999), (4000, 4499)]
+    # the service client is cached across downloads
+    client = next(iter(af._azure_clients.values()))
+    os.unlink(fetch_audio_to_temp('azure://mycont/long.wav'))
+    assert next(iter(af._azure_clients.values())) is client
+
+
+def test_fetch_azure_too_large(azurite):
+    azurite.blobs[("mycont", "big.wav")] = b"0" * 2048
+    with pytest.raises(ValueError):
+        fetch_audio_to_temp('azure://mycont/big.wav', max_bytes=1024)
+    # rejected from the blob properties, before any body was downloaded
+    assert azurite.ranges == []
+
+
+def test_fetch_azure_overwritten_mid_download_fails(azurite, monkeypatch):
+    from app.core.config import settings
+    monkeypatch.setattr(settings, "AZURE_DOWNLOAD_RANGE_BYTES", 1000)
+    monkeypatch.setattr(settings, "AZURE_DOWNLOAD_CONCURRENCY", 1)
+    azurite.blobs[("mycont", "changing.wav")] = b"1" * 3000
+
+    def overwrite():
+        azurite.blobs[("mycont", "changing.wav")] = b"2" * 3000
+    azurite.on_range = overwrite
+    import app.stt.audio_fetcher as af
+    from azure.core.exceptions import ResourceModifiedError
+    from azure.storage.blob import BlobServiceClient
+    # the SDK retries 412s by default; fail on the first one
+    conn = os.environ["AZURE_STORAGE_CONNECTION_STRING"]
+    monkeypatch.setitem(af._azure_clients, conn, BlobServiceClient.from_connection_string(conn, retry_total=0))
+    with pytest.raises(ResourceModifiedError):
+        fetch_audio_to_temp('azure://mycont/changing.wav')
@@ -11,17 +11,24 @@ def test_mock_tts_uses_azure_when_available(monkeypatch, tmp_path):
     monkeypatch.setattr(cfg.settings, 'AZURE_STORAGE_CONNECTION_STRING', 'UseDevelopmentStorage=true')
     monkeypatch.setattr(cfg.settings, 'AZURE_STORAGE_CONTAINER', 'testcontainer')
 
-    # Monkeypatch upload_base64 to simulate Azure upload
+    # Monkeypatch the Azure upload and URL to simulate Azure
     called = {}
-    def fake_upload(container, blob_name, b64):
+    def fake_upload(container, blob_name, data):
         called['container'] = container
         called['blob_name'] = blob_name
+        called['data'] = data
         return f"https://fake.blob/{container}/{blob_name}"
 
-    monkeypatch.setattr('app.storage.azure_blob.upload_base64', fake_upload)
+    monkeypatch.setattr('app.storage.azure_blob.upload_bytes', fake_upload)
+    monkeypatch.setattr('app.storage.azure_blob.blob_url', lambda container, blob_name: f"https://fake.blob/{container}/{blob_name}")
 
     provider = MockTTSProvider()
     import asyncio
     res = asyncio.run(provider.generate('s1','hello azure','neutral',None,'wav'))
+    # the URL comes back right away; the upload happens write-behind
     assert res['audio_url'].startswith('https://fake.blob/')
+    from app.storage.write_behind import get_write_behind
+    assert get_write_behind().flush(timeout=5)
     assert called['container'] == 'testcontainer'
+    assert res['audio_url'].endswith(called['blob_name'])
+    assert called['data'] == base64.b64decode(res['audio_b64'])
@@ -28,3 +28,43 @@ def test_generate_sas_url_parsing(monkeypatch):
     sas = az.generate_sas_url('mycontainer', 'file.wav', expiry_seconds=3600)
     assert sas is not None
     assert 'sastoken123' in sas
+
+
+def test_sas_urls_are_cached_until_reuse_window_ends(monkeypatch):
+    cs = "DefaultEndpointsProtocol=http;AccountName=cacheacct;AccountKey=key456;BlobEndpoint=http://127.0.0.1:10000/cacheacct"
+    monkeypatch.setattr(cfg.settings, 'AZURE_STORAGE_CONNECTION_STRING', cs)
+    signed = []
+
+    def fake_generate_blob_sas(account_name, container_name, blob_name, account_key, permission, expiry):
+        signed.append(blob_name)
+        return f'sig{len(signed)}'
+
+    class FakeContainerClient:
+        url = 'http://127.0.0.1:10000/cacheacct/questions'
+
+    class FakeClient:
+        def get_container_client(self, container):
+            return FakeContainerClient()
+
+    monkeypatch.setattr('app.storage.azure_blob._ensure_client', lambda: FakeClient())
+    monkeypatch.setattr('app.storage.azure_blob.generate_blob_sas', fake_generate_blob_sas, raising=False)
+    cache = az.SasCache(max_entries=2, reuse_fraction=0.5)
+    monkeypatch.setattr(az, 'sas_cache', cache)
+
+    first = az.generate_sas_url('questions', 'q1.wav', expiry_seconds=3600)
+    assert az.generate_sas_url('questions', 'q1.wav', expiry_seconds=3600) == first
+    assert signed == ['q1.wav']
+    # different permission is a different token
+    assert az.generate_sas_url('questions', 'q1.wav', expiry_seconds=3600, permission='rw') != first
+    stats = cache.stats()
+    assert stats['hits'] == 1 and stats['misses'] == 2 and stats['hit_ratio'] == 0.3333
+
+    # less than half the TTL left: signed again
+    key = (cs, 'questions', 'q1.wav', 'r')
+    cache.put(key, first, az.time.time() + 1000, 0.1)
+    assert az.generate_sas_url('questions', 'q1.wav', expiry_seconds=3600) != first
+    assert len(signed) == 3
+
+    # bounded, least recently used goes first
+    az.generate_sas_url('questions', 'q2.wav', expiry_seconds=3600)
+    assert cache.stats()['entries'] == 2
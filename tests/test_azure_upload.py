@@ -0,0 +1,139 @@
+import asyncio
+import io
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+import app.storage.azure_blob as az
+from app.core.config import settings
+
+
+class UploadHandler(BaseHTTPRequestHandler):
+    """Azurite-style stand-in: container creation, single-put blobs, staged blocks and block lists."""
+    protocol_version = "HTTP/1.1"
+    containers = set()
+    blobs = {}
+    staged = {}
+    calls = []
+    # credentials allowed to write blobs but not to create containers
+    forbid_create = False
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status, error=None):
+        self.send_response(status)
+        self.send_header("Content-Length", "0")
+        self.send_header("ETag", '"0x1"')
+        self.send_header("Last-Modified", "Mon, 01 Jan 2024 00:00:00 GMT")
+        if error:
+            self.send_header("x-ms-error-code", error)
+        self.end_headers()
+
+    def do_PUT(self):
+        url = urlsplit(self.path)
+        query = parse_qs(url.query)
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        # /<account>/<container>[/<blob>]
+        parts = url.path.split("/", 3)
+        container = parts[2]
+        if query.get("restype") == ["container"]:
+            self.calls.append(("create_container", container))
+            if self.forbid_create:
+                return self._reply(403, "AuthorizationPermissionMismatch")
+            if container in self.containers:
+                return self._reply(409, "ContainerAlreadyExists")
+            self.containers.add(container)
+            return self._reply(201)
+        if container not in self.containers:
+            return self._reply(404, "ContainerNotFound")
+        key = (container, parts[3])
+        comp = query.get("comp", [None])[0]
+        self.calls.append((comp or "put_blob", parts[3]))
+        if comp == "block":
+            self.staged.setdefault(key, {})[query["blockid"][0]] = body
+        elif comp == "blocklist":
+            ids = re.findall(r"<(?:Latest|Uncommitted)>([^<]+)</", body.decode())
+            self.blobs[key] = b"".join(self.staged[key][i] for i in ids)
+        else:
+            self.blobs[key] = body
+        self._reply(201)
+
+
+@pytest.fixture
+def azurite(monkeypatch):
+    UploadHandler.containers = set()
+    UploadHandler.blobs = {}
+    UploadHandler.staged = {}
+    UploadHandler.calls = []
+    UploadHandler.forbid_create = False
+    server = ThreadingHTTPServer(("127.0.0.1", 0), UploadHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    conn = (
+        "DefaultEndpointsProtocol=http;AccountName=devstoreaccount1;AccountKey=a2V5;"
+        f"BlobEndpoint=http://127.0.0.1:{server.server_address[1]}/devstoreaccount1;"
+    )
+    monkeypatch.setattr(settings, "AZURE_STORAGE_CONNECTION_STRING", conn)
+    monkeypatch.setattr(settings, "AZURE_STORAGE_CONTAINER", "audio")
+    monkeypatch.setattr(settings, "AZURE_BLOB_SAS_TTL_SECONDS", 0)
+    monkeypatch.setattr(az, "_blob_service_client", None)
+    monkeypatch.setattr(az, "_known_containers", set())
+    yield UploadHandler
+    server.shutdown()
+    server.server_close()
+
+
+def test_container_is_created_once(azurite):
+    assert az.upload_bytes("audio", "a.wav", b"first").endswith("/audio/a.wav")
+    assert az.upload_bytes("audio", "b.wav", b"second")
+    assert [c for c in azurite.calls if c[0] == "create_container"] == [("create_container", "audio")]
+    assert azurite.blobs[("audio", "a.wav")] == b"first"
+    assert azurite.blobs[("audio", "b.wav")] == b"second"
+
+
+def test_existing_container_is_remembered(azurite):
+    azurite.containers.add("audio")
+    assert az.upload_bytes("audio", "a.wav", b"x")
+    assert az.upload_bytes("audio", "b.wav", b"y")
+    assert sum(1 for c in azurite.calls if c[0] == "create_container") == 1
+
+
+def test_container_is_remembered_after_upload_when_create_is_forbidden(azurite):
+    azurite.containers.add("audio")
+    azurite.forbid_create = True
+    assert az.upload_bytes("audio", "a.wav", b"x")
+    assert az.upload_bytes("audio", "b.wav", b"y")
+    assert sum(1 for c in azurite.calls if c[0] == "create_container") == 1
+
+
+def test_large_payload_is_staged_in_blocks(azurite, monkeypatch):
+    monkeypatch.setattr(settings, "AZURE_UPLOAD_BLOCK_BYTES", 1000)
+    data = bytes(range(256)) * 20  # 5120 bytes -> 6 blocks
+    assert az.upload_bytes("audio", "big.wav", data)
+    assert azurite.blobs[("audio", "big.wav")] == data
+    assert sum(1 for c in azurite.calls if c[0] == "block") == 6
+    assert sum(1 for c in azurite.calls if c[0] == "blocklist") == 1
+
+
+def test_async_upload_from_file_handle(azurite, monkeypatch):
+    monkeypatch.setattr(settings, "AZURE_UPLOAD_BLOCK_BYTES", 1000)
+    data = b"0123456789" * 350
+    url = asyncio.run(az.upload_async("audio", "file.wav", io.BytesIO(data)))
+    assert url.endswith("/audio/file.wav")
+    assert azurite.blobs[("audio", "file.wav")] == data
+    assert sum(1 for c in azurite.calls if c[0] == "block") == 4
+
+    # small file: one put, no blocks
+    assert asyncio.run(az.upload_async("audio", "small.wav", io.BytesIO(b"tiny")))
+    assert ("put_blob", "small.wav") in azurite.calls
+
+
+def test_deleted_container_is_recreated(azurite):
+    assert az.upload_bytes("audio", "a.wav", b"1")
+    azurite.containers.clear()  # deleted out of band
+    assert az.upload_bytes("audio", "b.wav", b"2") is None
+    assert az.upload_bytes("audio", "b.wav", b"2")
+    assert sum(1 for c in azurite.calls if c[0] == "create_container") == 2
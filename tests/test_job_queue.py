@@ -0,0 +1,84 @@
+import threading
+import time
+
+from fastapi.testclient import TestClient
+
+import app.jobs.queue as jq
+from app.main import app
+
+client = TestClient(app)
+
+
+def _block(event):
+    event.wait(5)
+    return "done"
+
+
+def test_queue_backpressure_and_cancel():
+    q = jq.JobQueue(max_workers=1, max_pending=2, use_processes=False)
+    gate = threading.Event()
+    running = q.submit("t", _block, gate)
+    queued = q.submit("t", _block, gate)
+    try:
+        q.submit("t", _block, gate)
+        assert False, "expected QueueFullError"
+    except jq.QueueFullError:
+        pass
+    assert q.cancel(queued.id)
+    assert q.get(queued.id).status == "cancelled"
+    gate.set()
+    running.future.result(timeout=5)
+    assert q.get(running.id).to_dict()["result"] == "done"
+    assert q.stats()["rejected"] == 1
+    q.shutdown(wait=True)
+
+
+def test_running_job_cannot_be_cancelled_and_stays_pending():
+    q = jq.JobQueue(max_workers=1, max_pending=1, use_processes=False)
+    gate = threading.Event()
+    running = q.submit("t", _block, gate)
+    deadline = time.time() + 5
+    while running.status != "running" and time.time() < deadline:
+        time.sleep(0.01)
+    assert not q.cancel(running.id)
+    assert running.status == "cancelling"
+    # the worker is still busy, so the slot is not freed
+    try:
+        q.submit("t", _block, gate)
+        assert False, "expected QueueFullError"
+    except jq.QueueFullError:
+        pass
+    gate.set()
+    running.future.exception(timeout=5)
+    assert running.status == "cancelled" and "result" not in running.to_dict()
+    assert q.stats()["pending"] == 0
+    q.shutdown(wait=True)
+
+
+def test_finalize_returns_503_when_queue_full(monkeypatch, tmp_path):
+    gate = threading.Event()
+    q = jq.JobQueue(max_workers=1, max_pending=1, use_processes=False)
+    q.submit("t", _block, gate)
+    monkeypatch.setattr(jq, "_reprocess_queue", q)
+    audio = tmp_path / "a.wav"
+    audio.write_bytes(b"x")
+    r = client.post("/v1/sessions/finalize", json={"session_id": "s_full", "audio_path": str(audio)})
+    assert r.status_code == 503
+    gate.set()
+    q.shutdown(wait=True)
+
+
+def test_cancel_endpoint_and_unknown_job(monkeypatch, tmp_path):
+    gate = threading.Event()
+    q = jq.JobQueue(max_workers=1, max_pending=4, use_processes=False)
+    q.submit("t", _block, gate)
+    monkeypatch.setattr(jq, "_reprocess_queue", q)
+    audio = tmp_path / "b.wav"
+    audio.write_bytes(b"x")
+    job_id = client.post("/v1/sessions/finalize", json={"session_id": "s_cancel", "audio_path": str(audio)}).json()["whisper_job"]["job_id"]
+    r = client.delete(f"/v1/jobs/{job_id}")
+    assert r.status_code == 200 and r.json()["cancelled"] is True
+    assert client.get(f"/v1/jobs/{job_id}").json()["status"] == "cancelled"
+    assert client.get("/v1/jobs/job-missing").status_code == 404
+    gate.set()
+    q.shutdown(wait=True)
@@ -0,0 +1,135 @@
+import asyncio
+import base64
+
+from fastapi.testclient import TestClient
+
+from app.core.config import Settings, settings
+from app.main import app
+from app.pipeline import prefetch
+from app.pipeline.prefetch import Prefetcher
+from app.tts import cache as tts_cache
+
+client = TestClient(app)
+
+
+def test_prefetch_prepares_question_and_audio():
+    async def run():
+        p = Prefetcher(budget_per_turn=4, purposes=["next"])
+        assert p.start("pf1") == 1
+        assert p.start("pf1") == 0  # already running for this turn
+        return p, await p.take("pf1", timeout=5)
+
+    p, question = asyncio.run(run())
+    assert question["question_text"]
+    assert question["tts"]["audio_url"]
+    # the audio is in the shared TTS cache, so serving it later needs no synthesis
+    assert tts_cache.peek_cached(question["question_text"], "neutral", None, "wav", None, None) == question["tts"]
+    assert p.stats()["used"] == 1
+
+
+def test_budget_is_bounded_per_turn():
+    async def run():
+        p = Prefetcher(budget_per_turn=3, purposes=["next", "follow_up"])
+        first = p.start("pf2")
+        # a different seed restarts both, but only one fits in what is left of the budget
+        restarted = p.start("pf2", seed_question_id="q7")
+        await p.take("pf2", timeout=5)
+        next_turn = p.start("pf2")
+        p.cancel("pf2")
+        return p, first, restarted, next_turn
+
+    p, first, restarted, next_turn = asyncio.run(run())
+    assert (first, restarted, next_turn) == (2, 1, 2)
+    assert p.stats()["over_budget"] == 1 and p.stats()["restarted"] == 2
+
+
+def test_seed_comes_from_the_last_question_handed_over(monkeypatch):
+    seeds = []
+
+    async def question(session_id, seed_question_id=None, **kwargs):
+        seeds.append(seed_question_id)
+        return {"question_id": f"q{len(seeds)}", "question_text": "Why?"}
+
+    monkeypatch.setattr(prefetch, "generate_question", question)
+
+    async def run():
+        p = Prefetcher(budget_per_turn=4, purposes=["next"])
+        p.start("pf4", seed_question_id="q0")
+        await p.take("pf4", timeout=5)
+        # first audio of the next turn: no id yet, but it answers q1
+        p.start("pf4")
+        assert p.start("pf4", seed_question_id="q1") == 0
+        await p.take("pf4", timeout=5)
+        p.cancel("pf4")
+        return p
+
+    p = asyncio.run(run())
+    assert seeds == ["q0", "q1"]
+    assert p.stats()["restarted"] == 0
+
+
+def test_take_timeout_cancels_instead_of_leaking_into_next_turn(monkeypatch):
+    calls = []
+
+    async def question(session_id, seed_question_id=None, **kwargs):
+        calls.append(seed_question_id)
+        if len(calls) == 1:
+            await asyncio.sleep(10)
+        return {"question_id": f"after-{seed_question_id}", "question_text": "Why?"}
+
+    monkeypatch.setattr(prefetch, "generate_question", question)
+
+    async def run():
+        p = Prefetcher(budget_per_turn=4, purposes=["next"])
+        p.start("pf5", seed_question_id="q1")
+        late = await p.take("pf5", timeout=0.01)
+        p.start("pf5", seed_question_id="q2")
+        nxt = await p.take("pf5", timeout=5)
+        p.cancel("pf5")
+        return p, late, nxt
+
+    p, late, nxt = asyncio.run(run())
+    assert late is None
+    assert nxt["question_id"] == "after-q2"
+    assert p.stats()["cancelled"] == 1
+
+
+def test_close_cancels_outstanding_prefetch(monkeypatch):
+    async def slow_question(session_id, **kwargs):
+        await asyncio.sleep(10)
+
+    monkeypatch.setattr(prefetch, "generate_question", slow_question)
+
+    async def run():
+        p = Prefetcher(budget_per_turn=4, purposes=["next"])
+        p.start("pf3")
+        await asyncio.sleep(0)
+        task = p._sessions["pf3"].tasks["next"]
+        cancelled = p.cancel("pf3")
+        await asyncio.sleep(0)
+        return p, task, cancelled
+
+    p, task, cancelled = asyncio.run(run())
+    assert cancelled == 1 and task.cancelled()
+    assert p.stats()["sessions"] == 0 and p.stats()["cancelled"] == 1
+
+
+def test_prefetch_is_off_by_default(monkeypatch):
+    monkeypatch.delenv("PREFETCH_ENABLED", raising=False)
+    assert not Settings().PREFETCH_ENABLED
+
+
+def test_prefetched_next_question_follows_turn_result(monkeypatch):
+    monkeypatch.setattr(settings, "PREFETCH_ENABLED", True)
+    with client.websocket_connect("/v1/ws/audio/pf_ws") as ws:
+        ws.send_json({"type": "audio_chunk", "data": base64.b64encode(b"my answer").decode("ascii")})
+        ws.receive_json()
+        ws.send_json({"type": "sim_transcript", "transcript": "I led the migration and the result was faster builds"})
+        msg = ws.receive_json()
+        assert msg["type"] == "turn_result" and "next_question" not in msg["result"]
+        pushed = ws.receive_json()
+    assert pushed["type"] == "next_question"
+    nxt = pushed["question"]
+    assert nxt["question_text"] and nxt["tts"]["audio_url"]
+    # the connection closed, so nothing is left running for the session
+    assert "pf_ws" not in prefetch.get_prefetcher()._sessions
@@ -0,0 +1,198 @@
+import os
+import time
+import wave
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import app.stt.whisper_worker as ww
+from app.core.config import settings
+from app.main import app
+from app.stt import session_audio
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def spool_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "SESSION_AUDIO_DIR", str(tmp_path / "spool"))
+    monkeypatch.setattr(settings, "SESSION_AUDIO_SPOOL", True)
+    return tmp_path / "spool"
+
+
+def _pcm(samples):
+    return np.asarray(samples, dtype="<i2").tobytes()
+
+
+def test_spool_appends_and_reads_back_via_mmap(spool_dir):
+    spool = session_audio.SessionAudioSpool("s/../x")
+    spool.append(_pcm([0, 16384]))
+    spool.append(_pcm([-16384]))
+    # readable before the header is patched (e.g. by a worker while the socket is open)
+    spool.flush()
+    assert session_audio.read_pcm(spool.path).tolist() == [0.0, 0.5, -0.5]
+    spool.close()
+    assert spool.path.startswith(str(spool_dir))
+    with wave.open(spool.path) as w:
+        assert (w.getframerate(), w.getnchannels(), w.getnframes()) == (16000, 1, 3)
+    # a reconnect keeps appending to the same recording
+    again = session_audio.SessionAudioSpool("s/../x")
+    again.append(_pcm([1]))
+    again.close()
+    assert len(session_audio.read_pcm(spool.path)) == 4
+
+
+def test_spool_caps_bytes_per_session(spool_dir):
+    spool = session_audio.SessionAudioSpool("capped", max_bytes=6)
+    spool.append(_pcm([1, 2]))
+    spool.append(_pcm([3, 4]))
+    spool.close()
+    assert spool.data_bytes == 6 and spool.dropped_bytes == 2
+    assert session_audio.spool_path("capped") == spool.path
+    assert session_audio.spool_path("never_streamed") is None
+
+
+def test_spool_buffers_until_flush_threshold(spool_dir):
+    spool = session_audio.SessionAudioSpool("buffered", flush_bytes=6)
+    assert spool.append(_pcm([1, 2])) is False
+    assert os.path.getsize(spool.path) == session_audio.HEADER_BYTES
+    assert spool.append(_pcm([3])) is True
+    spool.flush()
+    assert os.path.getsize(spool.path) == session_audio.HEADER_BYTES + 6
+    spool.close()
+
+
+def test_second_writer_for_a_session_is_rejected(spool_dir):
+    spool = session_audio.SessionAudioSpool("shared")
+    with pytest.raises(session_audio.SpoolBusyError):
+        session_audio.SessionAudioSpool("shared")
+    spool.close()
+    # free again once the first connection is done
+    session_audio.SessionAudioSpool("shared").close()
+
+
+def test_collect_expired_skips_open_spools(spool_dir):
+    old = session_audio.SessionAudioSpool("old")
+    old.append(_pcm([1]))
+    old.close()
+    recording = session_audio.SessionAudioSpool("recording")
+    recording.append(_pcm([1]))
+    recording.flush()
+    fresh = session_audio.SessionAudioSpool("fresh")
+    fresh.close()
+    past = time.time() - 7200
+    os.utime(old.path, (past, past))
+    os.utime(recording.path, (past, past))
+    assert session_audio.collect_expired(3600) == session_audio.HEADER_BYTES + 2
+    assert not os.path.exists(old.path)
+    assert os.path.exists(recording.path) and os.path.exists(fresh.path)
+    recording.close()
+
+
+def test_websocket_opens_spool_on_first_frame_and_rejects_second_writer(spool_dir):
+    with client.websocket_connect("/v1/ws/audio/s_quiet") as ws:
+        ws.send_json({"type": "config", "audio_encoding": "binary"})
+        ws.receive_json()
+    assert not os.path.exists(session_audio.spool_file("s_quiet"))
+
+    with client.websocket_connect("/v1/ws/audio/s_twice") as first:
+        first.send_json({"type": "config", "audio_encoding": "binary"})
+        first.receive_json()
+        first.send_bytes(b"first")
+        first.receive_json()
+        with client.websocket_connect("/v1/ws/audio/s_twice") as second:
+            second.send_json({"type": "config", "audio_encoding": "binary"})
+            second.receive_json()
+            second.send_bytes(b"second")
+            msg = second.receive_json()
+            assert msg["type"] == "error" and "already being recorded" in msg["message"]
+    for _ in range(100):
+        if session_audio.spool_path("s_twice") is not None:
+            break
+        time.sleep(0.02)
+    with open(session_audio.spool_file("s_twice"), "rb") as f:
+        assert f.read()[session_audio.HEADER_BYTES:] == b"first"
+
+
+def test_decode_maps_spooled_session_audio(spool_dir, monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("spools should not go through the generic decoder")
+    monkeypatch.setattr(ww, "decode_audio", fail, raising=False)
+    spool = session_audio.SessionAudioSpool("dec")
+    spool.append(_pcm([8192] * 10))
+    spool.close()
+    audio = ww._decode(spool.path)
+    assert audio.dtype == np.float32 and np.allclose(audio, 0.25)
+
+
+def test_finalize_reprocesses_websocket_audio_without_upload(spool_dir):
+    with client.websocket_connect("/v1/ws/audio/s_spooled") as ws:
+        ws.send_json({"type": "config", "audio_encoding": "binary"})
+        ws.receive_json()
+        ws.send_bytes(b"spooled audio")
+        ws.receive_json()
+    # buffered frames are written when the server side closes the spool
+    for _ in range(100):
+        if session_audio.spool_path("s_spooled") is not None:
+            break
+        time.sleep(0.02)
+    assert session_audio.spool_path("s_spooled") is not None
+
+    r = client.post("/v1/sessions/finalize", json={"session_id": "s_spooled"})
+    assert r.status_code == 200
+    job_id = r.json()["whisper_job"]["job_id"]
+    for _ in range(600):
+        job = client.get(f"/v1/jobs/{job_id}").json()
+        if job["status"] not in ("queued", "running"):
+            break
+        time.sleep(0.05)
+    assert job["status"] == "succeeded", job.get("error")
+    assert "transcript" in job["result"]
+    # faster-whisper isn't installed here: the simulated transcript doesn't replace the recording
+    assert session_audio.spool_path("s_spooled") is not None
+    r = client.post("/v1/sessions/finalize", json={"session_id": "s_spooled"})
+    assert "whisper_job" in r.json()
+
+
+def test_spool_removed_only_after_a_real_transcription(spool_dir, monkeypatch):
+    class Segment:
+        start, end, text = 0.0, 1.0, "hello"
+
+    class FakeModel:
+        def transcribe(self, source, **kwargs):
+            return [Segment()], {}
+
+    def broken(*args, **kwargs):
+        raise RuntimeError("model failed")
+
+    spool = session_audio.SessionAudioSpool("s_real")
+    spool.append(_pcm([1, 2]))
+    spool.close()
+    monkeypatch.setattr(ww, "get_model", broken)
+    assert "transcript" in ww.reprocess_session_audio(spool.path)
+    assert os.path.exists(spool.path)
+
+    monkeypatch.setattr(ww, "get_model", lambda *args, **kwargs: FakeModel())
+    assert ww.reprocess_session_audio(spool.path)["transcript"] == "hello"
+    assert not os.path.exists(spool.path)
+
+
+def test_spool_is_not_removed_while_recording(spool_dir):
+    spool = session_audio.SessionAudioSpool("s_live")
+    spool.append(_pcm([1, 2]))
+    spool.flush()
+    r = client.post("/v1/sessions/finalize", json={"session_id": "s_live", "use_session_audio": False})
+    assert r.status_code == 200
+    assert os.path.exists(spool.path)
+    spool.close()
+    assert session_audio.remove("s_live") and not os.path.exists(spool.path)
+
+
+def test_finalize_without_reprocessing_deletes_the_spool(spool_dir):
+    spool = session_audio.SessionAudioSpool("s_optout")
+    spool.append(_pcm([1, 2]))
+    spool.close()
+    r = client.post("/v1/sessions/finalize", json={"session_id": "s_optout", "use_session_audio": False})
+    assert r.status_code == 200 and "whisper_job" not in r.json()
+    assert not os.path.exists(spool.path)
@@ -0,0 +1,253 @@
+import asyncio
+import json
+
+import pytest
+
+from app.state import session_store as store
+
+
+class FakeAsyncRedis:
+    """Just enough of redis.asyncio for the session store: hashes, GET/DEL and MULTI pipelines."""
+    def __init__(self):
+        self.data = {}
+        self.calls = []
+        self.published = []
+        self.subscribers = []
+
+    def _hash(self, key):
+        value = self.data.setdefault(key, {})
+        if not isinstance(value, dict):
+            raise Exception("WRONGTYPE Operation against a key holding the wrong kind of value")
+        return value
+
+    async def hset(self, key, mapping):
+        self.calls.append("hset")
+        await asyncio.sleep(0)
+        self._hash(key).update({k.encode(): v.encode() for k, v in mapping.items()})
+
+    async def hget(self, key, field):
+        self.calls.append("hget")
+        return self._hash(key).get(field.encode())
+
+    async def hgetall(self, key):
+        self.calls.append("hgetall")
+        if key not in self.data:
+            return {}
+        return dict(self._hash(key))
+
+    async def get(self, key):
+        value = self.data.get(key)
+        if isinstance(value, dict):
+            raise Exception("WRONGTYPE Operation against a key holding the wrong kind of value")
+        return value
+
+    async def delete(self, key):
+        self.calls.append("delete")
+        self.data.pop(key, None)
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def pubsub(self, ignore_subscribe_messages=False):
+        sub = FakePubSub()
+        self.subscribers.append(sub)
+        return sub
+
+    def deliver(self, message):
+        for sub in self.subscribers:
+            sub.queue.put_nowait({"type": "message", "data": message.encode()})
+
+
+class FakePubSub:
+    def __init__(self):
+        self.queue = asyncio.Queue()
+
+    async def subscribe(self, channel):
+        self.channel = channel
+
+    async def listen(self):
+        while True:
+            yield await self.queue.get()
+
+    async def aclose(self):
+        pass
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.ops = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def delete(self, key):
+        self.ops.append(("delete", key))
+
+    def publish(self, channel, message):
+        self.ops.append(("publish", channel, message))
+
+    def hset(self, key, mapping):
+        self.ops.append(("hset", key, mapping))
+
+    async def execute(self):
+        self.redis.calls.append("pipeline")
+        for op in self.ops:
+            if op[0] == "delete":
+                self.redis.data.pop(op[1], None)
+            elif op[0] == "publish":
+                self.redis.published.append(op[2])
+                self.redis.deliver(op[2])
+            else:
+                self.redis._hash(op[1]).update({k.encode(): v.encode() for k, v in op[2].items()})
+
+
+@pytest.fixture(params=["memory", "redis"])
+def backend(request, monkeypatch):
+    fake = FakeAsyncRedis() if request.param == "redis" else None
+    monkeypatch.setattr(store, "_redis", fake)
+    monkeypatch.setattr(store, "_sessions", {})
+    monkeypatch.setattr(store, "near_cache", store.NearCache(ttl_seconds=5, max_entries=100))
+    return fake
+
+
+@pytest.fixture
+def redis_backend(monkeypatch):
+    fake = FakeAsyncRedis()
+    monkeypatch.setattr(store, "_redis", fake)
+    monkeypatch.setattr(store, "near_cache", store.NearCache(ttl_seconds=5, max_entries=100))
+    return fake
+
+
+def test_same_api_on_both_backends(backend):
+    async def scenario():
+        await store.create_session("st1", {"persona": "friendly", "client_tts": False, "role_info": {"level": "senior"}})
+        assert await store.get_session("st1") == {"persona": "friendly", "client_tts": False, "role_info": {"level": "senior"}}
+        await store.set_session_field("st1", "client_tts", True)
+        assert await store.get_session_field("st1", "client_tts") is True
+        assert await store.get_session_field("st1", "missing", "dflt") == "dflt"
+        # returned dicts are copies, not live views of the store
+        sess = await store.get_session("st1")
+        sess["persona"] = "strict"
+        assert (await store.get_session("st1"))["persona"] == "friendly"
+        await store.delete_session("st1")
+        assert await store.get_session("st1") == {}
+
+    asyncio.run(scenario())
+
+
+def test_concurrent_field_updates_are_not_lost(backend):
+    async def scenario():
+        await store.create_session("st2", {"persona": "neutral"})
+        await asyncio.gather(
+            store.set_session_field("st2", "emotion_opt_in", True),
+            store.set_session_field("st2", "client_tts", True),
+        )
+        return await store.get_session("st2")
+
+    assert asyncio.run(scenario()) == {"persona": "neutral", "emotion_opt_in": True, "client_tts": True}
+
+
+def test_writes_are_single_round_trips(monkeypatch):
+    fake = FakeAsyncRedis()
+    monkeypatch.setattr(store, "_redis", fake)
+    monkeypatch.setattr(store, "near_cache", store.NearCache(ttl_seconds=0, max_entries=100))
+
+    async def scenario():
+        await store.create_session("st3", {"a": 1, "b": 2})
+        await store.set_session_fields("st3", {"a": 3, "c": 4})
+        return await store.get_session("st3")
+
+    assert asyncio.run(scenario()) == {"a": 3, "b": 2, "c": 4}
+    # create = one MULTI pipeline, update = one HSET + invalidation PUBLISH pipeline, read = one HGETALL
+    assert fake.calls == ["pipeline", "pipeline", "hgetall"]
+    assert fake.published == ["st3", "st3"]
+
+
+def test_legacy_json_sessions_are_upgraded(monkeypatch):
+    fake = FakeAsyncRedis()
+    fake.data["session:old"] = json.dumps({"persona": "strict", "client_tts": False}).encode()
+    monkeypatch.setattr(store, "_redis", fake)
+    monkeypatch.setattr(store, "near_cache", store.NearCache(ttl_seconds=0, max_entries=100))
+
+    async def scenario():
+        assert await store.get_session("old") == {"persona": "strict", "client_tts": False}
+        await store.set_session_field("old", "client_tts", True)
+        return await store.get_session("old")
+
+    assert asyncio.run(scenario()) == {"persona": "strict", "client_tts": True}
+    assert isinstance(fake.data["session:old"], dict)
+
+
+def test_near_cache_serves_repeat_reads_without_redis(redis_backend):
+
+    async def scenario():
+        await store.create_session("nc1", {"client_tts": False})
+        for _ in range(4):
+            assert (await store.get_session("nc1"))["client_tts"] is False
+        assert await store.get_session_field("nc1", "client_tts") is False
+        # a local write drops the cached copy at once
+        await store.set_session_field("nc1", "client_tts", True)
+        assert await store.get_session_field("nc1", "client_tts") is True
+
+    asyncio.run(scenario())
+    assert redis_backend.calls.count("hgetall") == 2
+    stats = store.near_cache.stats()
+    assert stats["hits"] == 4 and stats["misses"] == 2 and stats["hit_ratio"] == 0.6667
+    assert stats["invalidations"] >= 2
+
+
+def test_other_process_writes_invalidate_via_pubsub(redis_backend):
+
+    async def scenario():
+        task = store.start_invalidation_listener()
+        await asyncio.sleep(0)
+        assert store.near_cache.listening
+        await store.create_session("nc2", {"persona": "neutral"})
+        assert (await store.get_session("nc2"))["persona"] == "neutral"
+        # another worker updates the hash and publishes the id
+        redis_backend.data["session:nc2"][b"persona"] = b'"strict"'
+        assert (await store.get_session("nc2"))["persona"] == "neutral"  # still the cached copy
+        redis_backend.deliver("nc2")
+        await asyncio.sleep(0)
+        assert (await store.get_session("nc2"))["persona"] == "strict"
+        await store.close()
+        assert task.done() and not store.near_cache.listening
+
+    asyncio.run(scenario())
+
+
+def test_read_racing_a_write_does_not_cache_the_old_hash(redis_backend, monkeypatch):
+
+    class RacingPipeline(FakePipeline):
+        async def execute(self):
+            # a read lands after the writer's first invalidation but before Redis has the new value
+            assert (await store.get_session("nc3"))["persona"] == "neutral"
+            await super().execute()
+
+    async def scenario():
+        await store.create_session("nc3", {"persona": "neutral"})
+        monkeypatch.setattr(redis_backend, "pipeline", lambda transaction=True: RacingPipeline(redis_backend))
+        await store.set_session_field("nc3", "persona", "strict")
+        assert (await store.get_session("nc3"))["persona"] == "strict"
+
+    asyncio.run(scenario())
+
+
+def test_near_cache_ttl_and_fill_race():
+    cache = store.NearCache(ttl_seconds=0.05, max_entries=2)
+    generation = cache.generation()
+    cache.invalidate("s")  # write lands while a read is in flight
+    cache.put("s", {"v": 1}, generation)
+    assert cache.get("s") is None
+
+    cache.put("s", {"v": 2}, cache.generation())
+    assert cache.get("s") == {"v": 2}
+    import time
+    time.sleep(0.06)
+    assert cache.get("s") is None
+    stats = cache.stats()
+    assert stats["expired"] == 1 and stats["served_age_ms_p99"] < 50
@@ -0,0 +1,110 @@
+import os
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.storage import filesystem as fs
+from app.storage.index import ArtifactIndex
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    monkeypatch.setattr(fs, "STORAGE_DIR", tmp_path)
+    monkeypatch.setattr(fs, "_index", None)
+    yield tmp_path
+    monkeypatch.setattr(fs, "_index", None)
+
+
+def test_files_are_sharded_and_indexed(storage):
+    path = fs.save_bytes("sess_abc.wav", b"12345", owner="sess")
+    rel = os.path.relpath(path, storage).split(os.sep)
+    assert len(rel) == 3 and all(len(p) == 2 for p in rel[:2])
+    assert rel[2] == "sess_abc.wav"
+    assert fs.get_path("sess_abc.wav") == path
+    assert fs.list_files() == [path]
+    entry = fs.get_index().get("sess_abc.wav")
+    assert entry["size"] == 5 and entry["owner"] == "sess"
+
+    assert fs.delete("sess_abc.wav")
+    assert not os.path.exists(path) and fs.list_files() == []
+    with pytest.raises(ValueError):
+        fs.path_for("../escape.wav")
+
+
+def test_legacy_flat_files_are_adopted(storage):
+    (storage / "old_one.wav").write_bytes(b"old")
+    assert fs.get_path("old_one.wav") == str((storage / "old_one.wav").resolve())
+    assert fs.adopt_legacy_files() == 1
+    assert not (storage / "old_one.wav").exists()
+    assert open(fs.get_path("old_one.wav"), "rb").read() == b"old"
+    assert fs.get_index().get("old_one.wav")["size"] == 3
+
+
+def test_index_files_are_not_served_as_legacy_artifacts(storage):
+    fs.save_bytes("idx_probe.wav", b"x")
+    (storage / "index.sqlite3-wal").write_bytes(b"wal")
+    (storage / "index.sqlite3.bak").write_bytes(b"bak")
+    for name in ("index.sqlite3", "index.sqlite3-wal", "index.sqlite3-shm", "index.sqlite3.bak"):
+        assert client.get(f"/v1/tts/files/{name}").status_code == 404
+    assert fs.adopt_legacy_files() == 0
+
+
+def test_paginated_listing_by_session(storage):
+    for i in range(5):
+        fs.save_bytes(f"s_page_{i}.wav", b"x" * (i + 1), owner="s_page")
+    fs.save_bytes("other_0.wav", b"y", owner="other")
+
+    names, cursor = [], None
+    while True:
+        params = {"limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        r = client.get("/v1/sessions/s_page/artifacts", params=params)
+        assert r.status_code == 200
+        body = r.json()
+        assert len(body["artifacts"]) <= 2
+        names += [a["name"] for a in body["artifacts"]]
+        cursor = body["next_cursor"]
+        if cursor is None:
+            break
+    assert names == [f"s_page_{i}.wav" for i in range(5)]
+    assert client.get("/v1/sessions/s_page/artifacts", params={"cursor": "garbage"}).status_code == 400
+
+
+def test_gc_enforces_byte_budget_and_retention(tmp_path):
+    index = ArtifactIndex(str(tmp_path / "index.sqlite3"))
+    now = time.time()
+    for i in range(6):
+        p = tmp_path / f"a{i}.wav"
+        p.write_bytes(b"z" * 100)
+        index.add(p.name, str(p), 100, "s", created_at=now - 1000 + i)
+
+    # over budget: the oldest go first
+    assert index.collect(max_bytes=350) == 300
+    assert not (tmp_path / "a0.wav").exists() and not (tmp_path / "a2.wav").exists()
+    assert (tmp_path / "a3.wav").exists()
+    assert index.totals() == (3, 300)
+
+    assert index.collect(max_age_seconds=996.5) == 100  # a3 is older than the cutoff
+    assert index.totals() == (2, 200)
+    stats = index.stats()
+    assert stats["gc_runs"] == 2 and stats["gc_deleted"] == 4 and stats["gc_bytes_freed"] == 400
+
+
+def test_stats_come_from_running_counters(tmp_path):
+    index = ArtifactIndex(str(tmp_path / "index.sqlite3"))
+    index.add("a.wav", str(tmp_path / "a.wav"), 100, "s")
+    index.add("b.wav", str(tmp_path / "b.wav"), 50, "s")
+    index.add("a.wav", str(tmp_path / "a.wav"), 70, "s")  # replaced, not added
+    index.remove("b.wav")
+    index.remove("missing.wav")
+
+    def no_queries():
+        raise AssertionError("stats() should not touch SQLite")
+    index._db = no_queries
+    stats = index.stats()
+    assert (stats["files"], stats["bytes"]) == (1, 70)
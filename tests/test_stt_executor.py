@@ -0,0 +1,79 @@
+import asyncio
+import json
+import sys
+import threading
+import time
+import types
+
+import app.stt.vosk_registry as registry
+from app.stt.executor import RecognitionExecutor
+from app.stt.provider import VoskSTTProvider
+
+
+def test_lane_preserves_order_and_reports_stats():
+    ex = RecognitionExecutor(max_workers=2)
+    seen = []
+
+    def work(i):
+        # later chunks finish faster; ordering must still hold within the lane
+        time.sleep(0.02 if i == 0 else 0.001)
+        seen.append(i)
+        return i
+
+    async def run():
+        lane = ex.lane()
+        return await asyncio.gather(*(lane.run(work, i) for i in range(5)))
+
+    assert asyncio.run(run()) == [0, 1, 2, 3, 4]
+    assert seen == [0, 1, 2, 3, 4]
+    stats = ex.stats()
+    assert stats["completed"] == 5
+    assert stats["queue_depth"] == 0 and stats["in_flight"] == 0
+    assert stats["wait_ms_max"] >= 0
+    ex.shutdown(wait=True)
+
+
+def test_vosk_recognition_runs_off_event_loop(monkeypatch, tmp_path):
+    threads = []
+
+    class Model:
+        def __init__(self, path):
+            pass
+
+    class KaldiRecognizer:
+        def __init__(self, model, rate):
+            self.n = 0
+
+        def SetWords(self, enabled):
+            pass
+
+        def AcceptWaveform(self, data):
+            threads.append(threading.current_thread().name)
+            self.n += 1
+            return self.n == 1
+
+        def Result(self):
+            return json.dumps({"text": "hello", "result": [{"word": "hello", "start": 0.0, "end": 0.4}]})
+
+        def PartialResult(self):
+            return json.dumps({"partial": "wor"})
+
+        def FinalResult(self):
+            return json.dumps({"text": "world", "result": [{"word": "world", "start": 0.5, "end": 0.9}]})
+
+    monkeypatch.setitem(sys.modules, 'vosk', types.SimpleNamespace(Model=Model, KaldiRecognizer=KaldiRecognizer))
+    registry.unload()
+
+    async def run():
+        stt = VoskSTTProvider(session_id='s-exec', model_path=str(tmp_path))
+        await stt.process_chunk(b'\x00' * 320)
+        await stt.process_chunk(b'\x00' * 320)
+        partial = stt.get_partial()
+        return partial, await stt.finalize()
+
+    partial, res = asyncio.run(run())
+    registry.unload()
+    assert threads and all(name.startswith('stt-rec') for name in threads)
+    assert partial == 'wor'
+    # words from the closed utterance are kept alongside the final one
+    assert res['transcript'] == 'hello world'
@@ -1,6 +1,7 @@
 from fastapi.testclient import TestClient
 from app.main import app
 import base64
+import json
 
 client = TestClient(app)
 
@@ -21,17 +22,38 @@ def test_tts_generate_and_cache():
 def test_tts_ws_streaming():
     with client.websocket_connect("/v1/tts/ws/s1") as ws:
         ws.send_json({"type":"generate","text":"Welcome to the interview","persona":"neutral","emotion": None})
-        got_chunk = False
+        audio = b""
         while True:
             msg = ws.receive_json()
             if msg["type"] == "audio_chunk":
                 # Decode to ensure valid base64
-                b = base64.b64decode(msg["data"].encode("ascii"))
-                assert b.startswith(b"AUDIO")
-                got_chunk = True
+                audio += base64.b64decode(msg["data"].encode("ascii"))
             elif msg["type"] == "complete":
                 assert "audio_url" in msg
-                assert got_chunk
+                assert audio.startswith(b"AUDIO")
+                assert audio.endswith(b"Welcome to the interview")
                 break
             else:
                 assert False, f"Unexpected msg: {msg}"
+
+
+def test_tts_ws_binary_frames_and_latency():
+    with client.websocket_connect("/v1/tts/ws/s1") as ws:
+        ws.send_json({"type":"config","audio_encoding":"binary"})
+        assert ws.receive_json()["audio_encoding"] == "binary"
+        ws.send_json({"type":"generate","text":"Tell me about a project you led","persona":"neutral"})
+        frames = []
+        while True:
+            msg = ws.receive()
+            if msg.get("bytes") is not None:
+                frames.append(msg["bytes"])
+                continue
+            done = json.loads(msg["text"])
+            break
+    # audio arrives incrementally, before synthesis finishes
+    assert len(frames) > 1
+    assert b"".join(frames) == b"AUDIO:neutral:none:Tell me about a project you led"
+    assert done["type"] == "complete"
+    assert 0 < done["time_to_first_chunk_ms"] < done["synthesis_ms"]
+    stats = client.get("/v1/metrics").json()["tts_stream"]
+    assert stats["streams"] >= 1 and stats["first_chunk_ms_p50"] > 0
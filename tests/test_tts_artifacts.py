@@ -0,0 +1,142 @@
+import base64
+import hashlib
+import json
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.main import app
+from app.tts import api as tts_api
+from app.tts import artifacts
+from app.tts.artifacts import ArtifactStore
+from app.tts.provider import MockTTSProvider
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    s = ArtifactStore(str(tmp_path / "tts"))
+    monkeypatch.setattr(artifacts, "_store", s)
+    return s
+
+
+class CountingProvider(MockTTSProvider):
+    def __init__(self):
+        self.generated = 0
+        self.streamed = 0
+
+    async def generate(self, *args, **kwargs):
+        self.generated += 1
+        return await super().generate(*args, **kwargs)
+
+    async def stream(self, *args, **kwargs):
+        self.streamed += 1
+        async for chunk in super().stream(*args, **kwargs):
+            yield chunk
+
+
+def test_store_is_content_addressed_and_streams_from_mmap(store, monkeypatch):
+    monkeypatch.setattr(settings, "TTS_STREAM_CHUNK_BYTES", 4)
+    data = b"0123456789"
+    sha = store.put(data, "wav")
+    assert sha == hashlib.sha256(data).hexdigest()
+    assert store.put(data, "wav") == sha
+    assert list(store.iter_chunks(sha, "wav")) == [b"0123", b"4567", b"89"]
+    s = store.stats()
+    assert (s["writes"], s["dedup_writes"], s["bytes_served"]) == (1, 1, 10)
+
+
+def _stream(ws, text):
+    ws.send_json({"type": "generate", "text": text, "persona": "strict"})
+    frames = []
+    while True:
+        msg = ws.receive()
+        if msg.get("bytes") is not None:
+            frames.append(msg["bytes"])
+        else:
+            return b"".join(frames), json.loads(msg["text"])
+
+
+def test_ws_repeat_streams_stored_bytes_without_resynthesis(store, monkeypatch):
+    provider = CountingProvider()
+    monkeypatch.setattr(tts_api, "get_provider", lambda: provider)
+    text = "Describe a time you disagreed with a teammate (ws artifact test)"
+    with client.websocket_connect("/v1/tts/ws/s_art") as ws:
+        ws.send_json({"type": "config", "audio_encoding": "binary"})
+        ws.receive_json()
+        first, done1 = _stream(ws, text)
+        second, done2 = _stream(ws, text)
+    assert provider.streamed == 1
+    assert first == second == b"AUDIO:strict:none:" + text.encode()
+    assert (done1["cached"], done2["cached"]) == (False, True)
+    assert done2["audio_url"] == done1["audio_url"]
+
+
+def test_http_generate_and_ws_share_the_store(store, monkeypatch):
+    provider = CountingProvider()
+    monkeypatch.setattr(tts_api, "get_provider", lambda: provider)
+    text = "Walk me through your resume (shared artifact test)"
+    r = client.post("/v1/tts/generate", json={"session_id": "s_art2", "text": text, "persona": "strict"})
+    assert r.status_code == 200
+    with client.websocket_connect("/v1/tts/ws/s_art2") as ws:
+        ws.send_json({"type": "generate", "text": text, "persona": "strict"})
+        audio = b""
+        while True:
+            msg = ws.receive_json()
+            if msg["type"] == "audio_chunk":
+                audio += base64.b64decode(msg["data"])
+            else:
+                break
+    assert provider.generated == 1 and provider.streamed == 0
+    assert msg["cached"] is True
+    assert audio == b"AUDIO:strict:none:" + text.encode()
+
+
+def test_store_evicts_least_recently_used_over_budget(tmp_path):
+    s = ArtifactStore(str(tmp_path / "tts"), max_bytes=25)
+    a = s.put(b"a" * 10, "wav")
+    b = s.put(b"b" * 10, "wav")
+    s.read(a, "wav")  # a is now more recent than b
+    c = s.put(b"c" * 10, "wav")
+    assert s.has(a, "wav") and s.has(c, "wav") and not s.has(b, "wav")
+    stats = s.stats()
+    assert (stats["evicted"], stats["bytes"], stats["files"]) == (1, 20, 2)
+    # a new process picks up what is already on disk
+    again = ArtifactStore(str(tmp_path / "tts"), max_bytes=25)
+    again.put(b"d" * 10, "wav")
+    assert again.stats()["files"] == 2
+
+
+def test_evicted_artifact_is_regenerated_on_next_request(store, monkeypatch):
+    provider = CountingProvider()
+    monkeypatch.setattr(tts_api, "get_provider", lambda: provider)
+    text = "Tell me about a project you are proud of (eviction test)"
+    body = {"session_id": "s_art3", "text": text, "persona": "strict"}
+    first = client.post("/v1/tts/generate", json=body).json()
+    sha = first["artifact_url"].rsplit("/", 1)[1].split(".")[0]
+    os.remove(store.path_for(sha, "wav"))
+    second = client.post("/v1/tts/generate", json=body).json()
+    assert provider.generated == 2
+    assert client.get(second["artifact_url"]).status_code == 200
+
+
+def test_entry_whose_file_was_collected_is_dropped(store, monkeypatch):
+    from app.storage import write_behind
+    from app.tts import cache as tts_cache
+    monkeypatch.setattr(settings, "AZURE_STORAGE_CONNECTION_STRING", None)
+    provider = CountingProvider()
+    monkeypatch.setattr(tts_api, "get_provider", lambda: provider)
+    text = "Which metric would you watch first (collected file test)"
+    body = {"session_id": "s_art4", "text": text, "persona": "strict"}
+    first = client.post("/v1/tts/generate", json=body).json()
+    assert write_behind.get_write_behind().flush(timeout=5)
+    assert os.path.isabs(first["audio_url"])
+    os.remove(first["audio_url"])  # as the storage GC would
+    second = client.post("/v1/tts/generate", json=body).json()
+    assert provider.generated == 2
+    assert tts_cache.peek_cached(text, "strict", None, "wav", None, None)["audio_url"] == second["audio_url"]
+    assert write_behind.get_write_behind().flush(timeout=5)
+    assert os.path.exists(second["audio_url"])
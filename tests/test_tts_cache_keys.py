@@ -0,0 +1,57 @@
+import os
+import subprocess
+import sys
+
+from app.tts import cache
+
+
+def test_keys_are_stable_across_processes():
+    code = "from app.tts.cache import _make_key; print(_make_key('Hi there', 'neutral', None, 'wav', 1.1, None))"
+    keys = {
+        subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                       env={**os.environ, "PYTHONHASHSEED": seed}).stdout.strip()
+        for seed in ("1", "2")
+    }
+    assert keys == {cache._make_key("Hi there", "neutral", None, "wav", 1.1, None)}
+    assert cache._make_key("Hi there", "neutral", None, "wav", 1.1, None) != cache._make_key("Hi there", "neutral", None, "mp3", 1.1, None)
+
+
+def test_lru_evicts_least_recently_used():
+    lru = cache.LRUCache(max_entries=2, ttl_seconds=0)
+    lru.set("a", 1)
+    lru.set("b", 2)
+    assert lru.get("a") == 1
+    lru.set("c", 3)
+    assert lru.get("b") is None
+    assert lru.get("a") == 1 and lru.get("c") == 3
+    assert lru.evictions == 1
+
+
+def test_lru_entries_expire(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now[0])
+    lru = cache.LRUCache(max_entries=10, ttl_seconds=5)
+    lru.set("a", 1)
+    now[0] += 4
+    assert lru.get("a") == 1
+    now[0] += 2
+    assert lru.get("a") is None
+    assert lru.expirations == 1 and len(lru) == 0
+
+
+def test_stats_count_hits_and_misses(monkeypatch):
+    monkeypatch.setattr(cache, "_cache", cache.LRUCache(8, 60))
+    monkeypatch.setattr(cache, "_stats", {"local_hits": 0, "redis_hits": 0, "misses": 0})
+    assert cache.get_cached("stats text", "neutral", None, "wav", None, None) is None
+    cache.set_cached("stats text", "neutral", None, "wav", None, None, {"audio_url": "u"})
+    assert cache.get_cached("stats text", "neutral", None, "wav", None, None) == {"audio_url": "u"}
+    s = cache.stats()
+    assert (s["local_hits"], s["misses"], s["entries"], s["hit_ratio"]) == (1, 1, 1, 0.5)
+
+
+def test_mock_tts_filename_uses_cache_digest():
+    import asyncio
+    from app.tts.provider import MockTTSProvider
+    res = asyncio.run(MockTTSProvider().generate("s_digest", "Same text", "neutral", None, "wav"))
+    digest = cache.tts_digest("Same text", "neutral", None, "wav", None, None)
+    assert os.path.basename(res["audio_url"]) == f"s_digest_{digest[:16]}.wav"
@@ -0,0 +1,145 @@
+import asyncio
+import base64
+import io
+import json
+import time
+import wave
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.main import app
+from app.tts import api as tts_api
+from app.tts import artifacts
+from app.tts.artifacts import ArtifactStore
+from app.tts.provider import BaseTTSProvider, MockTTSProvider
+from app.tts.service import iter_sentences, split_sentences, synthesize
+
+client = TestClient(app)
+
+
+class RecordingProvider(MockTTSProvider):
+    def __init__(self):
+        self.texts = []
+
+    async def generate(self, session_id, text, *args, **kwargs):
+        self.texts.append(text)
+        return await super().generate(session_id, text, *args, **kwargs)
+
+
+@pytest.fixture
+def sentence_mode(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "TTS_SENTENCE_MODE", True)
+    monkeypatch.setattr(settings, "TTS_SENTENCE_MIN_CHARS", 20)
+    monkeypatch.setattr(artifacts, "_store", ArtifactStore(str(tmp_path / "tts")))
+
+
+def test_split_sentences():
+    assert split_sentences("Hi there. How are you?  Great!") == ["Hi there.", "How are you?", "Great!"]
+    assert split_sentences("No boundary e.g.here") == ["No boundary e.g.here"]
+
+
+def test_sentences_are_synthesized_concurrently_and_cached_individually(sentence_mode):
+    provider = RecordingProvider()
+    first = "Thanks for walking me through that (sentence test one)."
+    text_a = f"{first} What would you change next time? Please be specific."
+    text_b = f"{first} How did the team react?"
+
+    async def run():
+        started = time.perf_counter()
+        a = await synthesize("s_sent", text_a, "neutral", provider=provider)
+        elapsed = time.perf_counter() - started
+        b = await synthesize("s_sent", text_b, "neutral", provider=provider)
+        return a, b, elapsed
+
+    a, b, elapsed = asyncio.run(run())
+    # three sentences of ~0.4s each ran side by side
+    assert elapsed < 0.8
+    # the repeated opening sentence was only synthesized once
+    assert provider.texts.count(first) == 1
+    assert sorted(provider.texts) == sorted(split_sentences(text_a) + ["How did the team react?"])
+    audio = artifacts.get_artifact_store().read(a["audio_sha256"], "wav")
+    assert audio == b"".join(f"AUDIO:neutral:none:{s}".encode() for s in split_sentences(text_a))
+    assert b["audio_sha256"] != a["audio_sha256"]
+
+
+def test_ws_streams_first_sentence_before_the_rest_is_ready(sentence_mode, monkeypatch):
+    provider = RecordingProvider()
+    monkeypatch.setattr(tts_api, "get_provider", lambda: provider)
+    text = "Short one. " + " ".join(["This second sentence is much longer and takes a while to synthesize"] * 4) + "."
+    with client.websocket_connect("/v1/tts/ws/s_sent_ws") as ws:
+        ws.send_json({"type": "config", "audio_encoding": "binary"})
+        ws.receive_json()
+        ws.send_json({"type": "generate", "text": text})
+        frames = []
+        while True:
+            msg = ws.receive()
+            if msg.get("bytes") is not None:
+                frames.append(msg["bytes"])
+                continue
+            done = json.loads(msg["text"])
+            break
+    assert frames[0] == b"AUDIO:neutral:none:Short one."
+    assert done["time_to_first_chunk_ms"] < done["synthesis_ms"] / 2
+
+
+def _clip(frames):
+    out = io.BytesIO()
+    with wave.open(out, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(16000)
+        w.writeframes(frames)
+    return out.getvalue()
+
+
+class WavProvider(MockTTSProvider):
+    async def generate(self, session_id, text, persona, emotion=None, audio_format="wav", pitch=None, rate=None):
+        res = await super().generate(session_id, text, persona, emotion, audio_format, pitch, rate)
+        res["audio_b64"] = base64.b64encode(_clip(text.encode("utf-8")[:20].ljust(20, b"."))).decode("ascii")
+        return res
+
+
+def test_ws_sentence_stream_matches_the_stored_wav(sentence_mode, monkeypatch):
+    monkeypatch.setattr(tts_api, "get_provider", lambda: WavProvider())
+    text = "First sentence of the wav test. A second one follows it. And a third closes it."
+    with client.websocket_connect("/v1/tts/ws/s_sent_wav") as ws:
+        ws.send_json({"type": "config", "audio_encoding": "binary"})
+        ws.receive_json()
+        ws.send_json({"type": "generate", "text": text})
+        frames = []
+        while True:
+            msg = ws.receive()
+            if msg.get("bytes") is not None:
+                frames.append(msg["bytes"])
+                continue
+            done = json.loads(msg["text"])
+            break
+    streamed = b"".join(frames)
+    stored = client.get(done["artifact_url"]).content
+    assert len(streamed) == len(stored) == 44 + 3 * 20
+    # identical apart from the RIFF/data sizes, which are unknown while streaming
+    assert streamed[4:8] == streamed[40:44] == b"\xff" * 4
+    assert streamed[:4] + streamed[8:40] + streamed[44:] == stored[:4] + stored[8:40] + stored[44:]
+
+
+def test_closing_the_sentence_stream_early_settles_its_tasks(sentence_mode):
+    async def run():
+        before = asyncio.all_tasks()
+        text = "One short sentence here. Another sentence after it. And a final one."
+        stream = iter_sentences("s_sent_close", text, "neutral", None, "wav", None, None, provider=MockTTSProvider())
+        await stream.__anext__()
+        await stream.aclose()
+        # shared generations (singleflight) keep running for other callers; the stream's own tasks must not
+        return [t for t in asyncio.all_tasks() - before if not t.done() and "iter_sentences" in t.get_coro().__qualname__]
+
+    assert asyncio.run(run()) == []
+
+
+def test_wav_pieces_are_joined_under_one_header():
+    clip = _clip
+    joined = BaseTTSProvider().join_audio([clip(b"\x01\x00" * 3), clip(b"\x02\x00" * 2)], "wav")
+    with wave.open(io.BytesIO(joined)) as w:
+        assert w.getnframes() == 5
+        assert w.readframes(5) == b"\x01\x00" * 3 + b"\x02\x00" * 2
@@ -0,0 +1,111 @@
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.storage import filesystem, write_behind
+from app.tts import artifacts
+from app.tts.artifacts import ArtifactStore
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    s = ArtifactStore(str(tmp_path / "tts"))
+    monkeypatch.setattr(artifacts, "_store", s)
+    return s
+
+
+def test_generate_returns_servable_artifact_url(store):
+    r = client.post("/v1/tts/generate", json={"session_id": "s_serve", "text": "Serve me over HTTP"})
+    assert r.status_code == 200
+    url = r.json()["artifact_url"]
+    assert url.startswith("/v1/tts/artifacts/") and url.endswith(".wav")
+    body = client.get(url)
+    assert body.status_code == 200
+    assert body.headers["content-type"] == "audio/wav"
+    assert body.content == store.read(url.rsplit("/", 1)[1][:64], "wav")
+
+
+def test_artifact_range_etag_and_cache_control(store):
+    data = bytes(range(256)) * 4
+    sha = store.put(data, "wav")
+    url = f"/v1/tts/artifacts/{sha}.wav"
+
+    r = client.get(url)
+    assert r.status_code == 200 and r.content == data
+    assert r.headers["etag"] == f'"{sha}"'
+    assert "immutable" in r.headers["cache-control"]
+    assert r.headers["accept-ranges"] == "bytes"
+
+    r = client.get(url, headers={"Range": "bytes=100-199"})
+    assert r.status_code == 206
+    assert r.content == data[100:200]
+    assert r.headers["content-range"] == f"bytes 100-199/{len(data)}"
+
+    r = client.get(url, headers={"If-None-Match": f'"{sha}"'})
+    assert r.status_code == 304 and r.content == b""
+    assert store.stats()["not_modified"] == 1
+
+    assert client.get(f"/v1/tts/artifacts/{'0' * 64}.wav").status_code == 404
+    assert client.get("/v1/tts/artifacts/not-a-digest.wav").status_code == 404
+
+
+def test_file_route_serves_disk_and_pending_writes(monkeypatch):
+    from app.core.config import settings
+    monkeypatch.setattr(settings, "AZURE_STORAGE_CONNECTION_STRING", None)
+    write_behind.shutdown_write_behind()
+    gate = threading.Event()
+    real_save = filesystem.save_bytes
+
+    def slow_save(name, data, owner=None):
+        gate.wait(5)
+        return real_save(name, data, owner)
+
+    monkeypatch.setattr(filesystem, "save_bytes", slow_save)
+    path = write_behind.persist_artifact("serve_pending.wav", b"RIFF-pending-bytes")
+
+    # still queued: served from memory, ranges included
+    r = client.get("/v1/tts/files/serve_pending.wav")
+    assert r.status_code == 200 and r.content == b"RIFF-pending-bytes"
+    assert r.headers["cache-control"] == "no-cache"
+    r = client.get("/v1/tts/files/serve_pending.wav", headers={"Range": "bytes=-5"})
+    assert r.status_code == 206 and r.content == b"bytes"
+
+    gate.set()
+    assert write_behind.get_write_behind().flush(timeout=5)
+    r = client.get("/v1/tts/files/serve_pending.wav")
+    assert r.status_code == 200 and r.content == b"RIFF-pending-bytes"
+    etag = r.headers["etag"]
+    assert client.get("/v1/tts/files/serve_pending.wav", headers={"If-None-Match": etag}).status_code == 304
+    assert client.get("/v1/tts/files/serve_pending.wav", headers={"Range": "bytes=0-3"}).content == b"RIFF"
+    assert client.get("/v1/tts/files/missing.wav").status_code == 404
+    import os
+    os.unlink(path)
+
+
+def test_unpersisted_file_is_gone_and_its_cache_entry_dropped(store, monkeypatch):
+    from app.core.config import settings
+    from app.tts import cache as tts_cache
+    monkeypatch.setattr(settings, "AZURE_STORAGE_CONNECTION_STRING", None)
+    monkeypatch.setattr(settings, "PERSIST_MAX_RETRIES", 0)
+    write_behind.shutdown_write_behind()
+    gate = threading.Event()
+
+    def broken_save(name, data, owner=None):
+        gate.wait(5)
+        raise OSError("disk full")
+
+    monkeypatch.setattr(filesystem, "save_bytes", broken_save)
+    text = "This answer will not be persisted"
+    r = client.post("/v1/tts/generate", json={"session_id": "s_lost", "text": text})
+    assert r.status_code == 200
+    assert tts_cache.peek_cached(text, "neutral", None, "wav", None, None) is not None
+    gate.set()
+    assert write_behind.get_write_behind().flush(timeout=5)
+    name = r.json()["audio_url"].rsplit("/", 1)[1]
+    assert client.get(f"/v1/tts/files/{name}").status_code == 410
+    assert tts_cache.peek_cached(text, "neutral", None, "wav", None, None) is None
+    write_behind.shutdown_write_behind()
@@ -0,0 +1,148 @@
+import asyncio
+import threading
+
+import httpx
+
+from app.main import app
+from app.tts import api as tts_api
+from app.tts.provider import MockTTSProvider
+from app.tts.service import stream_shared
+from app.tts.singleflight import SingleFlight
+
+
+def test_concurrent_identical_calls_share_one_generation():
+    calls = []
+
+    async def gen(tag):
+        calls.append(tag)
+        await asyncio.sleep(0.05)
+        return {"tag": tag}
+
+    async def run():
+        sf = SingleFlight()
+        results = await asyncio.gather(*[sf.do("k", lambda: gen("k")) for _ in range(5)], sf.do("other", lambda: gen("other")))
+        return sf, results
+
+    sf, results = asyncio.run(run())
+    assert sorted(calls) == ["k", "other"]
+    assert results[:5] == [{"tag": "k"}] * 5
+    s = sf.stats()
+    assert (s["leaders"], s["coalesced"], s["inflight"]) == (2, 4, 0)
+
+
+def test_cancelled_caller_does_not_cancel_shared_generation():
+    async def gen():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def run():
+        sf = SingleFlight()
+        first = asyncio.ensure_future(sf.do("k", gen))
+        second = asyncio.ensure_future(sf.do("k", gen))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(run()) == "done"
+
+
+class FakeRedis:
+    """Just enough of redis-py for the lock: SET NX PX, GET, and the release script."""
+    def __init__(self):
+        self.data = {}
+        self._lock = threading.Lock()
+
+    def set(self, key, value, nx=False, px=None, ex=None):
+        with self._lock:
+            if nx and key in self.data:
+                return None
+            self.data[key] = value
+            return True
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def eval(self, script, numkeys, key, token):
+        with self._lock:
+            if self.data.get(key) == token:
+                del self.data[key]
+                return 1
+            return 0
+
+
+def test_redis_lock_makes_other_workers_wait_for_the_shared_result():
+    redis = FakeRedis()
+    shared_cache = {}
+    calls = []
+
+    async def gen(worker):
+        calls.append(worker)
+        await asyncio.sleep(0.05)
+        shared_cache["k"] = f"made by {worker}"
+        return shared_cache["k"]
+
+    async def run():
+        # two SingleFlight instances stand in for two worker processes
+        w1 = SingleFlight(redis, poll_seconds=0.01)
+        w2 = SingleFlight(redis, poll_seconds=0.01)
+        lookup = lambda: shared_cache.get("k")
+        a = asyncio.ensure_future(w1.do("k", lambda: gen("w1"), lookup))
+        await asyncio.sleep(0.01)
+        b = asyncio.ensure_future(w2.do("k", lambda: gen("w2"), lookup))
+        return await asyncio.gather(a, b), w2
+
+    (a, b), w2 = asyncio.run(run())
+    assert calls == ["w1"]
+    assert a == b == "made by w1"
+    assert w2.stats()["remote_hits"] == 1
+    assert "lock:k" not in redis.data
+
+
+def test_generate_endpoint_coalesces_concurrent_requests(monkeypatch):
+    calls = []
+
+    class SlowProvider:
+        async def generate(self, session_id, text, persona, emotion, audio_format, pitch, rate):
+            calls.append(session_id)
+            await asyncio.sleep(0.05)
+            return {"audio_url": f"/tmp/{session_id}.wav", "duration_ms": 100, "audio_b64": "QQ==", "voice_parameters_used": {}}
+
+    monkeypatch.setattr(tts_api, "get_provider", lambda: SlowProvider())
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as c:
+            reqs = [c.post("/v1/tts/generate", json={"session_id": f"sf{i}", "text": "Top of the hour question"}) for i in range(4)]
+            return await asyncio.gather(*reqs)
+
+    responses = asyncio.run(run())
+    assert len(calls) == 1
+    assert {r.json()["audio_url"] for r in responses} == {f"/tmp/{calls[0]}.wav"}
+
+
+def test_concurrent_stream_misses_share_one_synthesis():
+    class CountingProvider(MockTTSProvider):
+        streams = 0
+
+        async def stream(self, session_id, text, *args, **kwargs):
+            CountingProvider.streams += 1
+            for part in (b"one-", b"two-", b"three"):
+                await asyncio.sleep(0.02)
+                yield part
+
+    def collector(into):
+        async def send(chunk):
+            into.append(chunk)
+        return send
+
+    async def run():
+        provider = CountingProvider()
+        sent = [[], [], []]
+        params = ("shared stream test", "neutral", None, "wav", None, None)
+        entries = await asyncio.gather(*[stream_shared("s_share", params, provider, collector(out), 1000) for out in sent])
+        return entries, sent
+
+    entries, sent = asyncio.run(run())
+    assert CountingProvider.streams == 1
+    assert entries[0] == entries[1] == entries[2]
+    # the leader got the chunks as they came, the others the stored clip
+    assert [b"".join(out) for out in sent] == [b"one-two-three"] * 3
@@ -0,0 +1,72 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app.pipeline.turn as turn
+import app.core.config as cfg
+from app.main import app
+from app.state.session_store import create_session
+from app.stt.mock_stt import MockSTT
+
+client = TestClient(app)
+
+
+def _stt(transcript):
+    return MockSTT(session_id="p")._finalize_with_transcript(transcript)
+
+
+def test_emotion_and_llm_run_concurrently(monkeypatch):
+    asyncio.run(create_session("pipe1", {"emotion_opt_in": True}))
+
+    async def slow_emotion(transcript):
+        await asyncio.sleep(0.2)
+        return [{"label": "stress", "score": 0.7, "start_ms": 0, "end_ms": 1000}]
+
+    real_llm = turn.process_answer
+
+    async def slow_llm(**kwargs):
+        await asyncio.sleep(0.2)
+        return await real_llm(**kwargs)
+
+    monkeypatch.setattr(turn, "analyze_transcript", slow_emotion)
+    monkeypatch.setattr(turn, "process_answer", slow_llm)
+
+    res = asyncio.run(turn.run_turn("pipe1", _stt("I was nervous")))
+    assert res["timings_ms"]["emotion"] >= 190 and res["timings_ms"]["llm"] >= 190
+    # run side by side, not back to back
+    assert res["timings_ms"]["total"] < 350
+    assert res["emotion_events"] and res["degraded"] == []
+
+
+def test_emotion_timeout_falls_back(monkeypatch):
+    asyncio.run(create_session("pipe2", {"emotion_opt_in": True}))
+
+    async def stuck(transcript):
+        await asyncio.sleep(5)
+
+    monkeypatch.setattr(turn, "analyze_transcript", stuck)
+    monkeypatch.setattr(cfg.settings, "TURN_EMOTION_TIMEOUT_SECONDS", 0.05)
+    res = asyncio.run(turn.run_turn("pipe2", _stt("I was nervous")))
+    assert res["emotion_events"] == []
+    assert res["degraded"] == ["emotion"]
+    assert "llm" in res and res["scoring"]
+
+
+def test_llm_failure_raises(monkeypatch):
+    async def broken(**kwargs):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(turn, "process_answer", broken)
+    with pytest.raises(turn.TurnPipelineError) as exc:
+        asyncio.run(turn.run_turn("pipe3", _stt("hello")))
+    assert exc.value.stage == "llm"
+
+
+def test_ws_turn_result_reports_timings():
+    with client.websocket_connect("/v1/ws/audio/pipe4") as ws:
+        ws.send_json({"type": "sim_transcript", "transcript": "I fixed the bug", "expected_topics": ["bug"]})
+        data = ws.receive_json()
+        assert data["type"] == "turn_result"
+        timings = data["result"]["timings_ms"]
+        assert {"stt", "emotion", "llm", "scoring", "total"} <= set(timings)
@@ -0,0 +1,49 @@
+import sys
+import types
+
+import app.stt.vosk_registry as registry
+from app.stt.provider import VoskSTTProvider
+
+
+def install_fake_vosk(monkeypatch):
+    loads = {'n': 0}
+
+    class Model:
+        def __init__(self, path):
+            loads['n'] += 1
+            self.path = path
+
+    class KaldiRecognizer:
+        def __init__(self, model, rate):
+            self.model = model
+            self.rate = rate
+
+        def SetWords(self, enabled):
+            pass
+
+    monkeypatch.setitem(sys.modules, 'vosk', types.SimpleNamespace(Model=Model, KaldiRecognizer=KaldiRecognizer))
+    return loads
+
+
+def test_model_loaded_once_and_shared(monkeypatch, tmp_path):
+    loads = install_fake_vosk(monkeypatch)
+    registry.unload()
+    p1 = VoskSTTProvider(session_id='a', model_path=str(tmp_path))
+    p2 = VoskSTTProvider(session_id='b', model_path=str(tmp_path))
+    assert loads['n'] == 1
+    assert p1.model is p2.model
+    # each session still gets its own recognizer
+    assert p1.rec is not p2.rec
+    registry.unload()
+
+
+def test_preload_uses_env_path(monkeypatch, tmp_path):
+    loads = install_fake_vosk(monkeypatch)
+    registry.unload()
+    monkeypatch.setenv('VOSK_MODEL_PATH', str(tmp_path))
+    assert registry.preload() == str(tmp_path)
+    assert loads['n'] == 1
+    VoskSTTProvider(session_id='c')
+    assert loads['n'] == 1
+    registry.unload(str(tmp_path))
+    assert registry.loaded_models() == []
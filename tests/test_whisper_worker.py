@@ -1,8 +1,18 @@
+import pytest
+
+import app.stt.whisper_worker as ww
 from app.stt.whisper_worker import reprocess_audio
 from app.stt.mock_stt import MockSTT
 import os
 
 
+@pytest.fixture(autouse=True)
+def clear_model_cache():
+    ww.evict()
+    yield
+    ww.evict()
+
+
 def test_whisper_worker_fallback(tmp_path, monkeypatch):
     # Provide a fake filename to simulate transcript
     audio = tmp_path / "i_was_nervous.wav"
@@ -32,3 +42,95 @@ def test_whisper_worker_with_faster_whisper_mock(monkeypatch, tmp_path):
     audio.write_bytes(b"x")
     res = reprocess_audio(str(audio))
     assert "hello world" in res["transcript"] or "I was nervous" in res["transcript"]
+
+
+def test_whisper_models_cached_per_config(monkeypatch, tmp_path):
+    loads = []
+    class Segment:
+        def __init__(self, start, end, text):
+            self.start = start
+            self.end = end
+            self.text = text
+    class FakeModel:
+        def __init__(self, model_name, device=None, compute_type="default", cpu_threads=0):
+            loads.append((model_name, compute_type, cpu_threads))
+        def transcribe(self, path, beam_size=1):
+            return [Segment(0.0, 1.0, "hello")], {}
+    monkeypatch.setattr('app.stt.whisper_worker.WhisperModel', FakeModel, raising=False)
+    audio = tmp_path / "example.wav"
+    audio.write_bytes(b"x")
+    reprocess_audio(str(audio), model_name="tiny")
+    reprocess_audio(str(audio), model_name="tiny")
+    assert loads == [("tiny", "default", 0)]
+    reprocess_audio(str(audio), model_name="tiny", compute_type="int8", cpu_threads=2)
+    assert loads[-1] == ("tiny", "int8", 2)
+    assert len(ww.cached_models()) == 2
+    assert ww.evict(compute_type="int8") == 1
+    assert ww.cached_models() == [("tiny", "default", 0)]
+    assert ww.warmup("tiny") is True
+    assert len(loads) == 2
+
+
+def test_parallel_silence_split_keeps_absolute_offsets(monkeypatch, tmp_path):
+    np = pytest.importorskip("numpy")
+    from concurrent.futures import ThreadPoolExecutor
+    import app.core.config as cfg
+    sr = 16000
+    tone = (0.5 * np.sin(np.arange(3 * sr) * 0.1)).astype(np.float32)
+    gap = np.zeros(sr, dtype=np.float32)
+    audio = np.concatenate([tone, gap, tone, gap, tone])
+
+    class Segment:
+        def __init__(self, start, end, text):
+            self.start = start
+            self.end = end
+            self.text = text
+    class FakeModel:
+        def __init__(self, model_name, device=None):
+            pass
+        def transcribe(self, audio, beam_size=1):
+            return [Segment(0.0, len(audio) / sr, f"part of {len(audio)} samples")], {}
+
+    monkeypatch.setattr('app.stt.whisper_worker.WhisperModel', FakeModel, raising=False)
+    monkeypatch.setattr('app.stt.whisper_worker.decode_audio', lambda path, sampling_rate: audio, raising=False)
+    monkeypatch.setattr(ww, '_segment_pool', lambda: ThreadPoolExecutor(max_workers=2))
+    monkeypatch.setattr(cfg.settings, 'WHISPER_PARALLEL_MIN_SECONDS', 1)
+    monkeypatch.setattr(cfg.settings, 'WHISPER_SEGMENT_TARGET_SECONDS', 2)
+
+    ranges = ww.silence_split_ranges(audio, target_seconds=2)
+    # cuts land in the middle of each 1s gap (to within one 30ms analysis frame)
+    cut_starts = [r[0] for r in ranges]
+    assert len(cut_starts) == 3
+    assert all(abs(a - b) <= 480 for a, b in zip(cut_starts, [0, 3.5 * sr, 7.5 * sr]))
+
+    path = tmp_path / "long.wav"
+    path.write_bytes(b"x")
+    res = reprocess_audio(str(path), parallel=True)
+    starts = [w["start_ms"] for w in res["word_timestamps"] if w["word"] == "part"]
+    assert starts == [int(r * 1000 / sr) for r in cut_starts]
+    assert set(res) == {"transcript", "word_timestamps", "filler_words", "pause_segments", "speech_rate_wpm"}
+
+
+def test_native_word_timestamps_and_pauses(monkeypatch, tmp_path):
+    pytest.importorskip("numpy")
+    from types import SimpleNamespace as NS
+    calls = {}
+    class FakeModel:
+        def __init__(self, model_name, device=None):
+            pass
+        def transcribe(self, path, beam_size=1, word_timestamps=False):
+            calls['word_timestamps'] = word_timestamps
+            words = [NS(word=" Um,", start=0.0, end=0.3, probability=0.9),
+                     NS(word=" I", start=0.35, end=0.5, probability=0.95),
+                     NS(word=" paused.", start=2.0, end=2.4, probability=0.8)]
+            return [NS(start=0.0, end=2.4, text=" Um, I paused.", words=words)], {}
+    monkeypatch.setattr('app.stt.whisper_worker.WhisperModel', FakeModel, raising=False)
+    audio = tmp_path / "words.wav"
+    audio.write_bytes(b"x")
+    res = reprocess_audio(str(audio), word_timestamps=True)
+    assert calls['word_timestamps'] is True
+    assert [w["start_ms"] for w in res["word_timestamps"]] == [0, 350, 2000]
+    assert res["word_timestamps"][2]["confidence"] == 0.8
+    # the 1.5s gap is the only pause above the threshold
+    assert res["pause_segments"] == [{"start_ms": 500, "end_ms": 2000}]
+    assert [w["word"] for w in res["filler_words"]] == ["Um,"]
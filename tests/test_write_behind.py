@@ -0,0 +1,145 @@
+import os
+import threading
+import time
+
+from app.storage import write_behind
+from app.storage.write_behind import WriteBehindQueue
+
+
+def test_submit_returns_before_write_and_serves_from_memory():
+    gate = threading.Event()
+    written = {}
+
+    def writer(key, data):
+        gate.wait(5)
+        written[key] = data
+        return "ok"
+
+    q = WriteBehindQueue(workers=2, max_retries=0)
+    q.submit("a.wav", b"AAA", writer)
+    assert written == {}
+    assert q.get("a.wav") == b"AAA"
+    gate.set()
+    assert q.flush(timeout=5)
+    assert written == {"a.wav": b"AAA"}
+    assert q.get("a.wav") is None
+    stats = q.stats()
+    assert stats["written"] == 1 and stats["pending"] == 0 and stats["memory_reads"] == 1
+    q.shutdown()
+
+
+def test_failed_write_is_retried():
+    attempts = []
+
+    def flaky(key, data):
+        attempts.append(key)
+        if len(attempts) == 1:
+            raise IOError("transient")
+        if len(attempts) == 2:
+            return None  # e.g. upload_bytes reporting failure
+        return "ok"
+
+    q = WriteBehindQueue(workers=1, max_retries=3, backoff_seconds=0.01)
+    q.submit("b.wav", b"B", flaky)
+    assert q.flush(timeout=5)
+    stats = q.stats()
+    assert len(attempts) == 3
+    assert stats["retries"] == 2 and stats["written"] == 1 and stats["failed"] == 0
+    q.shutdown()
+
+
+def test_gives_up_after_max_retries():
+    q = WriteBehindQueue(workers=1, max_retries=1, backoff_seconds=0.01)
+    q.submit("c.wav", b"C", lambda key, data: None)
+    assert q.flush(timeout=5)
+    assert q.stats()["failed"] == 1
+    q.shutdown()
+
+
+def test_persist_artifact_local_and_shutdown_flush(monkeypatch):
+    from app.core.config import settings
+    monkeypatch.setattr(settings, "AZURE_STORAGE_CONNECTION_STRING", None)
+    monkeypatch.setattr(settings, "PERSIST_WRITE_BEHIND", True)
+    write_behind.shutdown_write_behind()
+
+    url = write_behind.persist_artifact("wb_test_artifact.wav", b"RIFFdata")
+    assert url.endswith("wb_test_artifact.wav")
+    # readable straight away, whether or not the write has happened yet
+    assert write_behind.read_artifact("wb_test_artifact.wav") == b"RIFFdata"
+
+    write_behind.shutdown_write_behind(timeout=5)
+    with open(url, "rb") as f:
+        assert f.read() == b"RIFFdata"
+    assert write_behind.read_artifact("wb_test_artifact.wav") == b"RIFFdata"
+    os.unlink(url)
+
+
+def test_slow_write_does_not_hold_up_the_others():
+    gate = threading.Event()
+    written = []
+
+    def writer(key, data):
+        if key == "slow.wav":
+            gate.wait(5)
+        written.append(key)
+        return "ok"
+
+    q = WriteBehindQueue(workers=2, max_retries=0)
+    for key in ("slow.wav", "a.wav", "b.wav", "c.wav"):
+        q.submit(key, b"x", writer)
+    deadline = time.monotonic() + 5
+    while len(written) < 3 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    # everything behind the slow write went through the other worker
+    assert written == ["a.wav", "b.wav", "c.wav"]
+    gate.set()
+    assert q.flush(timeout=5)
+    q.shutdown()
+
+
+def test_queue_rejects_past_max_pending_bytes():
+    gate = threading.Event()
+    q = WriteBehindQueue(workers=1, max_retries=0, max_pending_bytes=5)
+    writer = lambda key, data: gate.wait(5) or "ok"
+    assert q.submit("a.wav", b"123", writer)
+    assert not q.submit("b.wav", b"456", writer)
+    # replacing a queued artifact only counts the difference
+    assert q.submit("a.wav", b"12345", writer)
+    stats = q.stats()
+    assert (stats["rejected"], stats["pending_bytes"]) == (1, 5)
+    gate.set()
+    assert q.flush(timeout=5)
+    assert q.stats()["pending_bytes"] == 0
+    q.shutdown()
+
+
+def test_falls_back_and_reports_the_dead_url():
+    reported, fallen_back = [], {}
+
+    def fallback(key, data):
+        fallen_back[key] = data
+        return "local"
+
+    q = WriteBehindQueue(workers=1, max_retries=1, backoff_seconds=0.01)
+    q.submit("d.wav", b"D", lambda key, data: None, fallback, reported.append)
+    q.submit("e.wav", b"E", lambda key, data: None, None, reported.append)
+    assert q.flush(timeout=5)
+    assert fallen_back == {"d.wav": b"D"} and reported == ["d.wav", "e.wav"]
+    assert not q.failed("d.wav") and q.failed("e.wav")
+    stats = q.stats()
+    assert (stats["written"], stats["fallback_writes"], stats["failed"]) == (1, 1, 1)
+    q.shutdown()
+
+
+def test_persist_artifact_writes_inline_when_queue_is_full(monkeypatch, tmp_path):
+    from app.core.config import settings
+    monkeypatch.setattr(settings, "AZURE_STORAGE_CONNECTION_STRING", None)
+    monkeypatch.setattr(settings, "PERSIST_WRITE_BEHIND", True)
+    monkeypatch.setattr(settings, "PERSIST_MAX_PENDING_BYTES", 4)
+    write_behind.shutdown_write_behind()
+    url = write_behind.persist_artifact("wb_inline_artifact.wav", b"too big for the queue")
+    with open(url, "rb") as f:
+        assert f.read() == b"too big for the queue"
+    assert write_behind.get_write_behind().stats()["rejected"] == 1
+    write_behind.shutdown_write_behind(timeout=5)
+    os.unlink(url)
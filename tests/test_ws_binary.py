@@ -0,0 +1,32 @@
+import base64
+
+from fastapi.testclient import TestClient
+from app.main import app
+
+client = TestClient(app)
+
+
+def test_binary_audio_after_negotiation():
+    with client.websocket_connect("/v1/ws/audio/s_bin") as ws:
+        ws.send_json({"type": "config", "audio_encoding": "binary"})
+        ack = ws.receive_json()
+        assert ack == {"type": "config_ack", "audio_encoding": "binary"}
+        ws.send_bytes(b"hello binary")
+        data = ws.receive_json()
+        assert data["type"] == "stt_partial"
+        assert data["partial"] == "hello binary"
+
+
+def test_binary_audio_rejected_without_negotiation():
+    with client.websocket_connect("/v1/ws/audio/s_bin2") as ws:
+        ws.send_bytes(b"hello")
+        data = ws.receive_json()
+        assert data["type"] == "error"
+
+
+def test_json_base64_audio_still_supported():
+    with client.websocket_connect("/v1/ws/audio/s_b64") as ws:
+        ws.send_json({"type": "audio_chunk", "data": base64.b64encode(b"legacy client").decode("ascii")})
+        data = ws.receive_json()
+        assert data["type"] == "stt_partial"
+        assert data["partial"] == "legacy client"